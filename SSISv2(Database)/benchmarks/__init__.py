@@ -0,0 +1 @@
+"""Benchmarks for the Simple Student Information System; run with python -m benchmarks.run."""
@@ -0,0 +1,124 @@
+"""Synthetic rosters in the legacy two-file layout.
+
+The files match what the application wrote before the unified schema: a
+keyless ``students`` table in Student_Table.db and a ``courses`` table in
+Course_Table.db, so opening them exercises the same migration a real
+installation goes through. Output is deterministic for a given seed.
+
+Usage: python -m benchmarks.roster DIR --students 100k [--fanout 250] [--unassigned 0.02] [--seed 1]
+"""
+
+import argparse
+import os
+import random
+import sqlite3
+import sys
+
+from ssis.schema import GENDERS, YEARS
+
+FIRST_NAMES = (
+    'Ana', 'Ben', 'Carla', 'Dante', 'Elena', 'Felix', 'Grace', 'Hector', 'Iris', 'Jonas', 'Karla', 'Liam',
+    'Maria', 'Noel', 'Olivia', 'Paolo', 'Queenie', 'Rafael', 'Sofia', 'Tomas', 'Ursula', 'Victor', 'Wendy',
+    'Xavier', 'Yasmin', 'Zeno', 'Andrea', 'Bianca', 'Carlo', 'Diana', 'Enzo', 'Fiona', 'Gabriel', 'Hannah',
+)
+LAST_NAMES = (
+    'Reyes', 'Santos', 'Cruz', 'Bautista', 'Garcia', 'Mendoza', 'Torres', 'Flores', 'Villanueva', 'Ramos',
+    'Castillo', 'Aquino', 'Navarro', 'Domingo', 'Morales', 'Salazar', 'Pascual', 'Dela Cruz', 'Lim', 'Tan',
+    'Gonzales', 'Rivera', 'Herrera', 'Soriano', 'Valdez', 'Fernandez', 'Lopez', 'Marquez', 'Perez', 'Roxas',
+)
+COURSE_PREFIXES = ('BS', 'AB', 'BSED', 'MS', 'MA')
+COURSE_SUBJECTS = (
+    'ACCOUNTANCY', 'BIOLOGY', 'CHEMISTRY', 'COMPUTER SCIENCE', 'ECONOMICS', 'ENGLISH', 'FILIPINO', 'HISTORY',
+    'INFORMATION TECHNOLOGY', 'MATHEMATICS', 'NURSING', 'PHILOSOPHY', 'PHYSICS', 'PSYCHOLOGY', 'STATISTICS',
+)
+BATCH_SIZE = 10000
+
+
+def parse_count(text):
+    """Read counts such as 1000, 100k or 1M."""
+    text = text.strip().lower()
+    scale = {'k': 1000, 'm': 1000000}.get(text[-1:], 1)
+    if scale != 1:
+        text = text[:-1]
+    return int(float(text) * scale)
+
+
+def course_codes(count):
+    codes = []
+    for index in range(count):
+        prefix = COURSE_PREFIXES[index % len(COURSE_PREFIXES)]
+        subject = COURSE_SUBJECTS[(index // len(COURSE_PREFIXES)) % len(COURSE_SUBJECTS)]
+        codes.append((f"{prefix}{subject[:4].strip()}{index:04d}", f"{prefix} {subject} {index}"))
+    return codes
+
+
+def student_ids(count, rng):
+    """Return ``count`` distinct IDs of the form YYYY-NNNN in random order."""
+    if count > 1000000:
+        raise ValueError("At most 1000000 students fit the YYYY-NNNN ID format")
+    numbers = rng.sample(range(1000000), count)
+    return [f"{2000 + number // 10000:04d}-{number % 10000:04d}" for number in numbers]
+
+
+def generate(directory, students, fanout=250, unassigned=0.02, seed=1):
+    """Write Student_Table.db and Course_Table.db with ``students`` rows into ``directory``.
+
+    There is one course per ``fanout`` students on average; course sizes
+    are skewed so a few courses are much larger than the rest. A share of
+    ``unassigned`` students get the legacy 'N/A' course code. Returns the
+    number of courses written.
+    """
+    rng = random.Random(seed)
+    os.makedirs(directory, exist_ok=True)
+    for name in ('Student_Table.db', 'Course_Table.db'):
+        for suffix in ('', '-wal', '-shm'):
+            path = os.path.join(directory, name + suffix)
+            if os.path.exists(path):
+                os.remove(path)
+
+    courses = course_codes(max(1, students // max(1, fanout)))
+    connection = sqlite3.connect(os.path.join(directory, 'Course_Table.db'))
+    connection.execute("CREATE TABLE courses (Code TEXT, Name TEXT)")
+    connection.executemany("INSERT INTO courses (Code, Name) VALUES (?, ?)", courses)
+    connection.commit()
+    connection.close()
+
+    codes = [code for code, _ in courses]
+    weights = [1 / (rank + 1) ** 0.8 for rank in range(len(codes))]
+    connection = sqlite3.connect(os.path.join(directory, 'Student_Table.db'))
+    connection.execute("PRAGMA journal_mode=OFF")
+    connection.execute("PRAGMA synchronous=OFF")
+    connection.execute(
+        "CREATE TABLE students (StudentID TEXT, StudentName TEXT, Gender TEXT, Year TEXT, CourseCode TEXT)")
+    ids = student_ids(students, rng)
+    for start in range(0, students, BATCH_SIZE):
+        batch = ids[start:start + BATCH_SIZE]
+        assigned = rng.choices(codes, weights, k=len(batch))
+        rows = [(student_id,
+                 f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+                 rng.choice(GENDERS),
+                 rng.choice(YEARS),
+                 'N/A' if rng.random() < unassigned else course_code)
+                for student_id, course_code in zip(batch, assigned)]
+        connection.executemany("INSERT INTO students VALUES (?, ?, ?, ?, ?)", rows)
+    connection.commit()
+    connection.close()
+    return len(courses)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.roster', description="Generate a synthetic roster.")
+    parser.add_argument('directory')
+    parser.add_argument('--students', type=parse_count, default=parse_count('100k'))
+    parser.add_argument('--fanout', type=int, default=250, help="average students per course")
+    parser.add_argument('--unassigned', type=float, default=0.02, help="share of students without a course")
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args(argv)
+
+    courses = generate(args.directory, args.students, args.fanout, args.unassigned, args.seed)
+    print(f"{args.students} students in {courses} courses written to {args.directory}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
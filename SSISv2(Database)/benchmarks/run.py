@@ -0,0 +1,593 @@
+"""Timings for the data and grid paths over synthetic rosters.
+
+Each roster size is generated once in the legacy layout (see roster.py),
+migrated, and copied afresh for every group of benchmarks, so runs start
+from the same state. Data paths go through the repositories without Qt;
+grid paths drive the main window under the offscreen Qt platform; server
+paths run ``python -m ssis serve`` in a child process and load it from
+hundreds of client threads at once. Results are written as JSON, and
+``--baseline`` prints the change against an earlier results file.
+
+Usage: python -m benchmarks.run [--sizes 1k,100k,1M] [--fanout 250] [--repeat 5]
+                                [--no-gui] [--no-server] [--data-dir DIR] [--output FILE] [--baseline FILE]
+"""
+
+import argparse
+import csv
+import datetime
+import json
+import os
+import platform
+import random
+import secrets
+import shutil
+import signal
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from benchmarks.roster import generate, parse_count
+from ssis.client import RemoteConnection, RemoteDatabase, RemoteStudentRepository
+from ssis.columnar import ColumnarRoster
+from ssis.database import Database
+from ssis.journal import EditJournal
+from ssis import maintenance
+from ssis.repository import ChangeLogRepository, CourseRepository, StudentRepository
+from ssis.schema import STUDENT_COLUMNS, YEARS
+from ssis.server import TOKEN_VARIABLE
+from ssis.sorting import SortOrder
+
+DATABASE_FILES = ('Student_Table.db', 'Course_Table.db')
+IMPORT_ROWS = 10000
+SCROLL_ROWS = 10000
+BULK_ROWS = 300
+PAGE_SIZE = 200
+# Rows the live filter fetches before falling back to paging (ssis.live_filter.SNAPSHOT_LIMIT + 1).
+FILTER_LIMIT = 5001
+READ_CLIENTS = 300
+WRITE_CLIENTS = 50
+REQUESTS_PER_CLIENT = 10
+
+
+class Results:
+    def __init__(self, repeat):
+        self.repeat = repeat
+        self.entries = []
+
+    def measure(self, size, group, name, function, setup=None, repeat=None):
+        """Time ``function(run)`` for run = 0, 1, ...; ``setup(run)`` runs untimed before each call."""
+        runs = []
+        for run in range(repeat or self.repeat):
+            if setup is not None:
+                setup(run)
+            start = time.perf_counter()
+            function(run)
+            runs.append((time.perf_counter() - start) * 1000)
+        entry = {
+            'size': size,
+            'group': group,
+            'name': name,
+            'runs_ms': [round(value, 3) for value in runs],
+            'min_ms': round(min(runs), 3),
+            'median_ms': round(statistics.median(runs), 3),
+            'mean_ms': round(statistics.fmean(runs), 3),
+        }
+        self.entries.append(entry)
+        print(f"{size:>9} {group:6} {name:32} median {entry['median_ms']:10.2f} ms  min {entry['min_ms']:10.2f} ms",
+              flush=True)
+        return entry
+
+
+def copy_database(source, target):
+    if os.path.exists(target):
+        shutil.rmtree(target)
+    os.makedirs(target)
+    for name in DATABASE_FILES:
+        if os.path.exists(os.path.join(source, name)):
+            shutil.copy(os.path.join(source, name), os.path.join(target, name))
+
+
+def prepare(data_dir, size, fanout):
+    """Return the directories of the legacy and the migrated roster for ``size`` students."""
+    legacy = os.path.join(data_dir, f"legacy-{size}-{fanout}")
+    if not os.path.exists(os.path.join(legacy, 'complete')):
+        generate(legacy, size, fanout)
+        open(os.path.join(legacy, 'complete'), 'w').close()
+    migrated = os.path.join(data_dir, f"migrated-{size}-{fanout}")
+    copy_database(legacy, migrated)
+    Database(migrated).close()
+    return legacy, migrated
+
+
+def largest_courses(db, count):
+    return [row[0] for row in db.execute(
+        "SELECT CourseCode FROM students WHERE CourseCode IS NOT NULL "
+        "GROUP BY CourseCode ORDER BY count(*) DESC LIMIT ?", (count,))]
+
+
+def write_import_file(path, count, first_year):
+    with open(path, 'w', newline='') as file:
+        writer = csv.writer(file)
+        writer.writerow(STUDENT_COLUMNS)
+        for number in range(count):
+            year = first_year + number // 10000
+            writer.writerow((f"{year:04d}-{number % 10000:04d}", f"Imported {number}", 'Female', 'First', ''))
+
+
+def data_benchmarks(results, size, legacy, migrated, work):
+    def fresh_legacy(run):
+        copy_database(legacy, work)
+
+    results.measure(size, 'data', 'open.migrate', lambda run: Database(work).close(), fresh_legacy, repeat=1)
+
+    copy_database(migrated, work)
+    results.measure(size, 'data', 'open', lambda run: Database(work).close())
+
+    db = Database(work)
+    students = StudentRepository(db)
+    courses = CourseRepository(db)
+    try:
+        course = largest_courses(db, 1)[0]
+        limit = FILTER_LIMIT
+
+        results.measure(size, 'data', 'populate_students.first_page',
+                        lambda run: students.filter(limit=200).fetchall())
+        results.measure(size, 'data', 'filter_students.name',
+                        lambda run: students.filter('Reyes', 'All', limit).fetchall())
+        results.measure(size, 'data', 'filter_students.short',
+                        lambda run: students.filter('An', 'All', limit).fetchall())
+        results.measure(size, 'data', 'filter_students.gender',
+                        lambda run: students.filter('Female', 'Gender', limit).fetchall())
+        results.measure(size, 'data', 'filter_students.course',
+                        lambda run: students.filter(course, 'CourseCode', limit).fetchall())
+        # Compound filters; sql.select.year_course below runs the first one as
+        # written, letting SQLite pick the Year index.
+        for name, text in (('year_course', f"Year = Second AND CourseCode = {course}"),
+                           ('id_gender', "StudentID ^= 2021- AND Gender = Female"),
+                           ('name_course', f"StudentName ~ Reyes OR CourseCode = {course}")):
+            results.measure(size, 'data', f'query.{name}',
+                            lambda run, text=text: students.filter(text, 'Query').fetchall())
+        results.measure(size, 'data', 'count_students.name', lambda run: students.count('Reyes'))
+        results.measure(size, 'data', 'search_students', lambda run: students.search('Santos'))
+        # Checks the add dialog runs as a student is typed: a taken ID, the
+        # commonest name in the roster and a misspelling of it, words swapped.
+        taken, common = db.execute(
+            "SELECT min(StudentID), StudentName FROM students GROUP BY StudentName ORDER BY count(*) DESC LIMIT 1").fetchone()
+        first, last = common.split(' ', 1)
+        results.measure(size, 'data', 'validate.taken_id', lambda run: students.validate(taken, ''))
+        results.measure(size, 'data', 'validate.similar_name', lambda run: students.validate('2100-0000', common))
+        results.measure(size, 'data', 'validate.misspelt_name',
+                        lambda run: students.validate('2100-0000', f"{last}, {first[0]}h{first[1:]}"))
+        results.measure(size, 'data', 'report.course', lambda run: courses.report())
+        results.measure(size, 'data', 'report.year', lambda run: students.report('Year'))
+        results.measure(size, 'data', 'report.gender', lambda run: students.report('Gender'))
+
+        # The same filters answered from the roster held in memory, next to the
+        # SQL the grid would run for them.
+        rosters = []
+        results.measure(size, 'data', 'memory.load', lambda run: rosters.append(ColumnarRoster(db)), repeat=1)
+        roster = rosters[-1]
+        select = f"SELECT rowid, {', '.join(students.columns)} FROM students"
+        results.measure(size, 'data', 'memory.select.year_course', lambda run: roster.rows(
+            roster.select({'Year': 'Second', 'CourseCode': course})))
+        results.measure(size, 'data', 'sql.select.year_course', lambda run: db.execute(
+            f"{select} WHERE Year = ? AND CourseCode = ?", ('Second', course)).fetchall())
+        results.measure(size, 'data', 'memory.select.year_gender', lambda run: roster.rows(
+            roster.select({'Year': 'Second', 'Gender': 'Female'}, limit)))
+        results.measure(size, 'data', 'sql.select.year_gender', lambda run: db.execute(
+            f"{select} WHERE Year = ? AND Gender = ? LIMIT ?", ('Second', 'Female', limit)).fetchall())
+        results.measure(size, 'data', 'memory.contains.name',
+                        lambda run: roster.rows(roster.contains('All', 'Reyes', limit)))
+        results.measure(size, 'data', 'memory.contains.short',
+                        lambda run: roster.rows(roster.contains('All', 'An', limit)))
+        everyone = roster.select({})
+        results.measure(size, 'data', 'memory.order.StudentName',
+                        lambda run: roster.order(everyone, 'StudentName'))
+        del rosters, roster, everyone
+
+        # The last page of the grid sorted by name, reached by skipping rows
+        # versus by seeking past the key that ends the page before it.
+        order = SortOrder('students', students.columns, 'StudentName')
+        deep = max(0, db.execute("SELECT count(*) FROM students").fetchone()[0] - PAGE_SIZE)
+        results.measure(size, 'data', 'sorted_page.offset', lambda run: db.execute(
+            f"{select} ORDER BY {order.order_by()} LIMIT ? OFFSET ?", (PAGE_SIZE, deep)).fetchall())
+        before = db.execute(f"{select} ORDER BY {order.order_by()} LIMIT 1 OFFSET ?", (max(0, deep - 1),)).fetchone()
+        condition, params = order.after(order.key(before))
+        results.measure(size, 'data', 'sorted_page.keyset', lambda run: db.execute(
+            f"{select} WHERE {condition} ORDER BY {order.order_by()} LIMIT ?", (*params, PAGE_SIZE)).fetchall())
+
+        # Years past 2099 never occur in generated rosters, so these IDs are free.
+        results.measure(size, 'data', 'add_student',
+                        lambda run: students.add(f"2100-{run:04d}", "Bench Student", 'Male', 'First', course))
+        results.measure(size, 'data', 'update_student',
+                        lambda run: students.update(f"2100-{run:04d}", "Bench Student", 'Female', 'Second', None))
+        results.measure(size, 'data', 'delete_student', lambda run: students.delete(f"2100-{run:04d}"))
+
+        # Moving students to another year one commit at a time, as the window
+        # did before the edit journal, and as one journal batch.
+        batch = students.rows(row[0] for row in db.execute(
+            "SELECT StudentID FROM students ORDER BY rowid LIMIT ?", (BULK_ROWS,)))
+        journal = EditJournal(students)
+
+        def update_each(run):
+            for _, student_id, student_name, gender, year, course_code in batch.values():
+                students.update(student_id, student_name, gender, YEARS[run % len(YEARS)], course_code)
+
+        def update_batch(run):
+            journal.stage_update(batch, Year=YEARS[(run + 1) % len(YEARS)])
+            journal.commit('bench')
+
+        results.measure(size, 'data', f'bulk_update.{BULK_ROWS}.each', update_each)
+        results.measure(size, 'data', f'bulk_update.{BULK_ROWS}.journal', update_batch)
+        results.measure(size, 'data', f'bulk_update.{BULK_ROWS}.undo', lambda run: journal.undo(), repeat=1)
+
+        def delete_batch(run):
+            journal.stage_delete(batch)
+            journal.commit('bench')
+
+        results.measure(size, 'data', f'bulk_delete.{BULK_ROWS}.journal', delete_batch, repeat=1)
+        results.measure(size, 'data', f'bulk_delete.{BULK_ROWS}.undo', lambda run: journal.undo(), repeat=1)
+
+        renamed = [course]
+
+        def rename(run):
+            new_code = f"{course}-R{run}"
+            courses.rename(renamed[-1], new_code)
+            renamed.append(new_code)
+
+        results.measure(size, 'data', 'rename_course', rename)
+        courses.rename(renamed[-1], course)
+
+        export_path = os.path.join(work, 'export.csv')
+        results.measure(size, 'data', 'export_students.csv', lambda run: students.export(export_path))
+
+        import_path = os.path.join(work, 'import.csv')
+
+        def import_setup(run):
+            write_import_file(import_path, IMPORT_ROWS, 2101 + run)
+
+        results.measure(size, 'data', f'import_students.{IMPORT_ROWS}',
+                        lambda run: students.import_file(import_path), import_setup)
+
+        doomed = largest_courses(db, results.repeat)
+        results.measure(size, 'data', 'delete_course', lambda run: courses.delete(doomed[run % len(doomed)]))
+
+        # A sync that has seen all but the last bulk update, then the log
+        # compacted.
+        changes = ChangeLogRepository(db)
+        recent = changes.last() - BULK_ROWS
+        results.measure(size, 'data', f'changes.since.{BULK_ROWS}', lambda run: changes.since(recent).fetchall())
+        results.measure(size, 'data', 'changes.compact', lambda run: changes.compact(), repeat=1)
+
+        results.measure(size, 'data', 'statistics.check', lambda run: students.stale_statistics(), repeat=1)
+        results.measure(size, 'data', 'statistics.rebuild', lambda run: students.rebuild_statistics(), repeat=1)
+
+        # Copies and upkeep of the file, made while the shared connection stays open.
+        backup_path = os.path.join(work, 'backup.db')
+        results.measure(size, 'data', 'backup', lambda run: maintenance.backup(db.database, backup_path))
+        results.measure(size, 'data', 'snapshot', lambda run: maintenance.snapshot(db.database, keep=1))
+        results.measure(size, 'data', 'maintain.full', lambda run: maintenance.maintain(db.database, full=True),
+                        repeat=1)
+        results.measure(size, 'data', 'maintain', lambda run: maintenance.maintain(db.database))
+    finally:
+        db.close()
+
+
+def grid_benchmarks(results, size, migrated, work):
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    from PyQt6.QtCore import QCoreApplication, QElapsedTimer, Qt
+    from PyQt6.QtWidgets import QApplication
+
+    from ssis.gui import STYLESHEET, MainWindow
+
+    app = QApplication.instance() or QApplication([sys.argv[0]])
+    app.setStyleSheet(STYLESHEET)
+
+    def wait_for(condition, timeout_ms=60000):
+        timer = QElapsedTimer()
+        timer.start()
+        while not condition():
+            if timer.elapsed() > timeout_ms:
+                raise TimeoutError("Timed out waiting for the grid")
+            QCoreApplication.processEvents()
+
+    copy_database(migrated, work)
+    windows = []
+
+    def open_window(run, first_rows=True):
+        window = MainWindow(work)
+        painted = []
+        window.first_painted.connect(lambda: painted.append(True))
+        window.show()
+        if first_rows:
+            wait_for(lambda: window.course_tab not in window.pending_tabs)
+        else:
+            wait_for(lambda: painted)
+        windows.append(window)
+
+    def close_window(run):
+        while windows:
+            windows.pop().close()
+        QCoreApplication.processEvents()
+
+    results.measure(size, 'grid', 'open_window.first_paint', lambda run: open_window(run, False), close_window)
+    results.measure(size, 'grid', 'open_window', open_window, close_window)
+    close_window(None)
+
+    window = MainWindow(work)
+    window.show()
+    wait_for(lambda: window.course_tab not in window.pending_tabs)
+    try:
+        results.measure(size, 'grid', 'show_tab.students',
+                        lambda run: window.tabs.setCurrentWidget(window.student_tab), repeat=1)
+        model = window.student_model
+        course = largest_courses(window.db, 1)[0]
+        resets = []
+        model.modelReset.connect(lambda: resets.append(True))
+
+        def filter_students(run, text, field):
+            resets.clear()
+            window.filter_input.setCurrentText(field)
+            window.student_live_filter.reset()
+            window.filter_text.setText(text)
+            window.filter_students()
+            wait_for(lambda: resets)
+
+        for name, text, field in (('name', 'Reyes', 'All'), ('gender', 'Female', 'Gender'),
+                                  ('course', course, 'CourseCode'), ('clear', '', 'All')):
+            results.measure(size, 'grid', f'filter_students.{name}',
+                            lambda run, text=text, field=field: filter_students(run, text, field))
+
+        results.measure(size, 'grid', 'memory_roster.load', lambda run: window.set_memory_roster(True),
+                        lambda run: window.set_memory_roster(False), repeat=1)
+        for name, text, field in (('name', 'Reyes', 'All'), ('gender', 'Female', 'Gender'),
+                                  ('course', course, 'CourseCode')):
+            results.measure(size, 'grid', f'filter_students.memory.{name}',
+                            lambda run, text=text, field=field: filter_students(run, text, field))
+        window.set_memory_roster(False)
+        filter_students(None, '', 'All')
+
+        def scroll(run):
+            model.set_filter()
+            while model.rowCount() < SCROLL_ROWS and model.canFetchMore():
+                first = model.rowCount()
+                model.fetchMore()
+                for row in range(first, model.rowCount()):
+                    model.data(model.index(row, 0))
+
+        results.measure(size, 'grid', f'scroll.{SCROLL_ROWS}', scroll)
+
+        def sort_students(run, column, order):
+            model.set_filter()
+            window.student_table.sortByColumn(column, order)
+            model.fetchMore()
+
+        for column, field in enumerate(model.fields):
+            results.measure(size, 'grid', f'sort_students.{field}',
+                            lambda run, column=column: sort_students(run, column, Qt.SortOrder.AscendingOrder))
+        results.measure(size, 'grid', 'sort_students.StudentName.desc',
+                        lambda run: sort_students(run, 1, Qt.SortOrder.DescendingOrder))
+
+        # Fetching one more page costs the same at the end of the sorted roster as at the start.
+        sort_students(None, 1, Qt.SortOrder.AscendingOrder)
+        model.set_filter()
+        results.measure(size, 'grid', 'sorted_fetch.first_page', lambda run: model.fetchMore(),
+                        lambda run: model.set_filter())
+        model.set_filter()
+        while model.canFetchMore():
+            model.fetchMore()
+        pages = model.rowCount() // model.page_size
+
+        def back_one_page(run):
+            model.set_filter()
+            while model.rowCount() < (pages - 1) * model.page_size and model.canFetchMore():
+                model.fetchMore()
+
+        results.measure(size, 'grid', 'sorted_fetch.last_page', lambda run: model.fetchMore(), back_one_page,
+                        repeat=1)
+        window.student_table.sortByColumn(-1, Qt.SortOrder.AscendingOrder)
+
+        def add_student(run):
+            window.students.add(f"2100-{run:04d}", "Bench Student", 'Male', 'First', course)
+            QCoreApplication.processEvents()
+
+        def delete_student(run):
+            window.students.delete(f"2100-{run:04d}")
+            QCoreApplication.processEvents()
+
+        results.measure(size, 'grid', 'add_student', add_student)
+        results.measure(size, 'grid', 'delete_student', delete_student)
+
+        doomed = largest_courses(window.db, results.repeat)
+
+        def delete_course(run):
+            window.courses.delete(doomed[run % len(doomed)])
+            QCoreApplication.processEvents()
+
+        results.measure(size, 'grid', 'delete_course', delete_course)
+
+        def leave_statistics(run):
+            window.tabs.setCurrentIndex(0)
+            window.statistics_stale = True
+
+        results.measure(size, 'grid', 'show_statistics',
+                        lambda run: window.tabs.setCurrentWidget(window.statistics_tab), leave_statistics)
+    finally:
+        window.close()
+
+
+def run_clients(count, work):
+    """Run ``work(client)`` on ``count`` threads released together; raises the first error any of them hit."""
+    start = threading.Barrier(count)
+    errors = []
+
+    def client(number):
+        try:
+            start.wait()
+            work(number)
+        except Exception as error:
+            errors.append(error)
+
+    threads = [threading.Thread(target=client, args=(number,)) for number in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    if errors:
+        raise RuntimeError(f"{len(errors)} of {count} clients failed, first with: {errors[0]!r}")
+
+
+def server_benchmarks(results, size, migrated, work):
+    copy_database(migrated, work)
+    # The server and every client below read the token from the environment.
+    os.environ.setdefault(TOKEN_VARIABLE, secrets.token_urlsafe(24))
+    server = subprocess.Popen([sys.executable, '-m', 'ssis', 'serve', '--database-dir', work, '--port', '0'],
+                              stdout=subprocess.PIPE, text=True,
+                              cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    try:
+        url = server.stdout.readline().split()[-1]
+        db = RemoteDatabase(url)
+        student_ids = [row[0] for row in db.execute(
+            "SELECT StudentID FROM students ORDER BY random() LIMIT 1000").fetchall()]
+        names = [row[0].split()[0][:4] for row in db.execute(
+            "SELECT StudentName FROM students ORDER BY random() LIMIT 100").fetchall()]
+
+        def status():
+            return db.connection.request('GET', '/status')
+
+        def read(client):
+            connection = RemoteConnection(url)
+            generator = random.Random(client)
+            for number in range(REQUESTS_PER_CLIENT):
+                if number % 3 == 0:
+                    connection.request('GET', f'/students/{generator.choice(student_ids)}')
+                elif number % 3 == 1:
+                    connection.request('GET', '/students', params={'filter': generator.choice(names), 'limit': 50})
+                else:
+                    connection.request('GET', '/report', params={'by': 'Year'})
+            connection.close()
+
+        def writer(run):
+            def write(client):
+                students = RemoteStudentRepository(RemoteDatabase(url))
+                for number in range(REQUESTS_PER_CLIENT):
+                    students.add(f"{2300 + run:04d}-{client * REQUESTS_PER_CLIENT + number:04d}",
+                                 f"Concurrent {client}", 'Male', 'First')
+                students.db.close()
+            return write
+
+        results.measure(size, 'server', f'read.{READ_CLIENTS}_clients',
+                        lambda run: run_clients(READ_CLIENTS, read))
+
+        def read_all(run):
+            # Batch by batch, as the export and the in-memory roster read through a server.
+            cursor = db.execute(f"SELECT rowid, {', '.join(STUDENT_COLUMNS)} FROM students ORDER BY rowid")
+            while cursor.fetchmany(PAGE_SIZE):
+                pass
+
+        results.measure(size, 'server', 'query.fetchmany.all', read_all)
+
+        serial = RemoteStudentRepository(db)
+        results.measure(size, 'server', f'write.serial.{WRITE_CLIENTS * REQUESTS_PER_CLIENT}',
+                        lambda run: [serial.add(f"{2400 + run:04d}-{number:04d}", "Serial", 'Male', 'First')
+                                     for number in range(WRITE_CLIENTS * REQUESTS_PER_CLIENT)])
+
+        before = status()
+        results.measure(size, 'server', f'write.{WRITE_CLIENTS}_clients',
+                        lambda run: run_clients(WRITE_CLIENTS, writer(run)))
+        after = status()
+        print(f"{'':>9} {'':6} {'':32} {after['writes'] - before['writes']} writes in "
+              f"{after['commits'] - before['commits']} commits", flush=True)
+
+        def mixed(run):
+            write = writer(results.repeat + run)
+            run_clients(READ_CLIENTS + WRITE_CLIENTS,
+                        lambda client: read(client) if client < READ_CLIENTS else write(client - READ_CLIENTS))
+
+        results.measure(size, 'server', f'mixed.{READ_CLIENTS}+{WRITE_CLIENTS}_clients', mixed)
+        db.close()
+    finally:
+        server.send_signal(signal.SIGINT)
+        server.wait()
+
+
+def revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(entries, baseline_path):
+    with open(baseline_path) as file:
+        baseline = {(entry['size'], entry['group'], entry['name']): entry for entry in json.load(file)['results']}
+    print(f"\n{'size':>9} {'group':6} {'benchmark':32} {'baseline':>12} {'now':>12} {'change':>8}")
+    for entry in entries:
+        before = baseline.get((entry['size'], entry['group'], entry['name']))
+        if before is None:
+            continue
+        change = entry['median_ms'] / before['median_ms'] if before['median_ms'] else float('inf')
+        print(f"{entry['size']:>9} {entry['group']:6} {entry['name']:32} "
+              f"{before['median_ms']:10.2f}ms {entry['median_ms']:10.2f}ms {change:7.2f}x")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.run', description="Benchmark the SSIS data and grid paths.")
+    parser.add_argument('--sizes', default='1k,100k', help="comma separated student counts, e.g. 1k,100k,1M")
+    parser.add_argument('--fanout', type=int, default=250, help="average students per course")
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--no-gui', action='store_true', help="skip the offscreen Qt grid benchmarks")
+    parser.add_argument('--no-server', action='store_true', help="skip the shared database server benchmarks")
+    parser.add_argument('--data-dir', help="where generated rosters are kept between runs (default: a temporary directory)")
+    parser.add_argument('--output', default='benchmark-results.json')
+    parser.add_argument('--baseline', help="earlier results file to compare against")
+    args = parser.parse_args(argv)
+
+    sizes = [parse_count(size) for size in args.sizes.split(',')]
+    temporary = None
+    data_dir = args.data_dir
+    if data_dir is None:
+        temporary = tempfile.TemporaryDirectory(prefix='ssis-bench-')
+        data_dir = temporary.name
+
+    results = Results(args.repeat)
+    try:
+        for size in sizes:
+            legacy, migrated = prepare(data_dir, size, args.fanout)
+            work = os.path.join(data_dir, f"work-{size}")
+            data_benchmarks(results, size, legacy, migrated, work)
+            if not args.no_gui:
+                grid_benchmarks(results, size, migrated, work)
+            if not args.no_server:
+                server_benchmarks(results, size, migrated, work)
+            shutil.rmtree(work, ignore_errors=True)
+    finally:
+        if temporary is not None:
+            temporary.cleanup()
+
+    document = {
+        'created': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+        'revision': revision(),
+        'python': platform.python_version(),
+        'sqlite': sqlite3.sqlite_version,
+        'platform': platform.platform(),
+        'parameters': {'sizes': sizes, 'fanout': args.fanout, 'repeat': args.repeat, 'gui': not args.no_gui,
+                       'server': not args.no_server},
+        'results': results.entries,
+    }
+    with open(args.output, 'w') as file:
+        json.dump(document, file, indent=2)
+    print(f"\nResults written to {args.output}")
+
+    if args.baseline:
+        compare(results.entries, args.baseline)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1 @@
+"""Support modules for the Simple Student Information System."""
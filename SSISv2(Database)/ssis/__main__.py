@@ -0,0 +1,5 @@
+import sys
+
+from ssis.cli import main
+
+sys.exit(main())
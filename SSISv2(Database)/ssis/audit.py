@@ -0,0 +1,168 @@
+"""The change log: every committed change to students and courses, in order.
+
+Triggers added by schema version 7 append one entry to change_log for
+each row inserted, updated or deleted, whoever writes it: the window, the
+command line, the server, the cascades of a course rename or delete, or
+another SQLite client. An entry holds
+
+    Seq        its number; numbers only ever grow and are never reused
+    Changed    when, in UTC
+    Actor      who made it, or NULL when written outside the application;
+               through a server, NAME@ADDRESS (see ssis.server)
+    TableName  'students' or 'courses'
+    Operation  'INSERT', 'UPDATE' or 'DELETE'
+    Record     the rowid of the changed row
+    OldKey     its StudentID or Code before the change, NULL for an insert
+    NewKey     its key after the change, NULL for a delete
+    Data       the whole row after the change as a JSON object, NULL for a delete
+
+An update that leaves the row as it was is not logged. A consumer keeps
+the last Seq it applied and asks for what came after, so a sync costs as
+much as the changes made since, whatever the roster's size. Applying each
+entry as an upsert or delete of (TableName, Record) reproduces the tables.
+
+compact() drops the entries a later entry for the same row makes
+redundant, which keeps that property for every consumer. A row is
+followed by its key, across renames, from its insert to its delete; its
+first entry, its newest and every entry that changes its key or the
+course it references are kept, so a replay in Seq order with foreign
+keys enforced never meets a student before its course. truncate()
+drops all entries before a number; consumers that had not read that far
+must start again from a full export, and changes_since() refuses them.
+
+Triggers cannot see which connection fired them, so they read the actor
+from the one-row change_actor table. attributed() fills it in at the
+start of each of the application's write transactions and empties it
+again before the commit, so no other connection ever sees it and the
+changes of other SQLite clients are logged with a NULL Actor. A change
+that cascades, such as a course rename moving its students, is logged
+after the change that caused it.
+"""
+
+import getpass
+from contextlib import contextmanager
+
+from ssis.database import transaction
+
+COLUMNS = ('Seq', 'Changed', 'Actor', 'TableName', 'Operation', 'Record', 'OldKey', 'NewKey', 'Data')
+TABLES = {'students': 'StudentID', 'courses': 'Code'}
+# The column by which a student refers to its course.
+REFERENCE = 'CourseCode'
+
+
+class ChangesTruncated(ValueError):
+    """Raised when the changes asked for have been truncated away."""
+
+
+def default_actor():
+    try:
+        return getpass.getuser()
+    except (KeyError, OSError):
+        return None
+
+
+@contextmanager
+def attributed(connection, actor):
+    """Run the enclosed statements as one transaction whose changes are logged as made by ``actor``.
+
+    Inside a transaction that is already open they run as a savepoint of
+    it and keep its actor.
+    """
+    if connection.in_transaction:
+        with transaction(connection):
+            yield connection
+        return
+    with transaction(connection):
+        set_actor(connection, actor)
+        yield connection
+        connection.execute("DELETE FROM change_actor")
+
+
+def set_actor(connection, actor):
+    """Log the changes made through ``connection`` for the rest of its open transaction as ``actor``'s."""
+    connection.execute("INSERT OR REPLACE INTO change_actor (Id, Actor) VALUES (1, ?)", (actor,))
+
+
+def start(connection):
+    """Return the Seq after which no entry has been truncated away."""
+    return connection.execute("SELECT Seq FROM change_log_start").fetchone()[0]
+
+
+def last(connection):
+    """Return the Seq of the newest entry ever written, 0 if there was none."""
+    row = connection.execute("SELECT seq FROM sqlite_sequence WHERE name = 'change_log'").fetchone()
+    return row[0] if row else 0
+
+
+def changes_since(connection, since=None, limit=-1, table=None, key=None):
+    """Return a cursor over the entries after Seq ``since``, or all that are kept, oldest first.
+
+    ``table`` and ``key`` keep only the entries for that table and for rows
+    that had that key before or after the change. Raises ChangesTruncated
+    if entries after ``since`` have been truncated.
+    """
+    first = start(connection)
+    if since is None:
+        since = first
+    elif since < first:
+        raise ChangesTruncated(f"Changes up to {first} have been truncated; start again from a full export")
+    where = ["Seq > ?"]
+    params = [since]
+    if table is not None:
+        if table not in TABLES:
+            raise ValueError(f"Unknown table: {table}")
+        where.append("TableName = ?")
+        params.append(table)
+    if key is not None:
+        where.append("(NewKey = ? OR OldKey = ?)")
+        params.extend((key, key))
+    return connection.execute(
+        f"SELECT {', '.join(COLUMNS)} FROM change_log WHERE {' AND '.join(where)} ORDER BY Seq LIMIT ?",
+        (*params, limit))
+
+
+def operations(connection, since, until):
+    """Return ``(table, operation, entries)`` counting the entries numbered from ``since`` + 1 to ``until``."""
+    return connection.execute(
+        "SELECT TableName, Operation, count(*) FROM change_log WHERE Seq > ? AND Seq <= ? GROUP BY 1, 2",
+        (since, until)).fetchall()
+
+
+def compact(connection, before=None):
+    """Delete the entries superseded by a later entry for the same row; returns how many.
+
+    Only entries numbered below ``before`` are considered, if it is given.
+    """
+    if before is None:
+        before = last(connection) + 1
+    with transaction(connection):
+        redundant = _redundant(connection, before)
+        connection.executemany("DELETE FROM change_log WHERE Seq = ?", ((seq,) for seq in redundant))
+    return len(redundant)
+
+
+def _redundant(connection, before):
+    """Return the Seq of each entry below ``before`` that compact() may drop."""
+    # (table, current key) -> [Seq of the row's latest entry, whether it may be dropped, its reference]
+    rows = {}
+    redundant = []
+    entries = connection.execute(
+        f"SELECT Seq, TableName, Operation, OldKey, NewKey, json_extract(Data, '$.{REFERENCE}') "
+        "FROM change_log WHERE Seq < ? ORDER BY Seq", (before,))
+    for seq, table, operation, old_key, new_key, reference in entries:
+        row = None if operation == 'INSERT' else rows.pop((table, old_key), None)
+        if row is not None and row[1]:
+            redundant.append(row[0])
+        if operation != 'DELETE':
+            # A row's first entry is kept, since what it looked like before is not known.
+            changes_link = row is None or old_key != new_key or reference != row[2]
+            rows[table, new_key] = [seq, not changes_link, reference]
+    return redundant
+
+
+def truncate(connection, before):
+    """Delete the entries numbered below ``before``; returns how many."""
+    with transaction(connection):
+        deleted = connection.execute("DELETE FROM change_log WHERE Seq < ?", (before,)).rowcount
+        connection.execute("UPDATE change_log_start SET Seq = max(Seq, min(?, ?))", (before - 1, last(connection)))
+    return deleted
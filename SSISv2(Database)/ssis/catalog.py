@@ -0,0 +1,45 @@
+"""In-memory cache of the course codes."""
+
+
+class CourseCatalog:
+    """Course codes loaded once and reloaded only after courses change.
+
+    With an EventBus the cache is dropped whenever a change to 'courses' is
+    published, i.e. after a course add, rename, delete or import commits.
+    ``version`` is bumped on every invalidation so views built from the
+    codes can tell when to rebuild.
+    """
+
+    def __init__(self, db, bus=None):
+        self.db = db
+        self.version = 0
+        self._codes = None
+        self._code_set = None
+        if bus is not None:
+            bus.subscribe('courses', self._course_changed)
+
+    def _course_changed(self, change, rowid):
+        self.invalidate()
+
+    def invalidate(self):
+        self._codes = None
+        self._code_set = None
+        self.version += 1
+
+    def _load(self):
+        if self._codes is None:
+            self._codes = [row[0] for row in self.db.execute("SELECT Code FROM courses ORDER BY Code")]
+            self._code_set = frozenset(self._codes)
+
+    def codes(self):
+        """Return the course codes in sorted order."""
+        self._load()
+        return self._codes
+
+    def __contains__(self, code):
+        self._load()
+        return code in self._code_set
+
+    def __len__(self):
+        self._load()
+        return len(self._codes)
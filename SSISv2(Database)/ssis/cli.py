@@ -0,0 +1,449 @@
+"""Command line interface: python -m ssis COMMAND ...
+
+Only the gui command imports PyQt6; everything else works on the
+repositories directly, so scripts start quickly and need no display.
+
+    python -m ssis gui [--startup-time]
+    python -m ssis serve [--host HOST] [--port PORT] [--readers N]
+    python -m ssis students list [--filter TEXT] [--field FIELD] [--limit N] [--plan]
+    python -m ssis students search TEXT
+    python -m ssis students show|delete STUDENT_ID
+    python -m ssis students check STUDENT_ID NAME
+    python -m ssis students add|update STUDENT_ID NAME GENDER YEAR [COURSE_CODE]
+    python -m ssis courses list [--filter TEXT] [--field FIELD] [--limit N] [--plan]
+    python -m ssis courses search TEXT
+    python -m ssis courses show CODE
+    python -m ssis courses add CODE NAME
+    python -m ssis courses rename CODE NEW_CODE [--dry-run]
+    python -m ssis courses delete CODE [--dry-run]
+    python -m ssis import {students,courses} FILE [--batch-size N] [--rejects FILE]
+    python -m ssis export {students,courses} FILE [--filter TEXT] [--field FIELD]
+    python -m ssis report [--by {course,CourseCode,Year,Gender}]
+    python -m ssis statistics {check,rebuild}
+    python -m ssis changes list [--since SEQ] [--limit N] [--table TABLE] [--key KEY]
+    python -m ssis changes compact [--before SEQ]
+    python -m ssis changes truncate --before SEQ
+    python -m ssis backup FILE
+    python -m ssis snapshot [--keep N] [--list]
+    python -m ssis restore FILE
+    python -m ssis maintain [--full]
+
+With --field Query the student filter is a compound one such as
+``Year = Second AND CourseCode = BSCS`` (see ssis.filters), and --plan
+prints how SQLite will run the listing instead of its rows.
+
+changes list prints the change log (see ssis.audit) after --since, so a
+nightly export can carry on from the last Seq it saw.
+
+Every command accepts --database-dir, or --server URL to work on a database
+shared by ``serve`` instead, with the server's token in SSIS_TOKEN (see
+ssis.server); listings are written to stdout as CSV. backup,
+snapshot, restore and maintain work on the file itself (see ssis.maintenance),
+so they only take --database-dir and run where the server does.
+With SSIS_PROFILE=1 in the environment the command is profiled, its summary
+printed to stderr and its statements logged (see ssis.instrumentation).
+"""
+
+import argparse
+import csv
+import sqlite3
+import sys
+
+from ssis.client import (RemoteChangeLogRepository, RemoteCourseRepository, RemoteDatabase, RemoteError,
+                         RemoteStudentRepository)
+from ssis.database import DEFAULT_DATABASE_DIR, Database
+from ssis.importer import BATCH_SIZE
+from ssis.instrumentation import enable_from_environment, profiler
+from ssis import maintenance, validation
+from ssis.repository import REPORT_FIELDS, ChangeLogRepository, CourseRepository, StudentRepository
+from ssis.schema import GENDERS, NOT_APPLICABLE, YEARS, migrate
+from ssis.server import DEFAULT_HOST, DEFAULT_PORT, READERS, serve
+
+
+def _write_rows(columns, rows):
+    writer = csv.writer(sys.stdout, lineterminator='\n')
+    writer.writerow(columns)
+    count = 0
+    for row in rows:
+        writer.writerow([NOT_APPLICABLE if value is None else value for value in row])
+        count += 1
+    profiler.rows(count)
+
+
+def _repositories(args):
+    if args.server:
+        db = RemoteDatabase(args.server)
+        return db, {'students': RemoteStudentRepository(db), 'courses': RemoteCourseRepository(db),
+                    'changes': RemoteChangeLogRepository(db)}
+    db = Database(args.database_dir)
+    return db, {'students': StudentRepository(db), 'courses': CourseRepository(db),
+                'changes': ChangeLogRepository(db)}
+
+
+def run_gui(args):
+    from ssis.gui import main as gui_main
+
+    return gui_main(args.database_dir, args.server, args.startup_time)
+
+
+def run_serve(args):
+    return serve(args.database_dir, args.host, args.port, args.readers)
+
+
+def run_list(repository, args):
+    if args.plan:
+        print('\n'.join(repository.plan(args.filter, args.field, args.limit)))
+        return 0
+    _write_rows(repository.columns, repository.filter(args.filter, args.field, args.limit))
+    return 0
+
+
+def run_search(repository, args):
+    _write_rows(repository.columns, repository.search(args.text, args.limit))
+    return 0
+
+
+def run_show(repository, args):
+    row = repository.get(args.key)
+    if row is None:
+        print(f"No {repository.table[:-1]} {args.key}", file=sys.stderr)
+        return 1
+    _write_rows(repository.columns, [row])
+    return 0
+
+
+def run_student_add(repository, args):
+    repository.add(args.student_id, args.name, args.gender, args.year, args.course_code)
+    print(f"Added student {args.student_id}")
+    return 0
+
+
+def run_student_update(repository, args):
+    if repository.update(args.student_id, args.name, args.gender, args.year, args.course_code) is None:
+        print(f"No student {args.student_id}", file=sys.stderr)
+        return 1
+    print(f"Updated student {args.student_id}")
+    return 0
+
+
+def run_student_check(repository, args):
+    issues = repository.validate(args.student_id, args.name)
+    for issue in issues:
+        print(f"{issue.level}: {issue.message}")
+    if not issues:
+        print("No problems found")
+    return 1 if any(issue.level == validation.ERROR for issue in issues) else 0
+
+
+def run_student_delete(repository, args):
+    if repository.delete(args.key) is None:
+        print(f"No student {args.key}", file=sys.stderr)
+        return 1
+    print(f"Deleted student {args.key}")
+    return 0
+
+
+def run_course_add(repository, args):
+    repository.add(args.code, args.name)
+    print(f"Added course {args.code}")
+    return 0
+
+
+def run_course_rename(repository, args):
+    change = repository.rename(args.code, args.new_code, dry_run=args.dry_run)
+    if not change.found:
+        print(f"No course {args.code}", file=sys.stderr)
+        return 1
+    verb = "Would move" if args.dry_run else "Moved"
+    print(f"{verb} {change.students} student(s) from {args.code} to {args.new_code}")
+    return 0
+
+
+def run_course_delete(repository, args):
+    change = repository.delete(args.code, dry_run=args.dry_run)
+    if not change.found:
+        print(f"No course {args.code}", file=sys.stderr)
+        return 1
+    verb = "Would unassign" if args.dry_run else "Deleted course and unassigned"
+    print(f"{verb} {change.students} student(s) of {args.code}")
+    return 0
+
+
+def run_import(repository, args):
+    report = repository.import_file(args.path, batch_size=args.batch_size, rejects_path=args.rejects)
+    print(report.summary())
+    for line_number, values, reason in report.rejected[:20]:
+        print(f"  line {line_number}: {reason}", file=sys.stderr)
+    if report.rejected_count > 20:
+        print(f"  ... and {report.rejected_count - 20} more", file=sys.stderr)
+    return 0 if report.rejected_count == 0 else 1
+
+
+def run_export(repository, args):
+    written = repository.export(args.path, args.filter, args.field)
+    print(f"{written} rows written to {args.path}")
+    return 0
+
+
+def run_report(repositories, args):
+    if args.by == 'course':
+        _write_rows(('Code', 'Name', 'Students'), repositories['courses'].report())
+    else:
+        _write_rows((args.by, 'Students'), repositories['students'].report(args.by))
+    return 0
+
+
+def run_statistics(repositories, args):
+    students = repositories['students']
+    stale = students.stale_statistics()
+    for course_code, year, gender, count, stored in stale[:20]:
+        print(f"  {course_code or NOT_APPLICABLE} / {year or NOT_APPLICABLE} / {gender or NOT_APPLICABLE}: "
+              f"{count} student(s), summary says {stored}", file=sys.stderr)
+    if len(stale) > 20:
+        print(f"  ... and {len(stale) - 20} more", file=sys.stderr)
+    if args.action == 'check':
+        print(f"{len(stale)} stale count(s)")
+        return 0 if not stale else 1
+    rows = students.rebuild_statistics()
+    print(f"Rebuilt {rows} count(s), {len(stale)} of them stale")
+    return 0
+
+
+def run_changes_list(changes, args):
+    _write_rows(changes.columns, changes.since(args.since, args.limit, args.table, args.key))
+    return 0
+
+
+def run_changes_compact(changes, args):
+    print(f"Removed {changes.compact(args.before)} superseded change(s)")
+    return 0
+
+
+def run_changes_truncate(changes, args):
+    print(f"Removed {changes.truncate(args.before)} change(s) before {args.before}")
+    return 0
+
+
+def _progress(copied, total):
+    print(f"\r{copied}/{total} pages", end='', file=sys.stderr, flush=True)
+
+
+def run_backup(db, args):
+    pages = maintenance.backup(db.database, args.path, on_progress=_progress)
+    print(file=sys.stderr)
+    print(f"Backed up {pages} pages to {args.path}")
+    return 0
+
+
+def run_snapshot(db, args):
+    if not args.list:
+        path = maintenance.snapshot(db.database, keep=args.keep, on_progress=_progress)
+        print(file=sys.stderr)
+        print(f"Saved {path}")
+        return 0
+    for path in maintenance.snapshots(db.database):
+        print(path)
+    return 0
+
+
+def run_restore(db, args):
+    maintenance.restore(db.connection, args.path)
+    # An older snapshot is brought up to the current schema.
+    migrate(db.connection)
+    print(f"Restored {args.path}")
+    return 0
+
+
+def run_maintain(db, args):
+    report = maintenance.maintain(db.database, full=args.full)
+    print(f"{report.pages_before} pages before, {report.pages_after} after; "
+          f"{report.freed_bytes // 1024} KB freed, statistics refreshed")
+    if not report.incremental:
+        print("Run maintain --full once to release free pages from now on", file=sys.stderr)
+    return 0
+
+
+def build_parser(prog='python -m ssis'):
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument('--database-dir', default=DEFAULT_DATABASE_DIR,
+                        help="directory holding Student_Table.db")
+    common.add_argument('--server', metavar='URL',
+                        help="use the database shared by 'serve' at URL, e.g. http://127.0.0.1:8765")
+
+    local = argparse.ArgumentParser(add_help=False)
+    local.add_argument('--database-dir', default=DEFAULT_DATABASE_DIR,
+                       help="directory holding Student_Table.db")
+    local.set_defaults(server=None, kind=None)
+
+    parser = argparse.ArgumentParser(prog=prog, description="Simple Student Information System.")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    gui = commands.add_parser('gui', parents=[common], help="open the main window")
+    gui.add_argument('--startup-time', action='store_true',
+                     help="print how long the window took to paint and show its first rows, then quit")
+    gui.set_defaults(run=run_gui, kind=None)
+
+    server = commands.add_parser('serve', help="share the database with other workstations over HTTP")
+    server.add_argument('--database-dir', default=DEFAULT_DATABASE_DIR, help="directory holding Student_Table.db")
+    server.add_argument('--host', default=DEFAULT_HOST, help="address to listen on")
+    server.add_argument('--port', type=int, default=DEFAULT_PORT, help="port to listen on, 0 for any free port")
+    server.add_argument('--readers', type=int, default=READERS, help="read connections to keep open")
+    server.set_defaults(run=run_serve, kind=None)
+
+    tables = {}
+    for kind in ('students', 'courses'):
+        table = commands.add_parser(kind, help=f"list, search and edit {kind}")
+        actions = tables[kind] = table.add_subparsers(dest='action', required=True)
+
+        listing = actions.add_parser('list', parents=[common], help=f"print {kind} as CSV")
+        listing.add_argument('--filter', default='', help="only rows containing this text")
+        listing.add_argument('--field', help="column the filter applies to" + (
+            ", or Query for a compound filter" if kind == 'students' else ''))
+        listing.add_argument('--limit', type=int, default=-1)
+        listing.add_argument('--plan', action='store_true', help="print the query plan instead of the rows")
+        listing.set_defaults(run=run_list, kind=kind)
+
+        search = actions.add_parser('search', parents=[common], help=f"print the best matching {kind}")
+        search.add_argument('text')
+        search.add_argument('--limit', type=int, default=50)
+        search.set_defaults(run=run_search, kind=kind)
+
+    students = tables['students']
+    show = students.add_parser('show', parents=[common], help="print one student")
+    show.add_argument('key', metavar='student_id')
+    show.set_defaults(run=run_show, kind='students')
+
+    for action, run in (('add', run_student_add), ('update', run_student_update)):
+        edit = students.add_parser(action, parents=[common], help=f"{action} a student")
+        edit.add_argument('student_id')
+        edit.add_argument('name')
+        edit.add_argument('gender', choices=GENDERS)
+        edit.add_argument('year', choices=YEARS)
+        edit.add_argument('course_code', nargs='?', help="omit for no course")
+        edit.set_defaults(run=run, kind='students')
+
+    check = students.add_parser('check', parents=[common],
+                                help="check a new student's ID and look for students with a similar name")
+    check.add_argument('student_id')
+    check.add_argument('name')
+    check.set_defaults(run=run_student_check, kind='students')
+
+    delete = students.add_parser('delete', parents=[common], help="delete a student")
+    delete.add_argument('key', metavar='student_id')
+    delete.set_defaults(run=run_student_delete, kind='students')
+
+    courses = tables['courses']
+    show = courses.add_parser('show', parents=[common], help="print one course")
+    show.add_argument('key', metavar='code')
+    show.set_defaults(run=run_show, kind='courses')
+
+    add = courses.add_parser('add', parents=[common], help="add a course")
+    add.add_argument('code')
+    add.add_argument('name')
+    add.set_defaults(run=run_course_add, kind='courses')
+
+    rename = courses.add_parser('rename', parents=[common], help="change a course code, moving its students")
+    rename.add_argument('code')
+    rename.add_argument('new_code')
+    rename.add_argument('--dry-run', action='store_true', help="only report how many students would move")
+    rename.set_defaults(run=run_course_rename, kind='courses')
+
+    delete = courses.add_parser('delete', parents=[common], help="delete a course, unassigning its students")
+    delete.add_argument('code')
+    delete.add_argument('--dry-run', action='store_true', help="only report how many students are enrolled")
+    delete.set_defaults(run=run_course_delete, kind='courses')
+
+    bulk_import = commands.add_parser('import', parents=[common], help="bulk import a .csv or .xlsx file")
+    bulk_import.add_argument('kind', choices=('students', 'courses'))
+    bulk_import.add_argument('path', help=".csv or .xlsx file with a header row")
+    bulk_import.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+    bulk_import.add_argument('--rejects', help="write rejected rows to this CSV file")
+    bulk_import.set_defaults(run=run_import)
+
+    export = commands.add_parser('export', parents=[common], help="export to .csv, .csv.gz or .parquet")
+    export.add_argument('kind', choices=('students', 'courses'))
+    export.add_argument('path', help=".csv, .csv.gz or .parquet file to write")
+    export.add_argument('--filter', default='', help="only export rows containing this text")
+    export.add_argument('--field', help="column the filter applies to (default: All for students, Code for "
+                                        "courses), or Query for a compound student filter")
+    export.set_defaults(run=run_export)
+
+    report = commands.add_parser('report', parents=[common], help="count students per course, year or gender")
+    report.add_argument('--by', choices=('course', *REPORT_FIELDS), default='course')
+    report.set_defaults(run=run_report, kind=None)
+
+    statistics = commands.add_parser('statistics', parents=[common],
+                                     help="check or rebuild the summary counts behind report")
+    statistics.add_argument('action', choices=('check', 'rebuild'))
+    statistics.set_defaults(run=run_statistics, kind=None)
+
+    changes = commands.add_parser('changes', help="read, compact or truncate the log of changes").add_subparsers(
+        dest='action', required=True)
+    listing = changes.add_parser('list', parents=[common], help="print the changes after a Seq as CSV")
+    listing.add_argument('--since', type=int, metavar='SEQ', help="last Seq already seen (default: print all)")
+    listing.add_argument('--limit', type=int, default=-1)
+    listing.add_argument('--table', choices=('students', 'courses'))
+    listing.add_argument('--key', help="only changes to the student or course with this key")
+    listing.set_defaults(run=run_changes_list, kind='changes')
+
+    compact = changes.add_parser('compact', parents=[common],
+                                 help="drop the changes a later change to the same row supersedes")
+    compact.add_argument('--before', type=int, metavar='SEQ', help="only look at changes before this Seq")
+    compact.set_defaults(run=run_changes_compact, kind='changes')
+
+    truncate = changes.add_parser('truncate', parents=[common], help="drop all changes before a Seq")
+    truncate.add_argument('--before', type=int, required=True, metavar='SEQ')
+    truncate.set_defaults(run=run_changes_truncate, kind='changes')
+
+    backup = commands.add_parser('backup', parents=[local], help="copy the database while it is in use")
+    backup.add_argument('path', help="file to write")
+    backup.set_defaults(run=run_backup)
+
+    snapshot = commands.add_parser('snapshot', parents=[local],
+                                   help=f"back the database up into the {maintenance.SNAPSHOT_DIR} directory")
+    snapshot.add_argument('--keep', type=int, default=maintenance.SNAPSHOT_KEEP,
+                          help="snapshots to keep, the oldest are deleted")
+    snapshot.add_argument('--list', action='store_true', help="print the snapshots instead of taking one")
+    snapshot.set_defaults(run=run_snapshot)
+
+    restore = commands.add_parser('restore', parents=[local], help="replace the database with a snapshot or backup")
+    restore.add_argument('path', help="snapshot or backup file")
+    restore.set_defaults(run=run_restore)
+
+    maintain = commands.add_parser('maintain', parents=[local],
+                                   help="release free pages and refresh the query planner's statistics")
+    maintain.add_argument('--full', action='store_true',
+                          help="rebuild the whole file with VACUUM, turning on incremental vacuuming")
+    maintain.set_defaults(run=run_maintain)
+
+    return parser
+
+
+def main(argv=None, prog='python -m ssis'):
+    args = build_parser(prog).parse_args(argv)
+    if args.run in (run_gui, run_serve):
+        return args.run(args)
+
+    if enable_from_environment(args.database_dir):
+        profiler.add_listener(lambda operation: print(operation.summary(), file=sys.stderr))
+
+    try:
+        db, repositories = _repositories(args)
+    except OSError as error:
+        print(f"Cannot reach {args.server}: {error}", file=sys.stderr)
+        return 2
+    try:
+        if args.run in (run_backup, run_snapshot, run_restore, run_maintain):
+            target = db
+        else:
+            target = repositories if args.kind is None else repositories[args.kind]
+        with profiler.operation(' '.join(filter(None, (args.command, getattr(args, 'action', None))))):
+            return args.run(target, args)
+    except sqlite3.IntegrityError as error:
+        print(f"Rejected: {error}", file=sys.stderr)
+        return 1
+    except (OSError, ValueError, ImportError, RemoteError, sqlite3.DatabaseError) as error:
+        print(error, file=sys.stderr)
+        return 2
+    finally:
+        db.close()
@@ -0,0 +1,291 @@
+"""Repositories backed by a database shared through ssis.server.
+
+RemoteDatabase stands in for Database: reads are the same SQL the local
+repositories, models and exports run, sent to the server's reader pool, and
+writes go through RemoteStudentRepository and RemoteCourseRepository to its
+writer queue. sync() reads the database's change_log from where the last
+call stopped and publishes every change committed since, by this client or
+any other, on the EventBus, so views update as they do for local writes.
+Only the standard library is used.
+"""
+
+import http.client
+import io
+import json
+import os.path
+import sqlite3
+from urllib.parse import quote, urlencode, urlsplit
+
+from ssis import audit, events
+from ssis.importer import BATCH_SIZE, ImportReport
+from ssis.repository import ChangeLogRepository, CourseChange, CourseRepository, EditConflict, StudentRepository
+from ssis.server import TOKEN_VARIABLE
+
+TIMEOUT = 300
+# The fewest rows a fetchmany() after the first asks the server for. Each
+# request is a round trip, so batches much smaller than this make a long
+# export slow.
+FETCH_ROWS = 10000
+# Errors the server reports that are raised as the local exception of that name.
+ERRORS = {
+    'IntegrityError': sqlite3.IntegrityError,
+    'DatabaseError': sqlite3.DatabaseError,
+    'OperationalError': sqlite3.OperationalError,
+    'ProgrammingError': sqlite3.ProgrammingError,
+    'ValueError': ValueError,
+    'ChangesTruncated': audit.ChangesTruncated,
+}
+# The events published for the operations in the change_log.
+OPERATIONS = {'INSERT': events.INSERT, 'UPDATE': events.UPDATE, 'DELETE': events.DELETE}
+
+
+class RemoteError(Exception):
+    """An error the server reported that has no local counterpart."""
+
+
+class RemoteCursor:
+    """The rows of one statement, requested from the server when first fetched.
+
+    A fetchmany() or fetchone() first asks for only that many rows. Later
+    ones ask for the next FETCH_ROWS rows or more, so reading a large result
+    through fetchmany() holds at most one batch at a time; fetchall() asks
+    for all of the rest. The batches after the first come from a cursor the
+    server keeps open, reading the same snapshot as the first, so writes made
+    in between do not show; close() a cursor that is not read to the end.
+    """
+
+    def __init__(self, connection, sql, params):
+        self._connection = connection
+        self._sql = sql
+        self._params = list(params)
+        self._rows = []
+        self._cursor = None
+        self._started = False
+        self._complete = False
+
+    def _fill(self, size):
+        if self._complete or len(self._rows) >= size >= 0:
+            return
+        if self._started:
+            limit = -1 if size < 0 else max(size - len(self._rows), FETCH_ROWS)
+            answer = self._connection.request('POST', f'/query/{self._cursor}', {'limit': limit})
+        else:
+            answer = self._connection.request('POST', '/query', {
+                'sql': self._sql, 'params': self._params, 'limit': size})
+            self._started = True
+        self._rows.extend(tuple(row) for row in answer['rows'])
+        self._cursor = answer['cursor']
+        self._complete = self._cursor is None
+
+    def fetchmany(self, size=1):
+        self._fill(size)
+        rows, self._rows = self._rows[:size], self._rows[size:]
+        return rows
+
+    def fetchone(self):
+        rows = self.fetchmany(1)
+        return rows[0] if rows else None
+
+    def fetchall(self):
+        self._fill(-1)
+        rows, self._rows = self._rows, []
+        return rows
+
+    def __iter__(self):
+        return iter(self.fetchall())
+
+    def close(self):
+        self._rows = []
+        self._complete = True
+        if self._cursor is not None:
+            cursor, self._cursor = self._cursor, None
+            self._connection.request('DELETE', f'/query/{cursor}')
+
+
+class RemoteConnection:
+    """A keep-alive HTTP connection to the server, used like a reader sqlite3 connection.
+
+    Like the connections from Database.reader() it can be handed to a worker
+    thread, one thread at a time. Requests carry ``token``, by default the
+    one in the SSIS_TOKEN environment variable.
+    """
+
+    def __init__(self, url, timeout=TIMEOUT, token=None):
+        parts = urlsplit(url)
+        self.token = token if token is not None else os.environ.get(TOKEN_VARIABLE, '')
+        self.actor = audit.default_actor()
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self.timeout = timeout
+        self._http = None
+
+    def request(self, method, path, body=None, params=None, content_type='application/json'):
+        """Send one request and return its decoded JSON answer.
+
+        ``body`` is sent as JSON unless it is bytes or a binary file, which
+        is streamed from where it stands to its end. Errors the server
+        reports are raised as in ERRORS, or as EditConflict or RemoteError.
+        """
+        target = path + (f"?{urlencode(params)}" if params else '')
+        data = body if body is None or isinstance(body, (bytes, io.BufferedIOBase)) else json.dumps(body).encode()
+        headers = {'Content-Type': content_type} if data is not None else {}
+        if isinstance(data, io.BufferedIOBase):
+            # The server reads bodies by their length; http.client would otherwise send a file chunked.
+            headers['Content-Length'] = str(os.fstat(data.fileno()).st_size - data.tell())
+        headers['Authorization'] = f"Bearer {self.token}"
+        if self.actor:
+            # Who the server records the changes this request makes as.
+            headers['X-SSIS-Actor'] = quote(self.actor)
+        # Only reads are retried: a write that was sent may have been applied,
+        # and a cursor that was fetched from may have moved on.
+        retry = method == 'GET' or path == '/query'
+        while True:
+            if self._http is None:
+                self._http = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+            try:
+                self._http.request(method, target, body=data, headers=headers)
+                response = self._http.getresponse()
+                payload = json.loads(response.read())
+                break
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                self.close()
+                if not retry:
+                    raise
+                retry = False
+        if response.status >= 400:
+            if payload.get('error') == 'EditConflict':
+                raise EditConflict(payload['student_ids'])
+            raise ERRORS.get(payload.get('error'), RemoteError)(payload.get('message'))
+        return payload
+
+    def execute(self, sql, params=()):
+        return RemoteCursor(self, sql, params)
+
+    def interrupt(self):
+        # A statement already sent runs to completion on the server; callers
+        # that interrupt discard its result anyway.
+        pass
+
+    def close(self):
+        if self._http is not None:
+            self._http.close()
+            self._http = None
+
+
+class RemoteDatabase:
+    """The server at ``url``, used where the application expects a Database.
+
+    Changes committed on the server are published on ``bus`` by sync().
+    ``token`` is the server's, by default the one in SSIS_TOKEN. It has no
+    transaction(): writes go through the Remote repositories below, and
+    code that would write to it directly raises RemoteError instead.
+    """
+
+    def __init__(self, url, bus=None, token=None):
+        self.url = url
+        self.bus = bus
+        self.token = token
+        self.connection = RemoteConnection(url, token=token)
+        self._seq = self.connection.request('GET', '/changes')['last']
+
+    def execute(self, sql, params=()):
+        return self.connection.execute(sql, params)
+
+    def reader(self):
+        return RemoteConnection(self.url, token=self.token)
+
+    def sync(self):
+        """Publish the changes committed since the last sync; returns how many there were."""
+        state = self.connection.request('GET', '/changes', params={'since': self._seq})
+        self._seq = state['last']
+        if self.bus is not None:
+            if state['reset']:
+                self.bus.publish('courses', events.RESET)
+                self.bus.publish('students', events.RESET)
+            for table, operations in state['bulk'].items():
+                if operations == ['INSERT']:
+                    self.bus.publish(table, events.INSERT_MANY)
+                elif operations == ['UPDATE']:
+                    self.bus.publish(table, events.UPDATE_MANY)
+                else:
+                    self.bus.publish(table, events.RESET)
+            for table, operation, rowid in state['changes']:
+                self.bus.publish(table, OPERATIONS[operation], rowid)
+        return state['count']
+
+    def close(self):
+        self.connection.close()
+
+
+class _RemoteWrites:
+    def _write(self, method, path, body=None, params=None, content_type='application/json'):
+        result = self.db.connection.request(method, path, body, params, content_type)
+        self.db.sync()
+        return result
+
+    def import_file(self, path, batch_size=BATCH_SIZE, rejects_path=None, on_progress=None, **options):
+        """Send ``path`` to the server to import; rejected rows cannot be written to a file."""
+        if rejects_path:
+            raise ValueError("Rejected rows are not written to a file when importing through a server")
+        with open(path, 'rb') as file:
+            result = self._write('POST', f'/{self.table}/import', file,
+                                 {'filename': os.path.basename(path), 'batch_size': batch_size},
+                                 'application/octet-stream')
+        report = ImportReport()
+        report.rows_read = result['rows_read']
+        report.inserted = result['inserted']
+        report.rejected_count = result['rejected_count']
+        report.rejected = [tuple(rejection) for rejection in result['rejected']]
+        if on_progress is not None:
+            on_progress(report)
+        return report
+
+
+class RemoteStudentRepository(_RemoteWrites, StudentRepository):
+    """StudentRepository whose writes are made by the server; see StudentRepository for each."""
+
+    def add(self, student_id, student_name, gender, year, course_code=None):
+        return self._write('POST', '/students', {
+            'StudentID': student_id, 'StudentName': student_name, 'Gender': gender, 'Year': year,
+            'CourseCode': course_code})['rowid']
+
+    def update(self, student_id, student_name, gender, year, course_code=None):
+        return self._write('PUT', f'/students/{quote(student_id, safe="")}', {
+            'StudentName': student_name, 'Gender': gender, 'Year': year, 'CourseCode': course_code})['rowid']
+
+    def delete(self, student_id):
+        return self._write('DELETE', f'/students/{quote(student_id, safe="")}')['rowid']
+
+    def write(self, rows, expected=None):
+        return self._write('POST', '/students/write', {'rows': rows, 'expected': expected})['written']
+
+    def rebuild_statistics(self):
+        return self._write('POST', '/statistics/rebuild')['rows']
+
+
+class RemoteChangeLogRepository(_RemoteWrites, ChangeLogRepository):
+    """ChangeLogRepository whose compact and truncate are made by the server."""
+
+    def compact(self, before=None):
+        return self._write('POST', '/changelog/compact', {'before': before})['deleted']
+
+    def truncate(self, before):
+        return self._write('POST', '/changelog/truncate', {'before': before})['deleted']
+
+
+class RemoteCourseRepository(_RemoteWrites, CourseRepository):
+    """CourseRepository whose writes are made by the server; see CourseRepository for each."""
+
+    def add(self, code, name):
+        return self._write('POST', '/courses', {'Code': code, 'Name': name})['rowid']
+
+    def delete(self, code, dry_run=False):
+        if dry_run:
+            # Only reads, so it is sent to a reader rather than queued behind the writes.
+            return super().delete(code, dry_run=True)
+        return CourseChange(**self._write('DELETE', f'/courses/{quote(code, safe="")}'))
+
+    def rename(self, code, new_code, dry_run=False):
+        if dry_run:
+            return super().rename(code, new_code, dry_run=True)
+        return CourseChange(**self._write('POST', f'/courses/{quote(code, safe="")}/rename', {'new_code': new_code}))
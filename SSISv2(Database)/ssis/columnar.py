@@ -0,0 +1,407 @@
+"""The student roster held in memory column by column, for filters that never touch the disk.
+
+Gender, Year and CourseCode take a handful of values each, so they are
+stored dictionary-encoded: one small integer per student, plus the sorted
+positions of the students holding each value. StudentName strings are
+interned, so repeated names share one object. An equality filter reads a
+value's positions directly. Several of them combine by probing the
+smallest candidate list against the other columns' codes, or, when every
+term is dense, by mapping whole code columns through bytes.translate() and
+intersecting them as integer bitmasks, so the per-row work happens in C.
+
+The roster is loaded once and follows the writes published on an EventBus
+the way PagedTableModel does: single-row changes are read back by rowid and
+patched in, appends are read past the last known rowid, and anything
+larger reloads the roster before its next use.
+"""
+
+import bisect
+import heapq
+import sys
+from array import array
+from itertools import chain, compress, islice
+from operator import itemgetter
+
+from ssis import events
+from ssis.filters import Group
+from ssis.schema import STUDENT_COLUMNS
+from ssis.sorting import STUDENT_SORT_KEYS
+
+CODED_FIELDS = ('Gender', 'Year', 'CourseCode')
+TEXT_FIELDS = ('StudentID', 'StudentName')
+LOAD_BATCH = 10000
+# A combination of filters whose smallest term holds at least this share of
+# the roster is intersected as bitmasks instead of probed row by row.
+DENSE_FRACTION = 1 / 16
+# Sorting more than this share of the roster filters the cached full order instead.
+PERMUTATION_FRACTION = 1 / 8
+# Rows changed since a text column's search blob was built, beyond which it is rebuilt.
+STALE_TEXT_LIMIT = 1000
+
+
+def _discard(positions, position):
+    index = bisect.bisect_left(positions, position)
+    if index < len(positions) and positions[index] == position:
+        del positions[index]
+
+
+def _probe(candidates, column, codes):
+    """Keep the ``candidates`` whose code in ``column`` is one of ``codes``, without a Python-level loop."""
+    allowed = bytearray(max(len(column.values), 256))
+    for code in codes:
+        allowed[code] = 1
+    if isinstance(column.codes, bytearray) and len(candidates) > 1:
+        # Gather the candidates' codes in one call and map them to 0/1 flags.
+        return list(compress(candidates, bytes(itemgetter(*candidates)(column.codes)).translate(allowed)))
+    return list(compress(candidates, map(allowed.__getitem__, map(column.codes.__getitem__, candidates))))
+
+
+def _union(postings):
+    """Merge ascending position lists that share no position."""
+    if len(postings) == 1:
+        return postings[0]
+    return sorted(chain.from_iterable(postings))
+
+
+def _unique(positions):
+    last = None
+    for position in positions:
+        if position != last:
+            yield position
+            last = position
+
+
+def select_conditions(node):
+    """Return the select() conditions for ``node``, a filter from ssis.filters.parse_filter, or None.
+
+    Only equalities on CODED_FIELDS joined by AND have conditions; two
+    different values for one field select nobody.
+    """
+    conditions = {}
+    pending = [node]
+    while pending:
+        term = pending.pop()
+        if isinstance(term, Group):
+            if term.operator != 'AND':
+                return None
+            pending.extend(term.terms)
+        elif term.operator != '=' or term.field not in CODED_FIELDS:
+            return None
+        elif conditions.setdefault(term.field, term.value) != term.value:
+            conditions[term.field] = ()
+    return conditions
+
+
+class _CodedColumn:
+    """A dictionary-encoded column; code 0 stands for NULL.
+
+    ``codes`` holds a code per row, as a bytearray until there are more
+    than 256 values. ``rows[code]`` lists the live rows with that value in
+    ascending order.
+    """
+
+    __slots__ = ('values', 'index', 'codes', 'rows')
+
+    def __init__(self, values):
+        self.values = [None, *sorted({value for value in values if value is not None})]
+        self.index = {value: code for code, value in enumerate(self.values)}
+        self.rows = [array('I') for _ in self.values]
+        self.codes = bytearray() if len(self.values) <= 256 else array('I')
+        self.codes.extend(map(self.index.__getitem__, values))
+        for position, code in enumerate(self.codes):
+            self.rows[code].append(position)
+
+    def _add(self, value):
+        code = self.index[value] = len(self.values)
+        self.values.append(value)
+        self.rows.append(array('I'))
+        if code == 256 and isinstance(self.codes, bytearray):
+            self.codes = array('I', self.codes)
+        return code
+
+    def code(self, value):
+        code = self.index.get(value)
+        return self._add(value) if code is None else code
+
+    def append(self, position, value):
+        code = self.code(value)
+        self.codes.append(code)
+        self.rows[code].append(position)
+
+    def set(self, position, value):
+        old, code = self.codes[position], self.code(value)
+        if old != code:
+            _discard(self.rows[old], position)
+            bisect.insort(self.rows[code], position)
+            self.codes[position] = code
+
+    def remove(self, position):
+        _discard(self.rows[self.codes[position]], position)
+
+    def matching(self, needle):
+        """Codes of the values containing the casefolded ``needle``."""
+        return [code for code, value in enumerate(self.values)
+                if value is not None and needle in value.casefold()]
+
+
+class _TextSearch:
+    """Substring search over a text column through one casefolded string.
+
+    The values are joined with NUL separators and searched with str.find,
+    which skips straight from match to match. Rows changed or appended
+    after the blob was built are checked one by one until there are
+    STALE_TEXT_LIMIT of them and the blob is rebuilt.
+    """
+
+    __slots__ = ('blob', 'starts', 'covered', 'changed')
+
+    def __init__(self, values):
+        folded = [value.casefold() for value in values]
+        self.blob = '\0'.join(folded) + '\0'
+        self.starts = array('Q', [0])
+        for value in folded:
+            self.starts.append(self.starts[-1] + len(value) + 1)
+        self.covered = len(values)
+        self.changed = set()
+
+    def stale(self, size):
+        return len(self.changed) + size - self.covered > STALE_TEXT_LIMIT
+
+    def find(self, needle, values, alive, limit):
+        found = []
+        if '\0' not in needle:
+            blob, starts, changed = self.blob, self.starts, self.changed
+            index = blob.find(needle)
+            while index >= 0 and (limit is None or len(found) < limit):
+                position = bisect.bisect_right(starts, index) - 1
+                if alive[position] and position not in changed:
+                    found.append(position)
+                index = blob.find(needle, starts[position + 1])
+        recent = sorted(self.changed.union(range(self.covered, len(values))))
+        recent = [position for position in recent if alive[position] and needle in values[position].casefold()]
+        if recent:
+            found = list(heapq.merge(found, recent))
+        return found if limit is None else found[:limit]
+
+
+class ColumnarRoster:
+    """Every student of ``db`` in memory, kept current through ``bus``.
+
+    Rows are addressed by position, their place in load order, which is
+    rowid order except for rows added since the load. select() and
+    contains() return ascending positions, order() sorts them as
+    ssis.sorting orders the grid and rows() turns them into the
+    ``(rowid, *STUDENT_COLUMNS)`` tuples the table models use.
+    """
+
+    def __init__(self, db, bus=None):
+        self.db = db
+        self.bus = bus
+        self.load()
+        if bus is not None:
+            bus.subscribe('students', self._students_changed)
+
+    def close(self):
+        if self.bus is not None:
+            self.bus.unsubscribe('students', self._students_changed)
+
+    def load(self):
+        """Read the whole students table."""
+        cursor = self.db.execute(f"SELECT rowid, {', '.join(STUDENT_COLUMNS)} FROM students ORDER BY rowid")
+        rows = []
+        while True:
+            batch = cursor.fetchmany(LOAD_BATCH)
+            if not batch:
+                break
+            rows.extend(batch)
+        columns = list(zip(*rows)) or [()] * (len(STUDENT_COLUMNS) + 1)
+        del rows
+        self.rowids = array('q', columns[0])
+        self.ids = list(columns[1])
+        self.names = list(map(sys.intern, columns[2]))
+        self.coded = {field: _CodedColumn(columns[STUDENT_COLUMNS.index(field) + 1]) for field in CODED_FIELDS}
+        self.alive = bytearray(b'\1') * len(self.rowids)
+        self._positions = {rowid: position for position, rowid in enumerate(self.rowids)}
+        self._searches = {}
+        self._orders = {}
+        self._stale = False
+
+    def _refresh(self):
+        if self._stale:
+            self.load()
+
+    def __len__(self):
+        self._refresh()
+        return len(self._positions)
+
+    def _students_changed(self, change, rowid):
+        if self._stale:
+            return
+        if change in (events.INSERT, events.UPDATE, events.DELETE):
+            self._apply_row_change(rowid)
+        elif change == events.INSERT_MANY:
+            last = max(self._positions, default=0)
+            for row in self.db.execute(f"SELECT rowid, {', '.join(STUDENT_COLUMNS)} FROM students "
+                                       f"WHERE rowid > ? ORDER BY rowid", (last,)).fetchall():
+                self._append(row)
+        else:
+            self._stale = True
+
+    def _apply_row_change(self, rowid):
+        row = self.db.execute(
+            f"SELECT rowid, {', '.join(STUDENT_COLUMNS)} FROM students WHERE rowid = ?", (rowid,)).fetchone()
+        position = self._positions.get(rowid)
+        if position is None:
+            if row is not None:
+                self._append(row)
+            return
+
+        for order in self._orders.values():
+            order.remove(position)
+        if row is None:
+            del self._positions[rowid]
+            self.alive[position] = 0
+            for column in self.coded.values():
+                column.remove(position)
+            return
+
+        for search in self._searches.values():
+            if position < search.covered:
+                search.changed.add(position)
+        self.ids[position] = row[1]
+        self.names[position] = sys.intern(row[2])
+        for field, column in self.coded.items():
+            column.set(position, row[STUDENT_COLUMNS.index(field) + 1])
+        self._reorder(position)
+
+    def _append(self, row):
+        position = len(self.rowids)
+        self.rowids.append(row[0])
+        self.ids.append(row[1])
+        self.names.append(sys.intern(row[2]))
+        for field, column in self.coded.items():
+            column.append(position, row[STUDENT_COLUMNS.index(field) + 1])
+        self.alive.append(1)
+        self._positions[row[0]] = position
+        self._reorder(position)
+
+    def _reorder(self, position):
+        for field, order in self._orders.items():
+            bisect.insort(order, position, key=self._sort_key(field))
+
+    def select(self, conditions, limit=None):
+        """Return the positions of the students matching every ``{field: value or values}`` condition.
+
+        Fields are among CODED_FIELDS; a tuple or list of values matches
+        any of them, and None matches NULL. No conditions selects everyone.
+        """
+        self._refresh()
+        size = len(self.rowids)
+        terms = []
+        for field, values in conditions.items():
+            column = self.coded.get(field)
+            if column is None:
+                raise ValueError(f"Cannot select students by {field!r}")
+            if not isinstance(values, (tuple, list, set, frozenset)):
+                values = (values,)
+            codes = sorted({column.index[value] for value in values if value in column.index})
+            terms.append((sum(len(column.rows[code]) for code in codes), field, column, codes))
+        if not terms:
+            return list(islice(compress(range(size), self.alive), limit))
+        terms.sort()
+        smallest, _, column, codes = terms[0]
+        if not smallest:
+            return []
+
+        if len(terms) > 1 and smallest >= size * DENSE_FRACTION and all(
+                isinstance(term[2].codes, bytearray) for term in terms):
+            mask = int.from_bytes(self.alive, 'little')
+            for _, _, term_column, term_codes in terms:
+                table = bytearray(256)
+                for code in term_codes:
+                    table[code] = 1
+                mask &= int.from_bytes(term_column.codes.translate(table), 'little')
+            return list(islice(compress(range(size), mask.to_bytes(size, 'little')), limit))
+
+        candidates = _union([column.rows[code] for code in codes])
+        for _, _, term_column, term_codes in terms[1:]:
+            candidates = _probe(candidates, term_column, term_codes)
+        return list(candidates[:limit])
+
+    def contains(self, field, text, limit=None):
+        """Return the positions of the students whose ``field`` contains ``text``, ignoring case.
+
+        ``field`` is one of STUDENT_COLUMNS or 'All', as for search.row_matcher().
+        """
+        self._refresh()
+        needle = text.casefold()
+        if field == 'All':
+            found = _unique(heapq.merge(*(self.contains(column, text, limit) for column in STUDENT_COLUMNS)))
+            return list(islice(found, limit))
+        if field in self.coded:
+            column = self.coded[field]
+            codes = column.matching(needle)
+            return list(_union([column.rows[code] for code in codes])[:limit]) if codes else []
+        if field not in TEXT_FIELDS:
+            raise ValueError(f"Unknown student field: {field}")
+        values = self.ids if field == 'StudentID' else self.names
+        search = self._searches.get(field)
+        if search is None or search.stale(len(values)):
+            search = self._searches[field] = _TextSearch(values)
+        return search.find(needle, values, self.alive, limit)
+
+    def _sort_key(self, field):
+        ids = self.ids
+        if field == 'StudentID':
+            return ids.__getitem__
+        if field == 'StudentName':
+            names = self.names
+            return lambda position: (names[position], ids[position])
+        column = self.coded[field]
+        keys = [STUDENT_SORT_KEYS[field].value(value) for value in column.values]
+        codes = column.codes
+        return lambda position: (keys[codes[position]], ids[position])
+
+    def _permutation(self, field):
+        """Every live position in ``field`` order, built on first use and patched as rows change."""
+        order = self._orders.get(field)
+        if order is None:
+            # Stable sorts: by StudentID first, so ties on the field stay in StudentID order.
+            order = sorted(compress(range(len(self.rowids)), self.alive), key=self.ids.__getitem__)
+            if field == 'StudentName':
+                order.sort(key=self.names.__getitem__)
+            elif field in self.coded:
+                column = self.coded[field]
+                keys = [STUDENT_SORT_KEYS[field].value(value) for value in column.values]
+                order.sort(key=[keys[code] for code in column.codes].__getitem__)
+            self._orders[field] = order
+        return order
+
+    def order(self, positions, field=None, descending=False):
+        """Sort ``positions`` by ``field`` then StudentID, like SortOrder; by rowid when ``field`` is None."""
+        self._refresh()
+        if field is None:
+            return sorted(positions, key=self.rowids.__getitem__)
+        if field not in STUDENT_SORT_KEYS:
+            raise ValueError(f"Cannot sort students by {field!r}")
+        if len(positions) > len(self._positions) * PERMUTATION_FRACTION:
+            member = bytearray(len(self.rowids))
+            for position in positions:
+                member[position] = 1
+            ordered = [position for position in self._permutation(field) if member[position]]
+            return ordered[::-1] if descending else ordered
+        return sorted(positions, key=self._sort_key(field), reverse=descending)
+
+    def positions(self, rowids):
+        """Return the positions of the students with ``rowids``, leaving out any not held."""
+        self._refresh()
+        held = self._positions
+        return [held[rowid] for rowid in rowids if rowid in held]
+
+    def rows(self, positions):
+        """Return the ``(rowid, *STUDENT_COLUMNS)`` rows at ``positions``."""
+        rowids, ids, names = self.rowids, self.ids, self.names
+        gender, year, course = (self.coded[field] for field in ('Gender', 'Year', 'CourseCode'))
+        return [(rowids[position], ids[position], names[position], gender.values[gender.codes[position]],
+                 year.values[year.codes[position]], course.values[course.codes[position]])
+                for position in positions]
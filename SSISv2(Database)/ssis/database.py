@@ -0,0 +1,147 @@
+"""Long-lived SQLite connection shared by the whole application."""
+
+import os.path
+import sqlite3
+from contextlib import contextmanager
+from urllib.parse import quote
+
+from ssis.instrumentation import profiler
+
+PRAGMAS = (
+    # Only takes effect on a new file, or at the next VACUUM of an existing one.
+    "PRAGMA auto_vacuum=INCREMENTAL",
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA mmap_size=268435456",
+    "PRAGMA cache_size=-65536",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA foreign_keys=ON",
+)
+
+STATEMENT_CACHE_SIZE = 256
+
+# The database files live next to the application script, one level above the package.
+DEFAULT_DATABASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class Connection(sqlite3.Connection):
+    """sqlite3.Connection that can be weakly referenced, so the profiler can track it."""
+
+
+# What statements run on a reader may do: read, and nothing else.
+READER_ACTIONS = (sqlite3.SQLITE_SELECT, sqlite3.SQLITE_READ, sqlite3.SQLITE_FUNCTION, sqlite3.SQLITE_RECURSIVE)
+
+
+def connect(path, check_same_thread=True, uri=False):
+    """Open ``path`` in autocommit mode with the application's pragmas applied.
+
+    Transactions are opened explicitly through transaction(), and sqlite3
+    keeps up to STATEMENT_CACHE_SIZE prepared statements per connection so
+    repeated queries skip the parse/plan step.
+    """
+    connection = sqlite3.connect(path, isolation_level=None, cached_statements=STATEMENT_CACHE_SIZE,
+                                 check_same_thread=check_same_thread, factory=Connection, uri=uri)
+    for pragma in PRAGMAS:
+        connection.execute(pragma)
+    profiler.attach(connection)
+    return connection
+
+
+def _authorize_read(action, argument, detail, database, trigger):
+    if action in READER_ACTIONS:
+        return sqlite3.SQLITE_OK
+    # FTS5 asks for these itself when a reader first opens its tables. The
+    # file is opened read-only and sqlite_master cannot be written by
+    # statements anyway, so neither lets a statement change anything.
+    if action == sqlite3.SQLITE_PRAGMA and argument == 'data_version' and detail is None:
+        return sqlite3.SQLITE_OK
+    if action == sqlite3.SQLITE_UPDATE and argument == 'sqlite_master':
+        return sqlite3.SQLITE_OK
+    return sqlite3.SQLITE_DENY
+
+
+@contextmanager
+def transaction(connection):
+    """Run the enclosed statements on ``connection`` as one transaction.
+
+    Inside a transaction that is already open they run as a savepoint
+    instead: a failure undoes only them and the outer transaction goes on.
+    """
+    if connection.in_transaction:
+        connection.execute("SAVEPOINT nested")
+        try:
+            yield connection
+        except BaseException:
+            connection.execute("ROLLBACK TO nested")
+            connection.execute("RELEASE nested")
+            raise
+        connection.execute("RELEASE nested")
+        return
+    connection.execute("BEGIN IMMEDIATE")
+    try:
+        yield connection
+    except BaseException:
+        connection.execute("ROLLBACK")
+        raise
+    connection.execute("COMMIT")
+
+
+def write_transaction(db):
+    """Return ``db.transaction()``, for writes made on this side of the connection.
+
+    A RemoteDatabase has no transaction(): its writes are made by the
+    server, through the Remote repositories. Anything else that tries to
+    write to it gets a RemoteError saying so.
+    """
+    if not hasattr(db, 'transaction'):
+        from ssis.client import RemoteError
+
+        raise RemoteError(f"{type(db).__name__} is written through the server; "
+                          f"use the Remote repositories in ssis.client for this")
+    return db.transaction()
+
+
+class Database:
+    """Opens the student database once, upgrading its schema if needed.
+
+    Students and courses share Student_Table.db. A Course_Table.db left over
+    from before the unified schema is read once by the migration and is not
+    used afterwards. Changes written in its transaction() are logged as
+    made by ``actor``, by default the logged-in user (see ssis.audit).
+    """
+
+    def __init__(self, database_dir=DEFAULT_DATABASE_DIR, actor=None):
+        from ssis.audit import default_actor
+        from ssis.schema import migrate
+
+        self.database = os.path.join(database_dir, 'Student_Table.db')
+        self.legacy_course_database = os.path.join(database_dir, 'Course_Table.db')
+        self.actor = default_actor() if actor is None else actor
+
+        self.connection = connect(self.database)
+        migrate(self.connection, self.legacy_course_database)
+
+    def execute(self, sql, params=()):
+        return self.connection.execute(sql, params)
+
+    def transaction(self):
+        from ssis.audit import attributed
+
+        return attributed(self.connection, self.actor)
+
+    def reader(self):
+        """Open an extra read-only connection for use from a worker thread.
+
+        WAL lets it read while the shared connection writes, and its
+        interrupt() can cancel a running query from the GUI thread. The
+        file is opened read-only and an authorizer refuses every statement
+        but a query, so SQL sent to the server's /query cannot write,
+        ATTACH another file or change a PRAGMA.
+        """
+        connection = connect(f"file:{quote(os.path.abspath(self.database))}?mode=ro", check_same_thread=False,
+                             uri=True)
+        connection.set_authorizer(_authorize_read)
+        return connection
+
+    def close(self):
+        self.connection.close()
@@ -0,0 +1,34 @@
+"""Change notifications passed from writers to the views that show the data."""
+
+from collections import defaultdict
+
+INSERT = 'insert'
+UPDATE = 'update'
+DELETE = 'delete'
+INSERT_MANY = 'insert_many'
+UPDATE_MANY = 'update_many'
+RESET = 'reset'
+
+
+class EventBus:
+    """Minimal publish/subscribe hub for committed row changes.
+
+    Writers publish ``(table, change, rowid)`` once a change is committed.
+    INSERT, UPDATE and DELETE name the single row affected by its rowid;
+    INSERT_MANY means rows were appended after the existing ones, UPDATE_MANY
+    that existing rows changed in place, and RESET that anything may have
+    changed. The bulk changes carry no rowid.
+    """
+
+    def __init__(self):
+        self._subscribers = defaultdict(list)
+
+    def subscribe(self, table, callback):
+        self._subscribers[table].append(callback)
+
+    def unsubscribe(self, table, callback):
+        self._subscribers[table].remove(callback)
+
+    def publish(self, table, change, rowid=None):
+        for callback in list(self._subscribers[table]):
+            callback(change, rowid)
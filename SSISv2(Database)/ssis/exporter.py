@@ -0,0 +1,144 @@
+"""Streaming export of query results to CSV, gzip-compressed CSV or Parquet.
+
+Rows are pulled from the cursor with fetchmany() and written as they arrive,
+so memory use does not grow with the size of the result. The format follows
+the file extension: .csv, .csv.gz, or .parquet (which needs pyarrow and is
+written in row groups of ROW_GROUP_SIZE rows). CSV files write NULL as
+NOT_APPLICABLE, as the grid and the command line show it, and import it
+back as NULL; Parquet keeps real nulls.
+
+Usage: python -m ssis export {students,courses} FILE [--filter TEXT] [--field FIELD]
+"""
+
+import csv
+import gzip
+import os
+import sys
+
+from ssis.instrumentation import profiler
+from ssis.schema import NOT_APPLICABLE
+
+FETCH_SIZE = 2000
+ROW_GROUP_SIZE = 65536
+
+
+class ExportCancelled(Exception):
+    pass
+
+
+def export_format(path):
+    lowered = path.lower()
+    if lowered.endswith('.parquet'):
+        return 'parquet'
+    if lowered.endswith('.csv.gz'):
+        return 'csv.gz'
+    return 'csv'
+
+
+class _CsvSink:
+    def __init__(self, path, columns, compressed):
+        if compressed:
+            self.file = gzip.open(path, 'wt', newline='', encoding='utf-8')
+        else:
+            self.file = open(path, 'w', newline='', encoding='utf-8')
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(columns)
+
+    def write(self, rows):
+        self.writer.writerows(rows)
+
+    def close(self):
+        self.file.close()
+
+
+class _ParquetSink:
+    def __init__(self, path, columns):
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            raise ImportError("Exporting .parquet files requires the pyarrow package") from None
+        self.pyarrow = pyarrow
+        self.columns = columns
+        schema = pyarrow.schema([(column, pyarrow.string()) for column in columns])
+        self.writer = pyarrow.parquet.ParquetWriter(path, schema, compression='zstd')
+        self.pending = []
+
+    def write(self, rows):
+        self.pending.extend(rows)
+        if len(self.pending) >= ROW_GROUP_SIZE:
+            self._flush()
+
+    def _flush(self):
+        if self.pending:
+            arrays = [self.pyarrow.array(column, type=self.pyarrow.string()) for column in zip(*self.pending)]
+            self.writer.write_batch(self.pyarrow.record_batch(arrays, names=list(self.columns)))
+            self.pending = []
+
+    def close(self):
+        self._flush()
+        self.writer.close()
+
+
+def _open_sink(path, columns):
+    format = export_format(path)
+    if format == 'parquet':
+        return _ParquetSink(path, columns)
+    return _CsvSink(path, columns, compressed=format == 'csv.gz')
+
+
+def _select_list(columns, format):
+    if format == 'parquet':
+        return ', '.join(columns)
+    # Substituted by SQLite rather than row by row in Python.
+    return ', '.join(f"ifnull({column}, '{NOT_APPLICABLE}')" for column in columns)
+
+
+def export_query(connection, table, columns, where, params, path, on_progress=None, is_cancelled=None,
+                 order_by='rowid'):
+    """Write the ``columns`` of ``table`` rows matching ``where`` to ``path``, ordered by ``order_by``.
+
+    ``order_by`` is an ORDER BY clause, such as ssis.sorting.SortOrder
+    gives for the order a grid shows. ``on_progress(rows_written)`` is
+    called after every fetched batch; when ``is_cancelled()`` returns true
+    the partial file is removed and ExportCancelled is raised. Returns the
+    number of rows written.
+    """
+    cursor = connection.execute(
+        f"SELECT {_select_list(columns, export_format(path))} FROM {table} WHERE {where or '1'} ORDER BY {order_by}",
+        params)
+    sink = _open_sink(path, columns)
+    written = 0
+    try:
+        while True:
+            if is_cancelled is not None and is_cancelled():
+                raise ExportCancelled()
+            rows = cursor.fetchmany(FETCH_SIZE)
+            if not rows:
+                break
+            profiler.rows(len(rows))
+            sink.write(rows)
+            written += len(rows)
+            if on_progress is not None:
+                on_progress(written)
+    except BaseException:
+        cursor.close()
+        sink.close()
+        os.remove(path)
+        raise
+    sink.close()
+    return written
+
+
+def count_rows(connection, table, where, params):
+    return connection.execute(f"SELECT count(*) FROM {table} WHERE {where or '1'}", params).fetchone()[0]
+
+
+def main(argv=None):
+    from ssis.cli import main as cli_main
+
+    return cli_main(['export', *(sys.argv[1:] if argv is None else argv)])
+
+
+if __name__ == '__main__':
+    sys.exit(main())
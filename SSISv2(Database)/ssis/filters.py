@@ -0,0 +1,276 @@
+"""Compound student filters: several conditions joined by AND and OR.
+
+A filter is written as text, for instance
+
+    Year = Second AND CourseCode = BSCS
+    StudentID ^= 2021- OR (StudentName ~ "de la" AND Gender = Female)
+
+where ``=`` tests equality, ``^=`` a prefix and ``~`` a case-insensitive
+substring, AND binds tighter than OR and values holding spaces are quoted.
+``N/A`` stands for a student without a course, as the grid shows it.
+Gender and Year hold a few known values and are compared in any case.
+Equality and prefix tests on the other fields are answered from the
+column indexes and so are case-sensitive: ``StudentName ^= ana`` does
+not find Ana.
+
+compile_filter() turns a parsed filter into a parameterized WHERE clause
+that lets SQLite use its indexes: equality and prefix tests go to the
+column indexes, prefixes as a range rather than LIKE, Gender and Year
+only lead when nothing more selective is indexed, prefix and substring
+tests on Gender and Year become equality on the values they match, and
+all the substring tests of a group that the trigram index covers are
+answered by one full-text MATCH. Only substrings shorter than a trigram
+are scanned with LIKE. The clause text depends on the filter's shape and
+not on its values, so it is built once per shape and SQLite's statement
+cache reuses the prepared statement.
+"""
+
+import re
+from collections import namedtuple
+from functools import lru_cache
+
+from ssis.database import STATEMENT_CACHE_SIZE
+from ssis.schema import NOT_APPLICABLE, STUDENT_COLUMNS
+from ssis.search import MIN_INDEXED_LENGTH, STUDENT_ENUMS, STUDENT_FTS_COLUMNS, fts_phrase
+
+Term = namedtuple('Term', 'field operator value')
+Term.__doc__ = """One condition: ``field`` compared with ``value`` by ``operator`` ('=', '^=' or '~')."""
+Group = namedtuple('Group', 'operator terms')
+Group.__doc__ = """Terms and groups joined by ``operator``, 'AND' or 'OR'."""
+
+OPERATORS = ('=', '^=', '~')
+# The filter field under which the grid, the command line and the server take a compound filter.
+QUERY_FIELD = 'Query'
+NO_COURSE = NOT_APPLICABLE
+
+_TOKEN = re.compile(r'\s*(?:(\()|(\))|"((?:[^"]|"")*)"|(\^=|=|~)|([^\s()"=~^]+))')
+# Cheaper tests first within a group: indexed equality, ranges, the
+# full-text lookup, then nested groups and scans.
+_RANK = {'false': 0, 'eq': 1, 'null': 1, 'in': 2, 'prefix': 3, 'from': 3, 'match': 4,
+         'AND': 5, 'OR': 5, 'like': 6}
+
+
+def _tokens(text):
+    position = 0
+    text = text.rstrip()
+    while position < len(text):
+        match = _TOKEN.match(text, position)
+        if match is None or match.end() == position:
+            raise ValueError(f"Cannot read the filter from {text[position:].strip()!r}")
+        position = match.end()
+        opening, closing, quoted, operator, word = match.groups()
+        if opening:
+            yield '(', None
+        elif closing:
+            yield ')', None
+        elif quoted is not None:
+            yield 'value', quoted.replace('""', '"')
+        elif operator:
+            yield 'operator', operator
+        else:
+            yield 'word', word
+
+
+class _Parser:
+    def __init__(self, text):
+        self.tokens = list(_tokens(text))
+        self.position = 0
+
+    def peek(self):
+        return self.tokens[self.position] if self.position < len(self.tokens) else (None, None)
+
+    def take(self):
+        token = self.peek()
+        self.position += 1
+        return token
+
+    def keyword(self, word):
+        kind, value = self.peek()
+        if kind == 'word' and value.upper() == word:
+            self.position += 1
+            return True
+        return False
+
+    def expression(self):
+        terms = [self.conjunction()]
+        while self.keyword('OR'):
+            terms.append(self.conjunction())
+        return terms[0] if len(terms) == 1 else Group('OR', tuple(terms))
+
+    def conjunction(self):
+        terms = [self.term()]
+        while self.keyword('AND'):
+            terms.append(self.term())
+        return terms[0] if len(terms) == 1 else Group('AND', tuple(terms))
+
+    def term(self):
+        kind, value = self.take()
+        if kind == '(':
+            node = self.expression()
+            if self.take()[0] != ')':
+                raise ValueError("Missing ')' in the filter")
+            return node
+        if kind != 'word':
+            raise ValueError("Expected a field name in the filter")
+        fields = {column.casefold(): column for column in STUDENT_COLUMNS}
+        field = fields.get(value.casefold())
+        if field is None:
+            raise ValueError(f"Unknown student field: {value}")
+        kind, operator = self.take()
+        if kind != 'operator':
+            raise ValueError(f"Expected =, ^= or ~ after {field}")
+        kind, text = self.take()
+        if kind not in ('word', 'value'):
+            raise ValueError(f"Expected a value after {field} {operator}")
+        if kind == 'word' and operator == '=' and text.upper() == NO_COURSE:
+            text = None
+        elif operator == '=' and field in STUDENT_ENUMS:
+            text = next((known for known in STUDENT_ENUMS[field] if known.casefold() == text.casefold()), text)
+        return Term(field, operator, text)
+
+
+def parse_filter(text):
+    """Parse ``text`` into a Term or Group; raises ValueError if it is not a filter."""
+    parser = _Parser(text)
+    if parser.peek()[0] is None:
+        raise ValueError("The filter is empty")
+    node = parser.expression()
+    if parser.peek()[0] is not None:
+        raise ValueError(f"Unexpected {parser.peek()[1] or parser.peek()[0]!r} in the filter")
+    return node
+
+
+def _prefix_end(prefix):
+    """Return the smallest string above every string starting with ``prefix``, or None."""
+    while prefix and ord(prefix[-1]) == 0x10ffff:
+        prefix = prefix[:-1]
+    if not prefix:
+        return None
+    return prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+def _term(term, searches):
+    field, operator, value = term
+    if field not in STUDENT_COLUMNS:
+        raise ValueError(f"Unknown student field: {field}")
+    if operator not in OPERATORS:
+        raise ValueError(f"Unknown filter operator: {operator}")
+    if operator == '=':
+        return (('null', field), ()) if value is None else (('eq', field), (value,))
+    if field in STUDENT_ENUMS:
+        needle = value.casefold()
+        values = tuple(known for known in STUDENT_ENUMS[field]
+                       if (known.casefold().startswith(needle) if operator == '^=' else needle in known.casefold()))
+        return (('in', field, len(values)), values) if values else (('false',), ())
+    if operator == '^=':
+        end = _prefix_end(value)
+        return (('from', field), (value,)) if end is None else (('prefix', field), (value, end))
+    if field in STUDENT_FTS_COLUMNS and len(value) >= MIN_INDEXED_LENGTH:
+        searches.append((field, value))
+        return None
+    return ('like', field), ('%' + value + '%',)
+
+
+def _match_expression(searches, operator):
+    """Join the trigram searches of one group into a single FTS5 query."""
+    columns = {}
+    for field, text in searches:
+        columns.setdefault(text, []).append(field)
+    phrases = []
+    for text, fields in columns.items():
+        if operator == 'OR' and set(fields) == set(STUDENT_FTS_COLUMNS):
+            phrases.append(fts_phrase(text))
+        elif operator == 'OR' and len(fields) > 1:
+            phrases.append(fts_phrase(text, '{' + ' '.join(fields) + '}'))
+        else:
+            phrases.extend(fts_phrase(text, field) for field in fields)
+    if len(phrases) == 1:
+        return phrases[0]
+    return f" {operator} ".join(f"({phrase})" for phrase in phrases)
+
+
+def _selective(shape):
+    return shape[0] == 'match' or shape[0] in ('eq', 'null', 'prefix', 'from') and shape[1] not in STUDENT_ENUMS
+
+
+def _unindexed(shape):
+    # Gender and Year hold a handful of values each, so their indexes narrow
+    # the rows far less than any other indexed test. Without statistics the
+    # planner may still pick them; a unary + keeps it from using them.
+    if shape[0] in ('eq', 'null', 'in') and shape[1] in STUDENT_ENUMS:
+        return (shape[0], '+' + shape[1], *shape[2:])
+    return shape
+
+
+def _compile(node):
+    if isinstance(node, Term):
+        node = Group('AND', (node,))
+    operator = node.operator
+    if operator not in ('AND', 'OR'):
+        raise ValueError(f"Unknown filter operator: {operator}")
+    parts = []
+    searches = []
+    pending = list(node.terms)
+    while pending:
+        child = pending.pop(0)
+        if isinstance(child, Group) and child.operator == operator:
+            pending[:0] = child.terms
+            continue
+        compiled = _term(child, searches) if isinstance(child, Term) else _compile(child)
+        if compiled is not None:
+            parts.append(compiled)
+    if searches:
+        parts.append((('match',), (_match_expression(searches, operator),)))
+
+    if operator == 'AND' and any(shape == ('false',) for shape, _ in parts):
+        return ('false',), ()
+    if operator == 'OR':
+        parts = [part for part in parts if part[0] != ('false',)]
+        if not parts:
+            return ('false',), ()
+    if len(parts) == 1:
+        return parts[0]
+    if operator == 'AND' and any(_selective(shape) for shape, _ in parts):
+        parts = [(_unindexed(shape), params) for shape, params in parts]
+    parts.sort(key=lambda part: _RANK[part[0][0]])
+    return (operator, tuple(shape for shape, _ in parts)), tuple(param for _, params in parts for param in params)
+
+
+@lru_cache(maxsize=STATEMENT_CACHE_SIZE)
+def _sql(shape):
+    kind = shape[0]
+    if kind in ('AND', 'OR'):
+        return f" {kind} ".join(f"({_sql(child)})" if child[0] in ('AND', 'OR', 'prefix') else _sql(child)
+                                for child in shape[1])
+    if kind == 'false':
+        return "0"
+    if kind == 'match':
+        return "rowid IN (SELECT rowid FROM students_fts WHERE students_fts MATCH ?)"
+    field = shape[1]
+    if kind == 'eq':
+        return f"{field} = ?"
+    if kind == 'null':
+        return f"{field} IS NULL"
+    if kind == 'in':
+        return f"{field} IN ({', '.join('?' * shape[2])})"
+    if kind == 'prefix':
+        return f"{field} >= ? AND {field} < ?"
+    if kind == 'from':
+        return f"{field} >= ?"
+    return f"{field} LIKE ?"
+
+
+def compile_filter(node):
+    """Return the ``(where, params)`` pair selecting the students that ``node`` matches."""
+    shape, params = _compile(node)
+    return _sql(shape), params
+
+
+def query_plan(connection, sql, params=()):
+    """Return SQLite's plan for ``sql`` on ``connection`` (or a Database) as lines indented by depth."""
+    depths = {0: -1}
+    lines = []
+    for node, parent, _, detail in connection.execute(f"EXPLAIN QUERY PLAN {sql}", params).fetchall():
+        depths[node] = depths.get(parent, -1) + 1
+        lines.append('  ' * depths[node] + detail)
+    return lines
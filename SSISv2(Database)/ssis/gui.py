@@ -0,0 +1,1222 @@
+"""The PyQt6 main window, built on the repositories in ssis.repository."""
+
+import html
+import os.path
+import sqlite3
+import sys
+import time
+
+from PyQt6.QtCore import QStringListModel, Qt, QThreadPool, QTimer, pyqtSignal
+from PyQt6.QtGui import QAction, QKeySequence
+from PyQt6.QtWidgets import (QAbstractItemView, QApplication, QComboBox, QCompleter, QDialog, QDialogButtonBox,
+                             QFileDialog, QFormLayout, QHBoxLayout, QInputDialog, QLabel, QLineEdit, QMainWindow,
+                             QMessageBox, QProgressDialog, QPushButton, QTableView, QTabWidget, QVBoxLayout, QWidget)
+
+from ssis import events, maintenance
+from ssis.catalog import CourseCatalog
+from ssis.client import RemoteCourseRepository, RemoteDatabase, RemoteError, RemoteStudentRepository
+from ssis.columnar import ColumnarRoster, select_conditions
+from ssis.database import DEFAULT_DATABASE_DIR, Database
+from ssis.filters import QUERY_FIELD, compile_filter, parse_filter, query_plan
+from ssis.instrumentation import default_log_path, enable_from_environment, profiler
+from ssis.journal import EditJournal
+from ssis.live_filter import LiveFilter
+from ssis.live_validation import LiveValidator
+from ssis.repository import CourseRepository, EditConflict, StudentRepository
+from ssis.schema import COURSE_COLUMNS, GENDERS, STUDENT_COLUMNS, STUDENT_ID_PATTERN, YEARS
+from ssis.search import course_filter, row_matcher, student_filter
+from ssis.table_models import PagedTableModel, RowsTableModel
+from ssis.validation import ERROR
+from ssis.workers import ExportWorker, MaintenanceWorker
+
+
+class ProfileOverlay(QLabel):
+    """Status bar label showing the last profiled operation.
+
+    Operations can finish on worker threads, so their summaries arrive
+    through a queued signal.
+    """
+
+    operation_finished = pyqtSignal(str)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.operation_finished.connect(self.setText)
+
+    def show_operation(self, operation):
+        self.operation_finished.emit(operation.summary())
+
+
+class TabPlaceholder(QLabel):
+    """Stands in for a tab until it is built; tells when it was first painted."""
+
+    painted = pyqtSignal()
+
+    def __init__(self, parent=None):
+        super().__init__("Loading...", parent)
+        self.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        self._painted = False
+
+    def paintEvent(self, event):
+        super().paintEvent(event)
+        if not self._painted:
+            self._painted = True
+            self.painted.emit()
+
+
+class StartupTimer:
+    """Milestones of one start of the window, in milliseconds since it began (gui --startup-time)."""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.marks = []
+
+    def mark(self, name):
+        self.marks.append((name, (time.perf_counter() - self.start) * 1000))
+
+    def report(self):
+        return "\n".join(f"{name:<16}{elapsed:8.1f} ms" for name, elapsed in self.marks)
+
+
+# How often a window on a shared database picks up other workstations' changes.
+SYNC_INTERVAL_MS = 1000
+# How long after startup a due maintenance run begins, out of the way of the first edits.
+MAINTENANCE_DELAY_MS = 60000
+
+# Set once on the application rather than on each widget; action buttons
+# and tab titles are picked out by object name.
+STYLESHEET = """
+QWidget { background-color: #ffffff; }
+QLabel#title {
+    font-size: 20px; font-weight: bold; color: white; margin-bottom: 10px;
+    background-color: maroon; border-radius: 20px; border: 1px solid black;
+}
+QPushButton#action { background-color: maroon; color: white; border-radius: 5px; }
+QPushButton#action:hover { background-color: #510400; }
+QLabel#validation { color: #8a5a00; }
+"""
+VALIDATION_ERROR_COLOR = '#b00020'
+
+
+class MainWindow(QMainWindow):
+    """The application window.
+
+    It paints before touching the tables: each tab is a placeholder until
+    first shown, and the one visible at startup is built once its
+    placeholder has painted. tab_ready is emitted as each tab is filled.
+    """
+
+    first_painted = pyqtSignal()
+    tab_ready = pyqtSignal(int)
+
+    def __init__(self, database_dir=DEFAULT_DATABASE_DIR, server_url=None):
+        super().__init__()
+        self.setWindowTitle("Student Information System")
+        self.setGeometry(100, 100, 800, 600)
+
+        self.tabs = QTabWidget()
+        self.setCentralWidget(self.tabs)
+
+        self.database_dir = database_dir
+        self.server_url = server_url
+        self.export_workers = set()
+        self.maintenance_workers = set()
+        self.events = events.EventBus()
+        if server_url is None:
+            self.db = Database(self.database_dir)
+            self.courses = CourseRepository(self.db, self.events)
+            self.students = StudentRepository(self.db, self.events)
+        else:
+            self.db = RemoteDatabase(server_url, self.events)
+            self.courses = RemoteCourseRepository(self.db)
+            self.students = RemoteStudentRepository(self.db)
+            self.setWindowTitle(f"Student Information System - {server_url}")
+        self.catalog = CourseCatalog(self.db, self.events)
+        self.journal = EditJournal(self.students)
+        self.course_code_model = QStringListModel(self)
+        self.course_code_model_version = None
+        self.roster = None
+
+        self.course_fields = list(COURSE_COLUMNS)
+        self.student_fields = list(STUDENT_COLUMNS)
+
+        self.initialize_ui()
+
+    def initialize_ui(self):
+        self.profile_overlay = ProfileOverlay(self)
+        self.statusBar().addPermanentWidget(self.profile_overlay)
+        self.profile_overlay.hide()
+        profiler.add_listener(self.profile_overlay.show_operation)
+
+        self.create_menu()
+        if enable_from_environment(self.database_dir):
+            self.profiling_action.setChecked(True)
+
+        self.pending_tabs = {}
+        self.course_tab = self.add_tab("Courses", self.create_course_tab, self.populate_course_table)
+        self.student_tab = self.add_tab("Students", self.create_student_tab, self.populate_student_table)
+        self.statistics_tab = self.add_tab("Statistics", self.create_statistics_tab, self.populate_statistics)
+        self.tabs.currentChanged.connect(self.show_tab)
+        placeholder = self.tabs.currentWidget().layout().itemAt(0).widget()
+        placeholder.painted.connect(self.first_painted)
+        placeholder.painted.connect(lambda: QTimer.singleShot(0, lambda: self.show_tab(self.tabs.currentIndex())))
+
+        if self.server_url is not None:
+            self.sync_timer = QTimer(self)
+            self.sync_timer.timeout.connect(self.sync_changes)
+            self.sync_timer.start(SYNC_INTERVAL_MS)
+        else:
+            self.maintenance_timer = QTimer(self)
+            self.maintenance_timer.setSingleShot(True)
+            self.maintenance_timer.timeout.connect(self.maintain_if_due)
+            self.maintenance_timer.start(MAINTENANCE_DELAY_MS)
+
+    def add_tab(self, title, create, populate):
+        page = QWidget()
+        layout = QVBoxLayout(page)
+        layout.setContentsMargins(0, 0, 0, 0)
+        layout.addWidget(TabPlaceholder(page))
+        self.pending_tabs[page] = (create, populate)
+        self.tabs.addTab(page, title)
+        return page
+
+    def build_tab(self, page):
+        """Build and fill ``page`` unless that was done already."""
+        pending = self.pending_tabs.pop(page, None)
+        if pending is None:
+            return
+        create, populate = pending
+        with profiler.operation(f'build_tab.{self.tabs.tabText(self.tabs.indexOf(page)).lower()}'):
+            layout = page.layout()
+            layout.takeAt(0).widget().deleteLater()
+            layout.addWidget(create())
+            populate()
+        self.tab_ready.emit(self.tabs.indexOf(page))
+
+    def show_tab(self, index):
+        page = self.tabs.widget(index)
+        if page in self.pending_tabs:
+            self.build_tab(page)
+        elif page is self.statistics_tab:
+            self.populate_statistics()
+
+    def sync_changes(self):
+        try:
+            self.db.sync()
+        except (sqlite3.DatabaseError, OSError, RemoteError) as error:
+            self.statusBar().showMessage(f"Lost contact with {self.server_url}: {error}", SYNC_INTERVAL_MS * 5)
+
+    def create_menu(self):
+        file_menu = self.menuBar().addMenu("File")
+
+        import_students_action = QAction("Import Students...", self)
+        import_students_action.triggered.connect(self.import_students)
+        file_menu.addAction(import_students_action)
+
+        import_courses_action = QAction("Import Courses...", self)
+        import_courses_action.triggered.connect(self.import_courses)
+        file_menu.addAction(import_courses_action)
+
+        file_menu.addSeparator()
+
+        export_students_action = QAction("Export Students...", self)
+        export_students_action.triggered.connect(self.export_students)
+        file_menu.addAction(export_students_action)
+
+        export_courses_action = QAction("Export Courses...", self)
+        export_courses_action.triggered.connect(self.export_courses)
+        file_menu.addAction(export_courses_action)
+
+        file_menu.addSeparator()
+
+        backup_action = QAction("Back Up Database...", self)
+        backup_action.triggered.connect(self.backup_database)
+        file_menu.addAction(backup_action)
+
+        snapshot_action = QAction("Take Snapshot", self)
+        snapshot_action.triggered.connect(self.take_snapshot)
+        file_menu.addAction(snapshot_action)
+
+        maintain_action = QAction("Maintain Database", self)
+        maintain_action.triggered.connect(self.maintain_database)
+        file_menu.addAction(maintain_action)
+
+        # The server's database file is backed up and maintained where it runs.
+        for action in (backup_action, snapshot_action, maintain_action):
+            action.setEnabled(self.server_url is None)
+
+        edit_menu = self.menuBar().addMenu("Edit")
+
+        self.undo_action = QAction("Undo", self)
+        self.undo_action.setShortcut(QKeySequence.StandardKey.Undo)
+        self.undo_action.triggered.connect(self.undo_edit)
+        edit_menu.addAction(self.undo_action)
+
+        self.redo_action = QAction("Redo", self)
+        self.redo_action.setShortcut(QKeySequence.StandardKey.Redo)
+        self.redo_action.triggered.connect(self.redo_edit)
+        edit_menu.addAction(self.redo_action)
+        self.update_undo_actions()
+
+        view_menu = self.menuBar().addMenu("View")
+
+        self.profiling_action = QAction("Profiling", self)
+        self.profiling_action.setCheckable(True)
+        self.profiling_action.toggled.connect(self.set_profiling)
+        view_menu.addAction(self.profiling_action)
+
+        self.export_profile_action = QAction("Export Profile Log...", self)
+        self.export_profile_action.setEnabled(False)
+        self.export_profile_action.triggered.connect(self.export_profile_log)
+        view_menu.addAction(self.export_profile_action)
+
+        self.query_plan_action = QAction("Show Query Plans", self)
+        self.query_plan_action.setCheckable(True)
+        view_menu.addAction(self.query_plan_action)
+
+        view_menu.addSeparator()
+
+        self.memory_roster_action = QAction("Keep Roster in Memory", self)
+        self.memory_roster_action.setCheckable(True)
+        self.memory_roster_action.toggled.connect(self.set_memory_roster)
+        view_menu.addAction(self.memory_roster_action)
+
+    def update_undo_actions(self):
+        undo = self.journal.undo_description()
+        redo = self.journal.redo_description()
+        self.undo_action.setText(f"Undo {undo}" if undo else "Undo")
+        self.undo_action.setEnabled(undo is not None)
+        self.redo_action.setText(f"Redo {redo}" if redo else "Redo")
+        self.redo_action.setEnabled(redo is not None)
+
+    def undo_edit(self):
+        try:
+            with profiler.operation('undo'):
+                self.journal.undo()
+        except (sqlite3.DatabaseError, EditConflict, OSError, RemoteError) as error:
+            QMessageBox.warning(self, 'Error', f'Cannot undo: {error}')
+        self.update_undo_actions()
+
+    def redo_edit(self):
+        try:
+            with profiler.operation('redo'):
+                self.journal.redo()
+        except (sqlite3.DatabaseError, EditConflict, OSError, RemoteError) as error:
+            QMessageBox.warning(self, 'Error', f'Cannot redo: {error}')
+        self.update_undo_actions()
+
+    def commit_edits(self, description):
+        try:
+            self.journal.commit(description)
+        except (sqlite3.DatabaseError, EditConflict, OSError, RemoteError) as error:
+            QMessageBox.warning(self, 'Error', f'Changes were not saved: {error}')
+            return False
+        finally:
+            self.update_undo_actions()
+        return True
+
+    def set_profiling(self, enabled):
+        if enabled:
+            profiler.enable(default_log_path(self.database_dir))
+            self.profile_overlay.setText("Profiling on")
+        else:
+            profiler.disable()
+        self.profile_overlay.setVisible(enabled)
+        self.export_profile_action.setEnabled(enabled)
+
+    def set_memory_roster(self, enabled):
+        if enabled:
+            self.build_tab(self.student_tab)
+            with profiler.operation('load_roster'):
+                self.roster = ColumnarRoster(self.db, self.events)
+            self.student_live_filter.search_memory = self.search_roster
+            self.student_model.sort_rows = self.sort_roster_rows
+            self.statusBar().showMessage(f"{len(self.roster)} students held in memory", 5000)
+        elif self.roster is not None:
+            self.student_live_filter.search_memory = None
+            self.student_model.sort_rows = None
+            self.roster.close()
+            self.roster = None
+
+    def search_roster(self, text, limit):
+        filter_field = self.filter_input.currentText()
+        if filter_field != QUERY_FIELD:
+            return self.roster.rows(self.roster.contains(filter_field, text, limit))
+        try:
+            conditions = select_conditions(parse_filter(text))
+        except ValueError:
+            return None
+        # Other filters are left to SQLite and its indexes.
+        if conditions is None:
+            return None
+        return self.roster.rows(self.roster.select(conditions, limit))
+
+    def sort_roster_rows(self, rows, order):
+        positions = self.roster.positions(row[0] for row in rows)
+        if len(positions) != len(rows):
+            return None
+        return self.roster.rows(self.roster.order(positions, order.field, order.descending))
+
+    def export_profile_log(self):
+        path, _ = QFileDialog.getSaveFileName(self, "Export Profile Log", "ssis-profile.log", "Log files (*.log)")
+        if not path:
+            return
+        try:
+            profiler.export_log(path)
+        except OSError as error:
+            QMessageBox.warning(self, "Error", f"Export failed: {error}")
+
+    def import_students(self):
+        self.run_import(self.students, "Import Students")
+
+    def import_courses(self):
+        self.run_import(self.courses, "Import Courses")
+
+    def run_import(self, repository, title):
+        path, _ = QFileDialog.getOpenFileName(self, title, "", "Spreadsheets (*.csv *.xlsx)")
+        if not path:
+            return
+
+        progress = QProgressDialog(f"Importing {os.path.basename(path)}...", None, 0, 0, self)
+        progress.setWindowTitle(title)
+        progress.setWindowModality(Qt.WindowModality.WindowModal)
+        progress.setMinimumDuration(0)
+        progress.show()
+
+        def on_progress(report):
+            progress.setLabelText(f"{report.rows_read} rows read, {report.inserted} imported")
+            QApplication.processEvents()
+
+        try:
+            with profiler.operation(f'import_{repository.table}'):
+                report = repository.import_file(path, on_progress=on_progress)
+        except (sqlite3.DatabaseError, OSError, ValueError, ImportError, RemoteError) as error:
+            QMessageBox.warning(self, "Error", f"Import failed: {error}")
+            return
+        finally:
+            progress.close()
+
+        message = report.summary()
+        if report.rejected:
+            message += "\n\n" + "\n".join(f"Line {line_number}: {reason}" for line_number, _, reason in report.rejected[:10])
+            if report.rejected_count > 10:
+                message += f"\n... and {report.rejected_count - 10} more"
+        QMessageBox.information(self, title, message)
+
+    def export_students(self):
+        self.build_tab(self.student_tab)
+        self.run_export(self.student_model, "Export Students")
+
+    def export_courses(self):
+        self.build_tab(self.course_tab)
+        self.run_export(self.course_model, "Export Courses")
+
+    def run_export(self, model, title):
+        path, _ = QFileDialog.getSaveFileName(self, title, f"{model.table}.csv",
+                                              "CSV (*.csv);;Compressed CSV (*.csv.gz);;Parquet (*.parquet)")
+        if not path:
+            return
+
+        where, params = model.filter_clause()
+        # Rows are written in the order the grid shows them.
+        worker = ExportWorker(self.db.reader, model.table, model.fields, where, params, path,
+                              model.sort_order().order_by())
+        self.export_workers.add(worker)
+
+        progress = QProgressDialog(f"Exporting to {os.path.basename(path)}...", "Cancel", 0, 0, self)
+        progress.setWindowTitle(title)
+        progress.setWindowModality(Qt.WindowModality.WindowModal)
+        progress.setMinimumDuration(0)
+        progress.canceled.connect(worker.cancel)
+        worker.signals.started.connect(progress.setMaximum)
+        worker.signals.progress.connect(progress.setValue)
+
+        def finished(written):
+            self.export_workers.discard(worker)
+            progress.close()
+            QMessageBox.information(self, title, f"{written} rows exported to {os.path.basename(path)}.")
+
+        def cancelled():
+            self.export_workers.discard(worker)
+
+        def failed(message):
+            self.export_workers.discard(worker)
+            progress.close()
+            QMessageBox.warning(self, "Error", f"Export failed: {message}")
+
+        worker.signals.finished.connect(finished)
+        worker.signals.cancelled.connect(cancelled)
+        worker.signals.failed.connect(failed)
+        progress.show()
+        QThreadPool.globalInstance().start(worker)
+
+    def backup_database(self):
+        path, _ = QFileDialog.getSaveFileName(self, "Back Up Database", "Student_Table-backup.db",
+                                              "SQLite databases (*.db)")
+        if not path:
+            return
+        self.run_maintenance("Back Up Database", 'backup',
+                             lambda on_progress, is_cancelled: maintenance.backup(
+                                 self.db.database, path, on_progress=on_progress, is_cancelled=is_cancelled),
+                             lambda pages: f"Database backed up to {os.path.basename(path)}.")
+
+    def take_snapshot(self):
+        self.run_maintenance("Take Snapshot", 'snapshot',
+                             lambda on_progress, is_cancelled: maintenance.snapshot(
+                                 self.db.database, on_progress=on_progress, is_cancelled=is_cancelled),
+                             lambda path: f"Snapshot saved as {os.path.basename(path)}.")
+
+    def maintain_database(self):
+        self.run_maintenance("Maintain Database", 'maintain',
+                             lambda on_progress, is_cancelled: maintenance.maintain(self.db.database, full=True),
+                             lambda report: f"Database maintained; {report.freed_bytes // 1024} KB freed.",
+                             cancellable=False)
+
+    def run_maintenance(self, title, name, task, describe, cancellable=True):
+        worker = MaintenanceWorker(name, task)
+        self.maintenance_workers.add(worker)
+
+        progress = QProgressDialog(f"{title}...", "Cancel" if cancellable else None, 0, 0, self)
+        progress.setWindowTitle(title)
+        progress.setWindowModality(Qt.WindowModality.WindowModal)
+        progress.setMinimumDuration(0)
+        progress.canceled.connect(worker.cancel)
+
+        def on_progress(copied, total):
+            progress.setMaximum(total)
+            progress.setValue(copied)
+
+        def finished(result):
+            self.maintenance_workers.discard(worker)
+            progress.close()
+            QMessageBox.information(self, title, describe(result))
+
+        def cancelled():
+            self.maintenance_workers.discard(worker)
+
+        def failed(message):
+            self.maintenance_workers.discard(worker)
+            progress.close()
+            QMessageBox.warning(self, "Error", f"{title} failed: {message}")
+
+        worker.signals.progress.connect(on_progress)
+        worker.signals.finished.connect(finished)
+        worker.signals.cancelled.connect(cancelled)
+        worker.signals.failed.connect(failed)
+        progress.show()
+        QThreadPool.globalInstance().start(worker)
+
+    def maintain_if_due(self):
+        """Release free pages and refresh statistics in the background if a week has passed since the last run.
+
+        Only the incremental run is made: a full VACUUM is left to the menu.
+        """
+        if self.maintenance_workers or not maintenance.is_due(self.db.connection):
+            return
+        worker = MaintenanceWorker('maintain', lambda on_progress, is_cancelled: maintenance.maintain(self.db.database))
+        self.maintenance_workers.add(worker)
+
+        def finished(report):
+            self.maintenance_workers.discard(worker)
+            self.statusBar().showMessage(f"Database maintained; {report.freed_bytes // 1024} KB freed.", 5000)
+
+        def failed(message):
+            self.maintenance_workers.discard(worker)
+            self.statusBar().showMessage(f"Database maintenance failed: {message}", 5000)
+
+        worker.signals.finished.connect(finished)
+        worker.signals.failed.connect(failed)
+        QThreadPool.globalInstance().start(worker)
+
+    def create_course_tab(self):
+        course_tab = QWidget()
+        course_tab_layout = QVBoxLayout(course_tab)
+
+        title_label = QLabel("Courses Management", self)
+        title_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        title_label.setObjectName("title")
+        course_tab_layout.addWidget(title_label)
+
+        button_layout = QHBoxLayout()
+
+        add_course_btn = QPushButton("Add Course")
+        add_course_btn.clicked.connect(self.add_course)
+        add_course_btn.setObjectName("action")
+        button_layout.addWidget(add_course_btn)
+
+        delete_course_btn = QPushButton("Delete Course")
+        delete_course_btn.clicked.connect(self.delete_course)
+        delete_course_btn.setObjectName("action")
+        button_layout.addWidget(delete_course_btn)
+
+        update_course_btn = QPushButton("Update Course")
+        update_course_btn.clicked.connect(self.update_course)
+        update_course_btn.setObjectName("action")
+        button_layout.addWidget(update_course_btn)
+
+        course_tab_layout.addLayout(button_layout)
+
+        # Filter layout
+        filter_layout = QHBoxLayout()
+        filter_label = QLabel("Filter by Code:", self)
+        filter_layout.addWidget(filter_label)
+
+        self.course_filter_input = QLineEdit()
+        filter_layout.addWidget(self.course_filter_input)
+
+        filter_button = QPushButton("Filter")
+        filter_button.clicked.connect(self.filter_courses)
+        filter_layout.addWidget(filter_button)
+
+        course_tab_layout.addLayout(filter_layout)
+
+        self.course_model = PagedTableModel(self.db.connection, 'courses', self.course_fields, parent=self)
+        self.course_table = QTableView()
+        self.course_table.setModel(self.course_model)
+        self.course_table.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+        self.course_table.horizontalHeader().setSortIndicator(-1, Qt.SortOrder.AscendingOrder)
+        self.course_table.horizontalHeader().setSortIndicatorClearable(True)
+        self.course_table.setSortingEnabled(True)
+        course_tab_layout.addWidget(self.course_table)
+        self.events.subscribe('courses', self.course_model.apply_change)
+
+        self.course_live_filter = LiveFilter(self.course_model, self.course_filter_input, self.db.reader, self.course_filter_spec, self)
+        self.course_live_filter.failed.connect(self.show_filter_error)
+
+        return course_tab
+
+    def filter_courses(self):
+        with profiler.operation('filter_courses'):
+            self.course_live_filter.apply()
+
+    def course_filter_spec(self, filter_text):
+        where, params = course_filter(filter_text)
+        return where, params, row_matcher(filter_text, self.course_fields, 'Code')
+
+    def populate_course_table(self):
+        with profiler.operation('populate_courses'):
+            self.course_live_filter.reset()
+            self.course_live_filter.apply()
+
+    def add_course(self):
+        with profiler.operation('add_course.dialog'):
+            dialog = QDialog(self)
+            dialog.setWindowTitle("Add Course")
+
+            layout = QVBoxLayout(dialog)
+
+            course_name_input = QLineEdit()
+            course_code_input = QLineEdit()
+
+            form_layout = QFormLayout()
+            form_layout.addRow("Course Code:", course_code_input)
+            form_layout.addRow("Course Name:", course_name_input)
+
+            button_box = QDialogButtonBox(QDialogButtonBox.StandardButton.Ok | QDialogButtonBox.StandardButton.Cancel)
+            button_box.accepted.connect(dialog.accept)
+            button_box.rejected.connect(dialog.reject)
+
+            layout.addLayout(form_layout)
+            layout.addWidget(button_box)
+
+        if dialog.exec() == QDialog.DialogCode.Accepted:
+            course_name = course_name_input.text().strip()
+            course_code = course_code_input.text().strip()
+
+            if not course_name or not course_code:
+                QMessageBox.warning(self, "Error", "Both course name and code are required!")
+                return
+
+            try:
+                with profiler.operation('add_course'):
+                    self.courses.add(course_code, course_name)
+            except sqlite3.IntegrityError:
+                QMessageBox.warning(self, "Warning", f"Course with code {course_code} already exists!")
+                return
+            except (sqlite3.DatabaseError, OSError, RemoteError) as error:
+                QMessageBox.warning(self, "Error", f"The course was not added: {error}")
+                return
+
+            QMessageBox.information(self, 'Success', 'Course added successfully!')
+
+    def delete_course(self):
+        course_code, ok1 = QInputDialog.getText(self, 'Course Code', 'Enter course code:')
+        if not ok1:
+            return
+
+        try:
+            change = self.courses.delete(course_code, dry_run=True)
+        except (sqlite3.DatabaseError, OSError, RemoteError) as error:
+            QMessageBox.warning(self, 'Error', f'The course was not deleted: {error}')
+            return
+        if not change.found:
+            QMessageBox.warning(self, 'Error', 'No course found with the provided code.')
+            return
+
+        if change.students:
+            answer = QMessageBox.question(self, 'Delete Course',
+                                          f'{change.students} student(s) are enrolled in {course_code} and will be set to N/A. Delete the course?')
+            if answer != QMessageBox.StandardButton.Yes:
+                return
+
+        try:
+            with profiler.operation('delete_course'):
+                self.courses.delete(course_code)
+        except (sqlite3.DatabaseError, OSError, RemoteError) as error:
+            QMessageBox.warning(self, 'Error', f'The course was not deleted: {error}')
+            return
+
+        QMessageBox.information(self, 'Success', 'Course deleted successfully!')
+
+    def update_course(self):
+        course_code, ok1 = QInputDialog.getText(self, 'Course Code', 'Enter course code:')
+        if not ok1:
+            return
+
+        try:
+            course_data = self.courses.get(course_code)
+        except (sqlite3.DatabaseError, OSError, RemoteError) as error:
+            QMessageBox.warning(self, 'Error', f'The course was not updated: {error}')
+            return
+
+        if not course_data:
+            QMessageBox.warning(self, 'Error', 'No course found with the provided code.')
+            return
+
+        with profiler.operation('update_course.dialog'):
+            dialog = QDialog(self)
+            dialog.setWindowTitle("Update Course")
+
+            layout = QVBoxLayout(dialog)
+
+            course_name_input = QLineEdit()
+            course_name_input.setText(course_data[1])
+            course_name_input.setReadOnly(True)
+
+            course_code_input = QLineEdit()
+            course_code_input.setText(course_data[0])
+
+            form_layout = QFormLayout()
+            form_layout.addRow("Course Code:", course_code_input)
+            form_layout.addRow("Course Name:", course_name_input)
+
+            button_box = QDialogButtonBox(QDialogButtonBox.StandardButton.Ok | QDialogButtonBox.StandardButton.Cancel)
+            button_box.accepted.connect(dialog.accept)
+            button_box.rejected.connect(dialog.reject)
+
+            layout.addLayout(form_layout)
+            layout.addWidget(button_box)
+
+        if dialog.exec() == QDialog.DialogCode.Accepted:
+            new_course_code = course_code_input.text().strip()
+
+            if not new_course_code:
+                QMessageBox.warning(self, "Error", "Course code cannot be empty!")
+                return
+
+            try:
+                with profiler.operation('update_course'):
+                    change = self.courses.rename(course_code, new_course_code)
+            except sqlite3.IntegrityError:
+                QMessageBox.warning(self, "Warning", f"Course with code {new_course_code} already exists!")
+                return
+            except (sqlite3.DatabaseError, OSError, RemoteError) as error:
+                QMessageBox.warning(self, "Error", f"The course was not updated: {error}")
+                return
+
+            QMessageBox.information(self, 'Success', f'Course updated successfully! {change.students} student(s) moved to {new_course_code}.')
+
+    def create_student_tab(self):
+        student_tab = QWidget()
+        student_tab_layout = QVBoxLayout(student_tab)
+
+        title_label = QLabel("Students Management", self)
+        title_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        title_label.setObjectName("title")
+        student_tab_layout.addWidget(title_label)
+
+        button_layout = QHBoxLayout()
+
+        add_student_btn = QPushButton("Add Student")
+        add_student_btn.clicked.connect(self.add_student)
+        add_student_btn.setObjectName("action")
+        button_layout.addWidget(add_student_btn)
+
+        delete_student_btn = QPushButton("Delete Student")
+        delete_student_btn.clicked.connect(self.delete_student)
+        delete_student_btn.setObjectName("action")
+        button_layout.addWidget(delete_student_btn)
+
+        update_student_btn = QPushButton("Update Student")
+        update_student_btn.clicked.connect(self.update_student)
+        update_student_btn.setObjectName("action")
+        button_layout.addWidget(update_student_btn)
+
+        refresh_student_btn = QPushButton("Refresh")
+        refresh_student_btn.clicked.connect(self.refresh_students)
+        refresh_student_btn.setObjectName("action")
+        button_layout.addWidget(refresh_student_btn)
+
+        filter_layout = QHBoxLayout()
+        filter_label = QLabel("Filter by:", self)
+        filter_layout.addWidget(filter_label)
+
+        self.filter_input = QComboBox()
+        self.filter_input.addItem("All")
+        self.filter_input.addItems(self.student_fields[:-1])  # Excluding CourseCode
+        self.filter_input.addItem("CourseCode")
+        self.filter_input.addItem(QUERY_FIELD)
+        self.filter_input.currentTextChanged.connect(self.update_filter_placeholder)
+        filter_layout.addWidget(self.filter_input)
+
+        self.filter_text = QLineEdit()
+        self.filter_text.setPlaceholderText("Enter filter value")
+        filter_layout.addWidget(self.filter_text)
+
+        filter_button = QPushButton("Filter")
+        filter_button.clicked.connect(self.filter_students)
+        filter_layout.addWidget(filter_button)
+
+        student_tab_layout.addLayout(button_layout)
+        student_tab_layout.addLayout(filter_layout)
+
+        self.student_model = PagedTableModel(self.db.connection, 'students', self.student_fields, parent=self)
+        self.student_table = QTableView()
+        self.student_table.setModel(self.student_model)
+        self.student_table.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+        self.student_table.setSelectionMode(QAbstractItemView.SelectionMode.ExtendedSelection)
+        self.student_table.horizontalHeader().setSortIndicator(-1, Qt.SortOrder.AscendingOrder)
+        self.student_table.horizontalHeader().setSortIndicatorClearable(True)
+        self.student_table.setSortingEnabled(True)
+        student_tab_layout.addWidget(self.student_table)
+        self.events.subscribe('students', self.student_model.apply_change)
+
+        self.student_live_filter = LiveFilter(self.student_model, self.filter_text, self.db.reader, self.student_filter_spec, self)
+        self.student_live_filter.failed.connect(self.show_filter_error)
+        self.filter_input.currentTextChanged.connect(self.student_live_filter.reset)
+        self.filter_input.currentTextChanged.connect(self.student_live_filter.schedule)
+
+        return student_tab
+
+    def refresh_students(self):
+        self.populate_student_table()
+
+    def filter_students(self):
+        with profiler.operation('filter_students'):
+            self.student_live_filter.apply()
+
+    def update_filter_placeholder(self, filter_field):
+        if filter_field == QUERY_FIELD:
+            self.filter_text.setPlaceholderText("e.g. Year = Second AND CourseCode = BSCS OR StudentID ^= 2024-")
+        else:
+            self.filter_text.setPlaceholderText("Enter filter value")
+
+    def student_filter_spec(self, filter_text):
+        filter_field = self.filter_input.currentText()
+        if filter_field != QUERY_FIELD:
+            where, params = student_filter(filter_text, filter_field)
+            matches = row_matcher(filter_text, self.student_fields, filter_field)
+        else:
+            try:
+                node = parse_filter(filter_text)
+            except ValueError as error:
+                self.statusBar().showMessage(str(error), 5000)
+                return "0", (), None
+            where, params = compile_filter(node)
+            # Typing more can widen a compound filter (OR ...), so the rows
+            # shown are never narrowed in memory.
+            matches = None
+        if self.query_plan_action.isChecked():
+            plan = query_plan(self.db, self.student_model.select_sql(where), (*params, 1))
+            self.statusBar().showMessage("Plan: " + " | ".join(line.strip() for line in plan))
+        return where, params, matches
+
+    def populate_student_table(self):
+        with profiler.operation('populate_students'):
+            self.student_live_filter.reset()
+            self.student_live_filter.apply()
+
+    def show_filter_error(self, message):
+        QMessageBox.warning(self, 'Error', f'Filtering failed: {message}')
+
+    def add_student(self):
+        with profiler.operation('add_student.dialog'):
+            dialog = QDialog(self)
+            dialog.setWindowTitle("Add Student")
+
+            layout = QVBoxLayout(dialog)
+
+            student_id_input = QLineEdit()
+            student_name_input = QLineEdit()
+            gender_input = QComboBox()
+            gender_input.addItems(GENDERS)
+            year_input = QComboBox()
+            year_input.addItems(YEARS)
+            course_code_input = self.create_course_code_input()
+
+            form_layout = QFormLayout()
+            form_layout.addRow("Student ID:", student_id_input)
+            form_layout.addRow("Student Name:", student_name_input)
+            form_layout.addRow("Gender:", gender_input)
+            form_layout.addRow("Year:", year_input)
+            form_layout.addRow("Course Code:", course_code_input)
+
+            validation_label = QLabel()
+            validation_label.setObjectName("validation")
+            validation_label.setWordWrap(True)
+            validation_label.hide()
+
+            button_box = QDialogButtonBox(QDialogButtonBox.StandardButton.Ok | QDialogButtonBox.StandardButton.Cancel)
+            button_box.accepted.connect(dialog.accept)
+            button_box.rejected.connect(dialog.reject)
+            ok_button = button_box.button(QDialogButtonBox.StandardButton.Ok)
+
+            layout.addLayout(form_layout)
+            layout.addWidget(validation_label)
+            layout.addWidget(button_box)
+
+            def show_issues(issues):
+                lines = [f'<span style="color: {VALIDATION_ERROR_COLOR}">{html.escape(issue.message)}</span>'
+                         if issue.level == ERROR else html.escape(issue.message) for issue in issues]
+                validation_label.setText('<br>'.join(lines))
+                validation_label.setVisible(bool(lines))
+                ok_button.setEnabled(not any(issue.level == ERROR for issue in issues))
+
+            validator = LiveValidator(student_id_input, student_name_input, self.db.reader, dialog)
+            validator.validated.connect(show_issues)
+            validator.failed.connect(lambda message: self.statusBar().showMessage(f"Validation failed: {message}", 5000))
+
+        accepted = dialog.exec() == QDialog.DialogCode.Accepted
+        validator.shutdown()
+        if not accepted:
+            return
+
+        student_id = student_id_input.text().strip()
+        student_name = student_name_input.text().strip()
+        gender = gender_input.currentText()
+        year = year_input.currentText()
+        course_code = course_code_input.currentText()
+
+        if not (student_id and student_name):
+            QMessageBox.warning(self, "Error", "Both student ID and name are required!")
+            return
+
+        if not STUDENT_ID_PATTERN.fullmatch(student_id):
+            QMessageBox.warning(self, "Error", "A student ID is four digits, a dash and four digits, e.g. 2024-0001.")
+            return
+
+        # Checked again: another workstation may have taken the ID since it was typed.
+        try:
+            existing_student = self.students.exists(student_id)
+        except (sqlite3.DatabaseError, OSError, RemoteError) as error:
+            QMessageBox.warning(self, "Error", f"The student was not added: {error}")
+            return
+
+        if existing_student:
+            QMessageBox.warning(self, "Warning", f"Student with ID {student_id} already exists!")
+            return
+
+        if course_code and course_code not in self.catalog:
+            QMessageBox.warning(self, "Error", f"No course found with code {course_code}.")
+            return
+
+        try:
+            with profiler.operation('add_student'):
+                self.students.add(student_id, student_name, gender, year, course_code)
+        except (sqlite3.DatabaseError, OSError, RemoteError) as error:
+            QMessageBox.warning(self, "Error", f"The student was not added: {error}")
+            return
+
+        QMessageBox.information(self, 'Success', 'Student added successfully!')
+
+    def selected_student_ids(self):
+        rows = sorted(index.row() for index in self.student_table.selectionModel().selectedRows())
+        if not rows and self.student_table.currentIndex().isValid():
+            rows = [self.student_table.currentIndex().row()]
+        return [row_data[0] for row_data in map(self.student_model.row_data, rows) if row_data is not None]
+
+    def delete_student(self):
+        student_ids = self.selected_student_ids()
+        if not student_ids:
+            QMessageBox.warning(self, 'Error', 'Please select a student to delete.')
+            return
+
+        if len(student_ids) > 1:
+            reply = QMessageBox.question(self, 'Delete Students', f'Delete the {len(student_ids)} selected students?')
+            if reply != QMessageBox.StandardButton.Yes:
+                return
+
+        with profiler.operation('delete_student'):
+            self.journal.stage_delete(student_ids)
+            description = f"Delete {len(student_ids)} Students" if len(student_ids) > 1 else f"Delete {student_ids[0]}"
+            if not self.commit_edits(description):
+                return
+
+        if len(student_ids) > 1:
+            QMessageBox.information(self, 'Success', f'{len(student_ids)} students deleted. Use Edit > Undo to restore them.')
+        else:
+            QMessageBox.information(self, 'Success', 'Student deleted successfully!')
+
+    def update_student(self):
+        student_ids = self.selected_student_ids()
+        if not student_ids:
+            QMessageBox.warning(self, 'Error', 'Please select a student to update.')
+            return
+        if len(student_ids) > 1:
+            self.update_students(student_ids)
+            return
+
+        student_id = student_ids[0]
+
+        try:
+            student_data = self.students.get(student_id)
+        except (sqlite3.DatabaseError, OSError, RemoteError) as error:
+            QMessageBox.warning(self, 'Error', f'The student was not updated: {error}')
+            return
+
+        if not student_data:
+            QMessageBox.warning(self, 'Error', 'No student found with the provided ID.')
+            return
+
+        with profiler.operation('update_student.dialog'):
+            dialog = QDialog(self)
+            dialog.setWindowTitle("Update Student")
+
+            layout = QVBoxLayout(dialog)
+
+            student_name_input = QLineEdit()
+            student_name_input.setText(student_data[1])
+            student_id_input = QLineEdit()
+            student_id_input.setText(student_data[0])
+            student_id_input.setReadOnly(True)
+            gender_input = QComboBox()
+            gender_input.addItems(GENDERS)
+            gender_input.setCurrentText(student_data[2])
+            year_input = QComboBox()
+            year_input.addItems(YEARS)
+            year_input.setCurrentText(student_data[3])
+            course_code_input = self.create_course_code_input()
+            course_code_input.setCurrentText(student_data[4] or '')
+
+            form_layout = QFormLayout()
+            form_layout.addRow("Student ID:", student_id_input)
+            form_layout.addRow("Student Name:", student_name_input)
+            form_layout.addRow("Gender:", gender_input)
+            form_layout.addRow("Year:", year_input)
+            form_layout.addRow("Course Code:", course_code_input)
+
+            button_box = QDialogButtonBox(QDialogButtonBox.StandardButton.Ok | QDialogButtonBox.StandardButton.Cancel)
+            button_box.accepted.connect(dialog.accept)
+            button_box.rejected.connect(dialog.reject)
+
+            layout.addLayout(form_layout)
+            layout.addWidget(button_box)
+
+        if dialog.exec() == QDialog.DialogCode.Accepted:
+            student_name = student_name_input.text().strip()
+            gender = gender_input.currentText()
+            year = year_input.currentText()
+            course_code = course_code_input.currentText()
+
+            if not student_name:
+                QMessageBox.warning(self, "Error", "Student name cannot be empty!")
+                return
+
+            if course_code and course_code not in self.catalog:
+                QMessageBox.warning(self, "Error", f"No course found with code {course_code}.")
+                return
+
+            with profiler.operation('update_student'):
+                self.journal.stage_update([student_id], StudentName=student_name, Gender=gender, Year=year,
+                                          CourseCode=course_code)
+                if not self.commit_edits(f"Update {student_id}"):
+                    return
+
+            QMessageBox.information(self, 'Success', 'Student updated successfully!')
+
+    def update_students(self, student_ids):
+        unchanged = "(unchanged)"
+        with profiler.operation('update_students.dialog'):
+            dialog = QDialog(self)
+            dialog.setWindowTitle(f"Update {len(student_ids)} Students")
+
+            layout = QVBoxLayout(dialog)
+
+            gender_input = QComboBox()
+            gender_input.addItems((unchanged, *GENDERS))
+            year_input = QComboBox()
+            year_input.addItems((unchanged, *YEARS))
+            course_code_input = self.create_course_code_input()
+            course_code_input.setCurrentText(unchanged)
+            course_code_input.lineEdit().setPlaceholderText("empty for no course")
+
+            form_layout = QFormLayout()
+            form_layout.addRow("Gender:", gender_input)
+            form_layout.addRow("Year:", year_input)
+            form_layout.addRow("Course Code:", course_code_input)
+
+            button_box = QDialogButtonBox(QDialogButtonBox.StandardButton.Ok | QDialogButtonBox.StandardButton.Cancel)
+            button_box.accepted.connect(dialog.accept)
+            button_box.rejected.connect(dialog.reject)
+
+            layout.addLayout(form_layout)
+            layout.addWidget(button_box)
+
+        if dialog.exec() != QDialog.DialogCode.Accepted:
+            return
+
+        values = {}
+        if gender_input.currentText() != unchanged:
+            values['Gender'] = gender_input.currentText()
+        if year_input.currentText() != unchanged:
+            values['Year'] = year_input.currentText()
+        course_code = course_code_input.currentText().strip()
+        if course_code != unchanged:
+            if course_code and course_code not in self.catalog:
+                QMessageBox.warning(self, "Error", f"No course found with code {course_code}.")
+                return
+            values['CourseCode'] = course_code
+        if not values:
+            return
+
+        with profiler.operation('update_students'):
+            self.journal.stage_update(student_ids, **values)
+            if not self.commit_edits(f"Update {len(student_ids)} Students"):
+                return
+        QMessageBox.information(self, 'Success', f'{len(student_ids)} students updated. Use Edit > Undo to revert.')
+
+    def create_course_code_input(self):
+        # All course pickers share one list model, rebuilt only after the catalog changes.
+        if self.course_code_model_version != self.catalog.version:
+            self.course_code_model.setStringList(self.catalog.codes())
+            self.course_code_model_version = self.catalog.version
+
+        course_code_input = QComboBox()
+        course_code_input.setEditable(True)
+        course_code_input.setInsertPolicy(QComboBox.InsertPolicy.NoInsert)
+        course_code_input.setModel(self.course_code_model)
+
+        completer = QCompleter(self.course_code_model, course_code_input)
+        completer.setCaseSensitivity(Qt.CaseSensitivity.CaseInsensitive)
+        completer.setFilterMode(Qt.MatchFlag.MatchContains)
+        course_code_input.setCompleter(completer)
+        return course_code_input
+
+    def create_statistics_tab(self):
+        statistics_tab = QWidget()
+        statistics_tab_layout = QVBoxLayout(statistics_tab)
+
+        title_label = QLabel("Enrolment Statistics", self)
+        title_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        title_label.setObjectName("title")
+        statistics_tab_layout.addWidget(title_label)
+
+        summary_layout = QHBoxLayout()
+        self.statistics_total_label = QLabel(self)
+        summary_layout.addWidget(self.statistics_total_label)
+
+        rebuild_statistics_btn = QPushButton("Rebuild")
+        rebuild_statistics_btn.clicked.connect(self.rebuild_statistics)
+        rebuild_statistics_btn.setObjectName("action")
+        summary_layout.addWidget(rebuild_statistics_btn)
+        statistics_tab_layout.addLayout(summary_layout)
+
+        self.course_statistics_model = RowsTableModel(['Code', 'Name', 'Students'], self)
+        self.year_statistics_model = RowsTableModel(['Year', 'Students'], self)
+        self.gender_statistics_model = RowsTableModel(['Gender', 'Students'], self)
+
+        breakdown_layout = QHBoxLayout()
+        for model in (self.year_statistics_model, self.gender_statistics_model):
+            breakdown_layout.addWidget(self.create_statistics_table(model))
+        statistics_tab_layout.addLayout(breakdown_layout)
+        statistics_tab_layout.addWidget(self.create_statistics_table(self.course_statistics_model), 2)
+
+        # Counts are re-read when the tab is shown, and at once after a change while it is.
+        self.statistics_stale = True
+        self.events.subscribe('students', self.statistics_changed)
+        self.events.subscribe('courses', self.statistics_changed)
+
+        return statistics_tab
+
+    def create_statistics_table(self, model):
+        table = QTableView()
+        table.setModel(model)
+        table.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+        table.horizontalHeader().setSortIndicator(-1, Qt.SortOrder.AscendingOrder)
+        table.horizontalHeader().setSortIndicatorClearable(True)
+        table.setSortingEnabled(True)
+        return table
+
+    def statistics_changed(self, change, rowid):
+        self.statistics_stale = True
+        self.populate_statistics()
+
+    def populate_statistics(self):
+        if not self.statistics_stale or self.tabs.currentWidget() is not self.statistics_tab:
+            return
+        try:
+            with profiler.operation('populate_statistics'):
+                self.course_statistics_model.set_rows(self.courses.report())
+                self.year_statistics_model.set_rows(self.students.report('Year'))
+                self.gender_statistics_model.set_rows(self.students.report('Gender'))
+                total = sum(row[2] for row in self.course_statistics_model.rows())
+                self.statistics_total_label.setText(
+                    f"{self.students.total()} students, {total} of them in "
+                    f"{self.course_statistics_model.rowCount()} courses")
+        except (sqlite3.DatabaseError, OSError, RemoteError) as error:
+            self.statistics_total_label.setText(f"Statistics unavailable: {error}")
+            return
+        self.statistics_stale = False
+
+    def rebuild_statistics(self):
+        try:
+            with profiler.operation('rebuild_statistics'):
+                stale = self.students.stale_statistics()
+                self.students.rebuild_statistics()
+        except (sqlite3.DatabaseError, OSError, RemoteError) as error:
+            QMessageBox.warning(self, 'Error', f'Statistics were not rebuilt: {error}')
+            return
+        self.statistics_stale = True
+        self.populate_statistics()
+        QMessageBox.information(self, 'Success', f'Statistics rebuilt; {len(stale)} count(s) were stale.')
+
+    def closeEvent(self, event):
+        for worker in list(self.export_workers) + list(self.maintenance_workers):
+            worker.cancel()
+        if self.server_url is None:
+            self.maintenance_timer.stop()
+        QThreadPool.globalInstance().waitForDone()
+        # A view still due to lay itself out would page from the closed database.
+        if self.course_tab not in self.pending_tabs:
+            self.course_live_filter.shutdown()
+            self.course_table.setModel(None)
+        if self.student_tab not in self.pending_tabs:
+            self.student_live_filter.shutdown()
+            self.student_table.setModel(None)
+        self.pending_tabs.clear()
+        if self.roster is not None:
+            self.roster.close()
+        profiler.remove_listener(self.profile_overlay.show_operation)
+        self.db.close()
+        super().closeEvent(event)
+
+
+def main(database_dir=DEFAULT_DATABASE_DIR, server_url=None, startup_time=False):
+    """Run the window; with ``startup_time``, print how long it took to show its first rows and quit."""
+    timer = StartupTimer()
+    app = QApplication(sys.argv)
+    app.setStyleSheet(STYLESHEET)
+    timer.mark('application')
+    window = MainWindow(database_dir, server_url)
+    timer.mark('window')
+    if startup_time:
+        window.first_painted.connect(lambda: timer.mark('first paint'))
+
+        def ready(index):
+            timer.mark('first rows')
+            print(timer.report(), file=sys.stderr)
+            QTimer.singleShot(0, window.close)
+
+        window.tab_ready.connect(ready)
+    window.show()
+    return app.exec()
@@ -0,0 +1,224 @@
+"""Streaming bulk import of students and courses from CSV or Excel files.
+
+Rows are read lazily and validated in memory against the enumerations,
+then written with executemany() one batch per transaction. Inside that
+transaction each batch costs one existence query against the primary key
+and, for students, one against the course codes it names, so duplicates
+and unknown courses are rejected without a lookup per row, a concurrent
+writer cannot slip in between the check and the insert, and memory stays
+bounded by the batch size.
+
+Usage: python -m ssis import {students,courses} FILE [--database-dir DIR] [--rejects FILE]
+"""
+
+import csv
+import json
+import os.path
+import sys
+
+from ssis.database import write_transaction
+from ssis.schema import COURSE_COLUMNS, GENDERS, NOT_APPLICABLE, STUDENT_COLUMNS, STUDENT_ID_PATTERN, YEARS
+from ssis.search import deferred_fts_insert
+
+BATCH_SIZE = 5000
+MAX_REPORTED_REJECTS = 1000
+
+
+class ImportReport:
+    """Counts of what an import did, with the first MAX_REPORTED_REJECTS rejections."""
+
+    def __init__(self):
+        self.rows_read = 0
+        self.inserted = 0
+        self.rejected_count = 0
+        self.rejected = []
+
+    def reject(self, line_number, row, reason):
+        self.rejected_count += 1
+        if len(self.rejected) < MAX_REPORTED_REJECTS:
+            self.rejected.append((line_number, row, reason))
+
+    def summary(self):
+        return f"{self.inserted} of {self.rows_read} rows imported, {self.rejected_count} rejected."
+
+
+def read_rows(path, columns):
+    """Yield ``(line_number, values)`` for each data row of a .csv or .xlsx file.
+
+    The first row must be a header naming ``columns`` (in any order and case);
+    ``values`` is a tuple of stripped strings in ``columns`` order.
+    """
+    if path.lower().endswith('.xlsx'):
+        rows = _read_xlsx(path)
+    else:
+        rows = _read_csv(path)
+
+    header = next(rows, None)
+    if header is None:
+        return
+    positions = {str(name).strip().casefold(): index for index, name in enumerate(header) if name is not None}
+    missing = [column for column in columns if column.casefold() not in positions]
+    if missing:
+        raise ValueError(f"{os.path.basename(path)} is missing the column(s): {', '.join(missing)}")
+    indexes = [positions[column.casefold()] for column in columns]
+
+    for line_number, row in enumerate(rows, start=2):
+        if not any(cell not in (None, '') for cell in row):
+            continue
+        yield line_number, tuple(_cell(row, index) for index in indexes)
+
+
+def _cell(row, index):
+    if index >= len(row) or row[index] is None:
+        return ''
+    return str(row[index]).strip()
+
+
+def _read_csv(path):
+    with open(path, newline='', encoding='utf-8-sig') as file:
+        yield from csv.reader(file)
+
+
+def _read_xlsx(path):
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise ImportError("Importing .xlsx files requires the openpyxl package") from None
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        yield from workbook.active.iter_rows(values_only=True)
+    finally:
+        workbook.close()
+
+
+def _batches(rows, batch_size):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _existing_keys(db, table, key, keys):
+    cursor = db.execute(
+        f"SELECT {key} FROM {table} WHERE {key} IN (SELECT value FROM json_each(?))", (json.dumps(keys),))
+    return {row[0] for row in cursor}
+
+
+def _import(db, path, table, columns, validate, batch_size, rejects_path, on_progress, reference=None):
+    """Import the rows of ``path`` that ``validate`` accepts into ``table``.
+
+    ``reference``, if given, is ``(index, table, key)``: the record field at
+    ``index`` must be None or a ``key`` of that table.
+    """
+    report = ImportReport()
+    rejects_file = None
+    rejects_writer = None
+    if rejects_path:
+        rejects_file = open(rejects_path, 'w', newline='', encoding='utf-8')
+        rejects_writer = csv.writer(rejects_file)
+        rejects_writer.writerow(('Line', *columns, 'Reason'))
+
+    def reject(line_number, values, reason):
+        report.reject(line_number, values, reason)
+        if rejects_writer is not None:
+            rejects_writer.writerow((line_number, *values, reason))
+
+    key = columns[0]
+    insert = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})"
+    try:
+        for batch in _batches(read_rows(path, columns), batch_size):
+            report.rows_read += len(batch)
+            valid = {}
+            for line_number, values in batch:
+                record = validate(values)
+                if isinstance(record, str):
+                    reject(line_number, values, record)
+                elif record[0] in valid:
+                    reject(line_number, values, f"Duplicate {key} {record[0]} in file")
+                else:
+                    valid[record[0]] = (line_number, values, record)
+
+            with write_transaction(db):
+                existing = _existing_keys(db, table, key, list(valid))
+                known = None
+                if reference is not None:
+                    index, referenced_table, referenced_key = reference
+                    known = _existing_keys(db, referenced_table, referenced_key,
+                                           list({record[index] for _, _, record in valid.values()} - {None}))
+                records = []
+                for record_key, (line_number, values, record) in valid.items():
+                    if record_key in existing:
+                        reject(line_number, values, f"{key} {record_key} already exists")
+                    elif known is not None and record[index] is not None and record[index] not in known:
+                        reject(line_number, values, f"Unknown {columns[index]} {record[index]!r}")
+                    else:
+                        records.append(record)
+                with deferred_fts_insert(db.connection, table):
+                    db.connection.executemany(insert, records)
+            report.inserted += len(records)
+            if on_progress is not None:
+                on_progress(report)
+    finally:
+        if rejects_file is not None:
+            rejects_file.close()
+    return report
+
+
+def import_students(db, path, batch_size=BATCH_SIZE, rejects_path=None, on_progress=None):
+    """Import students from ``path`` into ``db`` and return an ImportReport.
+
+    Each row needs a StudentID of the form YYYY-NNNN, a name, a Gender and
+    Year from GENDERS and YEARS, and a CourseCode that is empty, 'N/A' or an
+    existing course. A Gender or Year of 'N/A' is imported as missing, as
+    exports write it, so an exported file imports back unchanged. Rejected rows are also written to ``rejects_path`` as CSV
+    when given. ``on_progress(report)`` is called after each committed batch.
+    """
+
+    def validate(values):
+        student_id, student_name, gender, year, course_code = values
+        if not STUDENT_ID_PATTERN.fullmatch(student_id):
+            return f"Invalid StudentID {student_id!r}, expected YYYY-NNNN"
+        if not student_name:
+            return "StudentName is required"
+        if gender == NOT_APPLICABLE:
+            gender = None
+        elif gender not in GENDERS:
+            return f"Invalid Gender {gender!r}"
+        if year == NOT_APPLICABLE:
+            year = None
+        elif year not in YEARS:
+            return f"Invalid Year {year!r}"
+        if course_code in ('', NOT_APPLICABLE):
+            course_code = None
+        return student_id, student_name, gender, year, course_code
+
+    return _import(db, path, 'students', STUDENT_COLUMNS, validate, batch_size, rejects_path, on_progress,
+                   reference=(4, 'courses', 'Code'))
+
+
+def import_courses(db, path, batch_size=BATCH_SIZE, rejects_path=None, on_progress=None):
+    """Import courses from ``path`` into ``db`` and return an ImportReport."""
+
+    def validate(values):
+        code, name = values
+        if not code or code == NOT_APPLICABLE:
+            return f"Invalid Code {code!r}"
+        if not name:
+            return "Name is required"
+        return code, name
+
+    return _import(db, path, 'courses', COURSE_COLUMNS, validate, batch_size, rejects_path, on_progress)
+
+
+def main(argv=None):
+    from ssis.cli import main as cli_main
+
+    return cli_main(['import', *(sys.argv[1:] if argv is None else argv)])
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,262 @@
+"""Opt-in timing of operations and of the SQL they run.
+
+Profiling is off unless SSIS_PROFILE is set or it is switched on from the
+View menu. While off, operation() returns a shared no-op context manager,
+rows() returns at once and no SQLite callbacks are installed.
+
+While on, every connection opened through ssis.database.connect() gets a
+trace callback and a progress handler. A statement is timed from its trace
+callback to the next statement on the same thread or the end of the
+enclosing operation, so its time includes fetching the rows. SQLite reports
+the text with parameters bound; literals are replaced by ``?`` so that
+repeated statements aggregate and no student data reaches the log.
+Statements run outside any operation are not recorded.
+
+Finished top-level operations are written to a rotating log and passed to
+the listeners registered with add_listener().
+"""
+
+import logging
+import os
+import re
+import threading
+import time
+import weakref
+from collections import defaultdict
+from contextlib import contextmanager, nullcontext
+from logging.handlers import RotatingFileHandler
+
+ENV_VAR = 'SSIS_PROFILE'
+LOG_ENV_VAR = 'SSIS_PROFILE_LOG'
+LOG_FILE = 'ssis-profile.log'
+LOG_MAX_BYTES = 1024 * 1024
+LOG_BACKUP_COUNT = 3
+PROGRESS_STEPS = 1000
+LOGGED_STATEMENTS = 10
+
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+
+logger = logging.getLogger('ssis.profile')
+logger.propagate = False
+
+
+def normalize_sql(sql):
+    return _LITERALS.sub('?', ' '.join(sql.split()))
+
+
+class Operation:
+    """Timings collected for one named operation and the operations nested in it."""
+
+    def __init__(self, name, parent=None):
+        self.name = name
+        self.parent = parent
+        self.start = time.perf_counter()
+        self.elapsed_ms = 0.0
+        self.rows = 0
+        self.vm_steps = 0
+        # normalized SQL -> [executions, milliseconds, rows, changes]
+        self.statements = defaultdict(lambda: [0, 0.0, 0, 0])
+
+    @property
+    def sql_ms(self):
+        return sum(stats[1] for stats in self.statements.values())
+
+    @property
+    def statement_count(self):
+        return sum(stats[0] for stats in self.statements.values())
+
+    def merge(self, child):
+        self.rows += child.rows
+        self.vm_steps += child.vm_steps
+        for sql, stats in child.statements.items():
+            totals = self.statements[sql]
+            for index, value in enumerate(stats):
+                totals[index] += value
+
+    def summary(self):
+        return (f"{self.name}: {self.elapsed_ms:.1f} ms, SQL {self.statement_count} stmt(s) "
+                f"{self.sql_ms:.1f} ms, {self.rows} rows")
+
+
+class _Statement:
+    __slots__ = ('connection', 'sql', 'start', 'changes', 'rows')
+
+    def __init__(self, connection, sql, changes):
+        self.connection = connection
+        self.sql = sql
+        self.start = time.perf_counter()
+        self.changes = changes
+        self.rows = 0
+
+
+class Profiler:
+    def __init__(self):
+        self.enabled = False
+        self.log_path = None
+        self._handler = None
+        self._connections = weakref.WeakSet()
+        self._listeners = []
+        self._local = threading.local()
+
+    def attach(self, connection):
+        """Have ``connection`` traced whenever profiling is on."""
+        self._connections.add(connection)
+        if self.enabled:
+            self._install(connection)
+
+    def add_listener(self, callback):
+        """Call ``callback(operation)`` after each top-level operation, on the thread that ran it."""
+        self._listeners.append(callback)
+
+    def remove_listener(self, callback):
+        self._listeners.remove(callback)
+
+    def enable(self, log_path=None):
+        if self.enabled:
+            return
+        if log_path:
+            self._handler = RotatingFileHandler(log_path, maxBytes=LOG_MAX_BYTES,
+                                                backupCount=LOG_BACKUP_COUNT, encoding='utf-8')
+            self._handler.setFormatter(logging.Formatter('%(asctime)s %(threadName)s %(message)s'))
+            logger.addHandler(self._handler)
+            logger.setLevel(logging.INFO)
+        self.log_path = log_path
+        self.enabled = True
+        for connection in list(self._connections):
+            self._install(connection)
+
+    def disable(self):
+        if not self.enabled:
+            return
+        self.enabled = False
+        for connection in list(self._connections):
+            self._uninstall(connection)
+        if self._handler is not None:
+            logger.removeHandler(self._handler)
+            self._handler.close()
+            self._handler = None
+
+    def _install(self, connection):
+        try:
+            connection.set_trace_callback(lambda sql: self._trace(connection, sql))
+            connection.set_progress_handler(self._progress, PROGRESS_STEPS)
+        except Exception:
+            # Closed, or owned by another thread; it is picked up again by attach() if reopened.
+            pass
+
+    def _uninstall(self, connection):
+        try:
+            connection.set_trace_callback(None)
+            connection.set_progress_handler(None, 0)
+        except Exception:
+            pass
+
+    def operation(self, name):
+        """Context manager timing ``name``; a no-op while profiling is off."""
+        if not self.enabled:
+            return nullcontext()
+        return self._operation(name)
+
+    @contextmanager
+    def _operation(self, name):
+        local = self._local
+        operation = Operation(name, getattr(local, 'operation', None))
+        local.operation = operation
+        try:
+            yield operation
+        finally:
+            self._close_statement()
+            operation.elapsed_ms = (time.perf_counter() - operation.start) * 1000
+            local.operation = operation.parent
+            if operation.parent is not None:
+                operation.parent.merge(operation)
+            else:
+                self._finish(operation)
+
+    def rows(self, count):
+        """Credit ``count`` fetched rows to the running statement or operation."""
+        if not self.enabled:
+            return
+        statement = getattr(self._local, 'statement', None)
+        if statement is not None:
+            statement.rows += count
+        else:
+            operation = getattr(self._local, 'operation', None)
+            if operation is not None:
+                operation.rows += count
+
+    def _trace(self, connection, sql):
+        local = self._local
+        if getattr(local, 'operation', None) is None:
+            return
+        # Statements run by SQLite itself on behalf of the current one come as
+        # "-- ..." comments, name FTS5 shadow tables as 'main'.'...', or (for
+        # triggers) repeat the text of the statement that fired them.
+        if sql.startswith('--') or "'main'." in sql:
+            return
+        statement = getattr(local, 'statement', None)
+        if statement is not None and statement.connection is connection and statement.sql == sql:
+            return
+        self._close_statement()
+        local.statement = _Statement(connection, sql, connection.total_changes)
+
+    def _close_statement(self):
+        local = self._local
+        statement = getattr(local, 'statement', None)
+        if statement is None:
+            return
+        local.statement = None
+        elapsed_ms = (time.perf_counter() - statement.start) * 1000
+        try:
+            changes = statement.connection.total_changes - statement.changes
+        except Exception:
+            changes = 0
+        operation = getattr(local, 'operation', None)
+        if operation is None:
+            return
+        stats = operation.statements[normalize_sql(statement.sql)]
+        stats[0] += 1
+        stats[1] += elapsed_ms
+        stats[2] += statement.rows
+        stats[3] += changes
+        operation.rows += statement.rows
+
+    def _progress(self):
+        operation = getattr(self._local, 'operation', None)
+        if operation is not None:
+            operation.vm_steps += PROGRESS_STEPS
+        return 0
+
+    def _finish(self, operation):
+        if self._handler is not None:
+            logger.info("%s, %d VM steps", operation.summary(), operation.vm_steps)
+            slowest = sorted(operation.statements.items(), key=lambda item: item[1][1], reverse=True)
+            for sql, (executions, elapsed_ms, rows, changes) in slowest[:LOGGED_STATEMENTS]:
+                logger.info("    %dx %.2f ms rows=%d changes=%d  %s", executions, elapsed_ms, rows, changes, sql[:300])
+        for callback in list(self._listeners):
+            callback(operation)
+
+    def export_log(self, path):
+        """Copy the rotated log files, oldest first, into ``path``."""
+        if self._handler is not None:
+            self._handler.flush()
+        sources = [f"{self.log_path}.{index}" for index in range(LOG_BACKUP_COUNT, 0, -1)] + [self.log_path]
+        with open(path, 'wb') as target:
+            for source in sources:
+                if source and os.path.exists(source):
+                    with open(source, 'rb') as file:
+                        target.write(file.read())
+
+
+profiler = Profiler()
+
+
+def default_log_path(directory):
+    return os.environ.get(LOG_ENV_VAR) or os.path.join(directory, LOG_FILE)
+
+
+def enable_from_environment(directory):
+    """Switch profiling on when SSIS_PROFILE is set; returns whether it is on."""
+    if os.environ.get(ENV_VAR, '') not in ('', '0'):
+        profiler.enable(default_log_path(directory))
+    return profiler.enabled
@@ -0,0 +1,121 @@
+"""Student edits staged in memory and committed together, with undo and redo."""
+
+from collections import namedtuple
+
+from ssis.schema import STUDENT_COLUMNS
+
+EDITABLE_FIELDS = ('StudentName', 'Gender', 'Year', 'CourseCode')
+UNDO_LIMIT = 100
+
+Edit = namedtuple('Edit', 'description before after')
+Edit.__doc__ = """A committed batch of edits.
+
+``before`` and ``after`` map each StudentID the batch changed to its row
+(``(rowid, *STUDENT_COLUMNS)``) before and after, or to None where the
+student did not exist.
+"""
+
+
+def _updated(row, values):
+    row = list(row)
+    for field, value in values.items():
+        row[STUDENT_COLUMNS.index(field) + 1] = value
+    return tuple(row)
+
+
+class EditJournal:
+    """Deletes and updates of students, staged and then committed as one transaction.
+
+    stage_delete() and stage_update() only record what to do. commit()
+    reads the students involved once, works out their new rows in memory
+    and writes them through StudentRepository.write(), so a batch of
+    hundreds of edits costs a single commit. The rows each batch replaced
+    are kept, and undo() and redo() write the old or the new rows back,
+    again in one transaction each.
+
+    Another window or workstation may change the same students in the
+    meantime. Every write first checks, in its transaction, that the
+    students still hold the rows the journal last saw; if any does not,
+    StudentRepository.write() raises EditConflict, nothing is written and
+    the edit stays where it was on the undo or redo stack.
+    """
+
+    def __init__(self, students, limit=UNDO_LIMIT):
+        self.students = students
+        self.limit = limit
+        self.pending = []
+        self._undo = []
+        self._redo = []
+
+    def stage_delete(self, student_ids):
+        self.pending.append((list(student_ids), None))
+
+    def stage_update(self, student_ids, **values):
+        unknown = set(values) - set(EDITABLE_FIELDS)
+        if unknown:
+            raise ValueError(f"Cannot edit {', '.join(sorted(unknown))}")
+        if 'CourseCode' in values:
+            values['CourseCode'] = values['CourseCode'] or None
+        self.pending.append((list(student_ids), values))
+
+    def discard(self):
+        self.pending = []
+
+    def commit(self, description):
+        """Apply the staged edits in one transaction; returns the Edit, or None if nothing changed.
+
+        The staged edits are dropped either way. Raises
+        sqlite3.IntegrityError, having written nothing, if an update names a
+        course that does not exist, and EditConflict if a student changed
+        between being read and written.
+        """
+        pending, self.pending = self.pending, []
+        before = self.students.rows({student_id for student_ids, _ in pending for student_id in student_ids})
+        after = dict(before)
+        for student_ids, values in pending:
+            for student_id in student_ids:
+                row = after.get(student_id)
+                if row is not None:
+                    after[student_id] = None if values is None else _updated(row, values)
+
+        changed = [student_id for student_id, row in after.items() if row != before[student_id]]
+        if not changed:
+            return None
+        edit = Edit(description,
+                    {student_id: before[student_id] for student_id in changed},
+                    {student_id: after[student_id] for student_id in changed})
+        self.students.write(edit.after, expected=edit.before)
+        self._undo.append(edit)
+        del self._undo[:-self.limit]
+        self._redo.clear()
+        return edit
+
+    def can_undo(self):
+        return bool(self._undo)
+
+    def can_redo(self):
+        return bool(self._redo)
+
+    def undo_description(self):
+        return self._undo[-1].description if self._undo else None
+
+    def redo_description(self):
+        return self._redo[-1].description if self._redo else None
+
+    def undo(self):
+        """Put back the rows the last batch replaced; returns its Edit, or None if there is none."""
+        if not self._undo:
+            return None
+        edit = self._undo[-1]
+        self.students.write(edit.before, expected=edit.after)
+        self._redo.append(self._undo.pop())
+        return edit
+
+    def redo(self):
+        """Apply the last undone batch again; returns its Edit, or None if there is none."""
+        if not self._redo:
+            return None
+        edit = self._redo[-1]
+        self.students.write(edit.after, expected=edit.before)
+        self._undo.append(self._redo.pop())
+        return edit
@@ -0,0 +1,190 @@
+"""Search-as-you-type for the table models, with queries run off the GUI thread."""
+
+import sqlite3
+
+from PyQt6.QtCore import QObject, QRunnable, QThreadPool, QTimer, pyqtSignal
+
+from ssis.instrumentation import profiler
+
+DEBOUNCE_MS = 200
+SNAPSHOT_LIMIT = 5000
+
+
+class QueryWorkerSignals(QObject):
+    finished = pyqtSignal(int, object)
+    interrupted = pyqtSignal(int)
+    failed = pyqtSignal(int, str)
+
+
+class QueryWorker(QRunnable):
+    """Runs one SELECT on a reader connection and reports its rows.
+
+    At most ``limit`` rows are fetched; callers ask for one more than they
+    can use to learn whether the result was truncated. A worker that only
+    starts once ``current_generation()`` has moved past its own reports
+    itself interrupted without running the query.
+    """
+
+    def __init__(self, generation, current_generation, connection, sql, params, limit):
+        super().__init__()
+        self.generation = generation
+        self.current_generation = current_generation
+        self.connection = connection
+        self.sql = sql
+        self.params = params
+        self.limit = limit
+        self.signals = QueryWorkerSignals()
+
+    def run(self):
+        if self.current_generation() != self.generation:
+            self.signals.interrupted.emit(self.generation)
+            return
+        try:
+            with profiler.operation('filter_query'):
+                cursor = self.connection.execute(self.sql, self.params)
+                rows = cursor.fetchmany(self.limit)
+                # The rest are not wanted; a server would otherwise keep them for a while.
+                cursor.close()
+                profiler.rows(len(rows))
+        except sqlite3.OperationalError as error:
+            if str(error) == 'interrupted':
+                self.signals.interrupted.emit(self.generation)
+            else:
+                self.signals.failed.emit(self.generation, str(error))
+            return
+        self.signals.finished.emit(self.generation, rows)
+
+
+class LiveFilter(QObject):
+    """Keeps a PagedTableModel filtered to the text typed into a QLineEdit.
+
+    Keystrokes are debounced, then the query runs on a single-thread pool over
+    a reader connection of its own, opened by ``open_reader``. Starting a
+    new query takes the older ones still queued off the pool and interrupts
+    the one in flight, and no other filter's; an older one that starts
+    anyway returns at once. Results of up to SNAPSHOT_LIMIT rows are shown
+    as an in-memory snapshot, and typing more characters onto such a result
+    narrows the snapshot directly instead of querying again. Larger results
+    are left to the model's own paging.
+
+    ``make_filter(text)`` returns ``(where, params, matches)`` for ``text``,
+    where ``matches(row)`` tests one row of field values, or None to show
+    every row. A None ``matches`` always runs the query.
+
+    When ``search_memory`` is set, ``search_memory(text, limit)`` is asked
+    first for up to ``limit`` matching rows held in memory (see
+    ssis.columnar); it answers on the spot, or returns None to let the query
+    run. Call shutdown() before the model goes away.
+    """
+
+    failed = pyqtSignal(str)
+
+    def __init__(self, model, line_edit, open_reader, make_filter, parent=None):
+        super().__init__(parent)
+        self.model = model
+        self.line_edit = line_edit
+        self.reader = open_reader()
+        self.make_filter = make_filter
+        self.search_memory = None
+
+        self._pool = QThreadPool(self)
+        self._pool.setMaxThreadCount(1)
+        self._workers = {}
+        self._generation = 0
+        self._pending = None
+        self._snapshot_text = None
+
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(DEBOUNCE_MS)
+        self._timer.timeout.connect(self.apply)
+        self.line_edit.textChanged.connect(self.schedule)
+
+    def schedule(self):
+        self._timer.start()
+
+    def reset(self):
+        """Forget the in-memory snapshot, e.g. after the table was written to."""
+        self._snapshot_text = None
+
+    def apply(self):
+        """Filter for the current text right away."""
+        self._timer.stop()
+        text = self.line_edit.text().strip()
+        self._generation += 1
+        self._cancel()
+
+        spec = self.make_filter(text) if text else None
+        if spec is None:
+            self._snapshot_text = None
+            self.model.set_filter()
+            return
+        where, params, matches = spec
+
+        if (matches is not None and self._snapshot_text is not None and self._snapshot_text in text
+                and self.model.snapshot_rows() is not None):
+            rows = [row for row in self.model.snapshot_rows() if matches(row[1:])]
+            self.model.set_rows(rows, where, params)
+            self._snapshot_text = text
+            return
+
+        self._snapshot_text = None
+        self._pending = (text, where, params)
+        if self.search_memory is not None:
+            rows = self.search_memory(text, SNAPSHOT_LIMIT + 1)
+            if rows is not None:
+                self._show(rows)
+                return
+        self._submit(self._generation)
+
+    def _submit(self, generation):
+        text, where, params = self._pending
+        worker = QueryWorker(generation, self.current_generation, self.reader, self.model.select_sql(where),
+                             (*params, SNAPSHOT_LIMIT + 1), SNAPSHOT_LIMIT + 1)
+        worker.setAutoDelete(False)
+        worker.signals.finished.connect(self._finished)
+        worker.signals.interrupted.connect(self._interrupted)
+        worker.signals.failed.connect(self._failed)
+        self._workers[generation] = worker
+        self._pool.start(worker)
+
+    def current_generation(self):
+        """Return the number of the latest filter asked for; read from the worker thread."""
+        return self._generation
+
+    def _cancel(self):
+        for generation, worker in list(self._workers.items()):
+            if self._pool.tryTake(worker):
+                del self._workers[generation]
+        if self._workers:
+            self.reader.interrupt()
+
+    def _finished(self, generation, rows):
+        self._workers.pop(generation, None)
+        if generation == self._generation:
+            self._show(rows)
+
+    def _show(self, rows):
+        text, where, params = self._pending
+        if len(rows) > SNAPSHOT_LIMIT:
+            self.model.set_filter(where, params)
+        else:
+            self.model.set_rows(rows, where, params)
+            self._snapshot_text = text
+
+    def _interrupted(self, generation):
+        self._workers.pop(generation, None)
+        # An interrupt aimed at an older query can land on the current one.
+        if generation == self._generation:
+            self._submit(generation)
+
+    def _failed(self, generation, message):
+        self._workers.pop(generation, None)
+        if generation == self._generation:
+            self.failed.emit(message)
+
+    def shutdown(self):
+        self._timer.stop()
+        self._cancel()
+        self._pool.waitForDone()
+        self.reader.close()
@@ -0,0 +1,93 @@
+"""Validation of a new student as it is typed, with the checks run off the GUI thread."""
+
+from PyQt6.QtCore import QObject, QRunnable, QThreadPool, QTimer, pyqtSignal
+
+from ssis.instrumentation import profiler
+from ssis.validation import validate_student
+
+DEBOUNCE_MS = 150
+
+
+class ValidationWorkerSignals(QObject):
+    finished = pyqtSignal(int, object)
+    failed = pyqtSignal(int, str)
+
+
+class ValidationWorker(QRunnable):
+    """Runs validate_student() for one ID and name on a reader connection."""
+
+    def __init__(self, generation, connection, student_id, student_name):
+        super().__init__()
+        self.generation = generation
+        self.connection = connection
+        self.student_id = student_id
+        self.student_name = student_name
+        self.signals = ValidationWorkerSignals()
+
+    def run(self):
+        try:
+            with profiler.operation('validate_student'):
+                issues = validate_student(self.connection, self.student_id, self.student_name)
+        except Exception as error:
+            self.signals.failed.emit(self.generation, str(error))
+            return
+        self.signals.finished.emit(self.generation, issues)
+
+
+class LiveValidator(QObject):
+    """Checks the student typed into an ID and a name QLineEdit; see ssis.validation.
+
+    Keystrokes are debounced and the checks run on a single-thread pool
+    over a reader connection of their own, opened by ``open_reader``.
+    ``validated`` carries the issues found for the latest text only;
+    results for text typed over since are dropped. Call shutdown() when
+    the dialog closes.
+    """
+
+    validated = pyqtSignal(object)
+    failed = pyqtSignal(str)
+
+    def __init__(self, id_edit, name_edit, open_reader, parent=None):
+        super().__init__(parent)
+        self.id_edit = id_edit
+        self.name_edit = name_edit
+        self.reader = open_reader()
+
+        self._pool = QThreadPool(self)
+        self._pool.setMaxThreadCount(1)
+        self._workers = {}
+        self._generation = 0
+
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(DEBOUNCE_MS)
+        self._timer.timeout.connect(self.apply)
+        self.id_edit.textChanged.connect(self._timer.start)
+        self.name_edit.textChanged.connect(self._timer.start)
+
+    def apply(self):
+        """Check the current text right away."""
+        self._timer.stop()
+        self._generation += 1
+        worker = ValidationWorker(self._generation, self.reader, self.id_edit.text().strip(),
+                                  self.name_edit.text().strip())
+        worker.setAutoDelete(False)
+        worker.signals.finished.connect(self._finished)
+        worker.signals.failed.connect(self._failed)
+        self._workers[self._generation] = worker
+        self._pool.start(worker)
+
+    def _finished(self, generation, issues):
+        self._workers.pop(generation, None)
+        if generation == self._generation:
+            self.validated.emit(issues)
+
+    def _failed(self, generation, message):
+        self._workers.pop(generation, None)
+        if generation == self._generation:
+            self.failed.emit(message)
+
+    def shutdown(self):
+        self._timer.stop()
+        self._pool.waitForDone()
+        self.reader.close()
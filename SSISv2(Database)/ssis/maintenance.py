@@ -0,0 +1,198 @@
+"""Backups, snapshots and upkeep of the student database file.
+
+backup() copies the database with SQLite's online backup API a few pages
+at a time, on a connection of its own, so the application keeps reading
+and writing meanwhile. The copy holds one read transaction from start to
+finish: under WAL it sees the database as it was when the copy began, and
+writes made in the meantime neither block it nor force it to start over.
+The pages go to a ``.partial`` file that is checked and renamed over the
+target only once complete, so an interrupted backup never leaves a
+damaged file under the target's name.
+
+snapshot() is a backup into the ``snapshots`` directory next to the
+database, named by the time it was taken; the oldest are pruned.
+restore() copies a snapshot back over the live database.
+
+maintain() returns the pages freed by deletes to the file system and
+refreshes the statistics the query planner chooses indexes by. New files
+are created with incremental auto-vacuum; an older file is converted by one
+full VACUUM, which only runs when asked for with ``full``. After that the
+free pages are released with incremental_vacuum, which is cheap enough to
+run on a schedule. The time of the last run is kept in the maintenance
+table so the application can tell when it is due.
+"""
+
+import datetime
+import glob
+import os
+import sqlite3
+from collections import namedtuple
+
+from ssis.database import connect
+
+BACKUP_PAGES = 1024
+SNAPSHOT_DIR = 'snapshots'
+SNAPSHOT_KEEP = 10
+# Days between the maintenance runs the application starts by itself.
+MAINTENANCE_INTERVAL_DAYS = 7
+
+# PRAGMA auto_vacuum values.
+AUTO_VACUUM_INCREMENTAL = 2
+
+MaintenanceReport = namedtuple('MaintenanceReport', 'pages_before pages_after page_size vacuumed incremental')
+MaintenanceReport.__doc__ = """Outcome of maintain().
+
+``pages_before`` and ``pages_after`` are the file's size in pages of
+``page_size`` bytes, ``vacuumed`` tells whether a full VACUUM ran and
+``incremental`` whether the file now releases free pages incrementally.
+"""
+
+
+def _freed(report):
+    return max(0, report.pages_before - report.pages_after) * report.page_size
+
+
+MaintenanceReport.freed_bytes = property(_freed)
+
+
+class BackupCancelled(Exception):
+    """Raised by backup() when ``is_cancelled()`` turned true."""
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def backup(database, path, pages=BACKUP_PAGES, on_progress=None, is_cancelled=None):
+    """Copy the database file ``database`` to ``path`` as it was when the copy began.
+
+    ``on_progress(copied, total)`` is called in pages after every step of
+    ``pages`` pages. Returns the number of pages copied.
+    """
+    partial = path + '.partial'
+    _remove(partial)
+    source = connect(database, check_same_thread=False)
+    target = sqlite3.connect(partial)
+    copied = []
+
+    def progress(status, remaining, total):
+        copied[:] = [total]
+        if on_progress is not None:
+            on_progress(total - remaining, total)
+        if is_cancelled is not None and is_cancelled():
+            raise BackupCancelled(path)
+
+    try:
+        source.execute("BEGIN")
+        source.execute("SELECT count(*) FROM sqlite_master").fetchone()
+        try:
+            source.backup(target, pages=pages, progress=progress)
+        finally:
+            source.execute("ROLLBACK")
+        # A backup is one self-contained file, whatever mode the source uses.
+        target.execute("PRAGMA journal_mode=DELETE")
+        result = target.execute("PRAGMA quick_check").fetchone()[0]
+        if result != 'ok':
+            raise sqlite3.DatabaseError(f"The copy failed its integrity check: {result}")
+    except BaseException:
+        target.close()
+        _remove(partial)
+        raise
+    finally:
+        source.close()
+    target.close()
+    os.replace(partial, path)
+    return copied[0] if copied else 0
+
+
+def snapshot_dir(database):
+    return os.path.join(os.path.dirname(os.path.abspath(database)), SNAPSHOT_DIR)
+
+
+def snapshots(database):
+    """Return the paths of ``database``'s snapshots, oldest first."""
+    stem = os.path.splitext(os.path.basename(database))[0]
+    paths = glob.glob(os.path.join(glob.escape(snapshot_dir(database)), f"{glob.escape(stem)}-*.db"))
+    return sorted(paths, key=lambda path: (os.path.getmtime(path), path))
+
+
+def snapshot(database, keep=SNAPSHOT_KEEP, on_progress=None, is_cancelled=None):
+    """Back ``database`` up into its snapshot directory and return the snapshot's path.
+
+    Snapshots beyond the newest ``keep`` are deleted; None keeps them all.
+    """
+    directory = snapshot_dir(database)
+    os.makedirs(directory, exist_ok=True)
+    stem = os.path.splitext(os.path.basename(database))[0]
+    taken = datetime.datetime.now().strftime('%Y%m%d-%H%M%S')
+    path = os.path.join(directory, f"{stem}-{taken}.db")
+    number = 1
+    while os.path.exists(path):
+        number += 1
+        path = os.path.join(directory, f"{stem}-{taken}-{number}.db")
+    backup(database, path, on_progress=on_progress, is_cancelled=is_cancelled)
+    if keep is not None:
+        for old in snapshots(database)[:-keep or None]:
+            os.remove(old)
+    return path
+
+
+def restore(connection, path):
+    """Replace the database open on ``connection`` with the snapshot or backup at ``path``.
+
+    The file is checked before anything is copied. Other connections see
+    the restored contents from their next transaction on.
+    """
+    source = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        result = source.execute("PRAGMA quick_check").fetchone()[0]
+        if result != 'ok':
+            raise sqlite3.DatabaseError(f"{os.path.basename(path)} failed its integrity check: {result}")
+        source.backup(connection)
+    finally:
+        source.close()
+
+
+def last_run(connection, task='maintain'):
+    """Return when ``task`` last finished, as an SQLite datetime string, or None."""
+    row = connection.execute("SELECT LastRun FROM maintenance WHERE Task = ?", (task,)).fetchone()
+    return row[0] if row else None
+
+
+def is_due(connection, task='maintain', days=MAINTENANCE_INTERVAL_DAYS):
+    row = connection.execute(
+        "SELECT julianday('now') - julianday(LastRun) FROM maintenance WHERE Task = ?", (task,)).fetchone()
+    return row is None or row[0] >= days
+
+
+def maintain(database, full=False):
+    """Release free pages and refresh the planner's statistics for the database file ``database``.
+
+    With ``full``, the whole file is rebuilt by VACUUM, which also turns on
+    incremental auto-vacuum if it is off; that takes a while on a large
+    roster and holds the write lock throughout. Returns a MaintenanceReport.
+    """
+    connection = connect(database)
+    try:
+        page_size = connection.execute("PRAGMA page_size").fetchone()[0]
+        pages_before = connection.execute("PRAGMA page_count").fetchone()[0]
+        incremental = connection.execute("PRAGMA auto_vacuum").fetchone()[0] == AUTO_VACUUM_INCREMENTAL
+        if full:
+            # connect() has asked for incremental auto-vacuum, which VACUUM applies.
+            connection.execute("VACUUM")
+            incremental = True
+        elif incremental:
+            # The pragma frees one page per step, and execute() takes only the
+            # first step of a statement that returns no columns.
+            connection.executescript("PRAGMA incremental_vacuum")
+        connection.execute("ANALYZE")
+        connection.execute(
+            "INSERT INTO maintenance (Task, LastRun) VALUES ('maintain', datetime('now')) "
+            "ON CONFLICT DO UPDATE SET LastRun = excluded.LastRun")
+        pages_after = connection.execute("PRAGMA page_count").fetchone()[0]
+    finally:
+        connection.close()
+    return MaintenanceReport(pages_before, pages_after, page_size, full, incremental)
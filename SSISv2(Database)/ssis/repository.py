@@ -0,0 +1,344 @@
+"""Data access for students and courses, independent of the GUI.
+
+Every write commits before it returns and is then published on the optional
+EventBus, so views stay in step whether a change comes from the window, the
+command line or a script.
+"""
+
+import json
+from collections import namedtuple
+
+from ssis import audit, events, statistics, validation
+from ssis.database import write_transaction
+from ssis.exporter import count_rows, export_query
+from ssis.filters import QUERY_FIELD, compile_filter, parse_filter, query_plan
+from ssis.importer import import_courses, import_students
+from ssis.schema import COURSE_COLUMNS, STUDENT_COLUMNS
+from ssis.search import course_filter, search_courses, search_students, student_filter
+
+CourseChange = namedtuple('CourseChange', 'found rowid students')
+CourseChange.__doc__ = """Outcome of a course delete or rename.
+
+``found`` tells whether the course exists, ``rowid`` is its row and
+``students`` the number of students whose CourseCode is (or, for a dry run,
+would be) changed.
+"""
+
+REPORT_FIELDS = statistics.FIELDS
+# Above this many rows a bulk write is published as one change, not row by row.
+PUBLISH_LIMIT = 500
+
+
+class EditConflict(Exception):
+    """Raised by StudentRepository.write() when students no longer look as the caller expected.
+
+    ``student_ids`` lists the students that were changed by someone else.
+    """
+
+    def __init__(self, student_ids):
+        shown = ', '.join(student_ids[:5]) + (f" and {len(student_ids) - 5} more" if len(student_ids) > 5 else '')
+        super().__init__(f"{shown} changed since; reload and try again")
+        self.student_ids = student_ids
+
+
+class _Repository:
+    table = None
+    columns = ()
+    key = None
+    default_field = None
+
+    def __init__(self, db, bus=None):
+        self.db = db
+        self.bus = bus
+
+    def _publish(self, table, change, rowid=None):
+        if self.bus is not None:
+            self.bus.publish(table, change, rowid)
+
+    def _filter(self, text, field):
+        raise NotImplementedError
+
+    def filter_clause(self, text='', field=None):
+        """Return the ``(where, params)`` selecting rows that contain ``text``."""
+        if not text:
+            return '', ()
+        return self._filter(text, field or self.default_field)
+
+    def get(self, key):
+        return self.db.execute(
+            f"SELECT {', '.join(self.columns)} FROM {self.table} WHERE {self.key}=?", (key,)).fetchone()
+
+    def exists(self, key):
+        return self.db.execute(f"SELECT 1 FROM {self.table} WHERE {self.key}=?", (key,)).fetchone() is not None
+
+    def _filter_query(self, text, field, limit):
+        where, params = self.filter_clause(text, field)
+        return (f"SELECT {', '.join(self.columns)} FROM {self.table} WHERE {where or '1'} ORDER BY rowid LIMIT ?",
+                (*params, limit))
+
+    def filter(self, text='', field=None, limit=-1):
+        """Return a cursor over the rows containing ``text``, in table order."""
+        return self.db.execute(*self._filter_query(text, field, limit))
+
+    def plan(self, text='', field=None, limit=-1):
+        """Return SQLite's query plan for filter(), one line per step."""
+        return query_plan(self.db, *self._filter_query(text, field, limit))
+
+    def count(self, text='', field=None):
+        where, params = self.filter_clause(text, field)
+        return count_rows(self.db.connection, self.table, where, params)
+
+    def export(self, path, text='', field=None, on_progress=None, is_cancelled=None):
+        """Write the rows containing ``text`` to ``path``; see exporter.export_query."""
+        where, params = self.filter_clause(text, field)
+        return export_query(self.db.connection, self.table, self.columns, where, params, path,
+                            on_progress, is_cancelled)
+
+
+class StudentRepository(_Repository):
+    table = 'students'
+    columns = STUDENT_COLUMNS
+    key = 'StudentID'
+    default_field = 'All'
+
+    def _filter(self, text, field):
+        if field == QUERY_FIELD:
+            return compile_filter(parse_filter(text))
+        return student_filter(text, field)
+
+    def search(self, text, limit=50):
+        return search_students(self.db.connection, text, limit)
+
+    def add(self, student_id, student_name, gender, year, course_code=None):
+        """Insert a student and return its rowid.
+
+        Raises sqlite3.IntegrityError if the ID is taken or ``course_code``
+        names no course.
+        """
+        with write_transaction(self.db):
+            cursor = self.db.execute(
+                "INSERT INTO students (StudentID, StudentName, Gender, Year, CourseCode) VALUES (?, ?, ?, ?, ?)",
+                (student_id, student_name, gender, year, course_code or None))
+        self._publish('students', events.INSERT, cursor.lastrowid)
+        return cursor.lastrowid
+
+    def update(self, student_id, student_name, gender, year, course_code=None):
+        """Rewrite a student's details; returns its rowid, or None if there is no such student."""
+        with write_transaction(self.db):
+            updated = self.db.execute(
+                "UPDATE students SET StudentName=?, Gender=?, Year=?, CourseCode=? WHERE StudentID=? RETURNING rowid",
+                (student_name, gender, year, course_code or None, student_id)).fetchone()
+        if updated is None:
+            return None
+        self._publish('students', events.UPDATE, updated[0])
+        return updated[0]
+
+    def delete(self, student_id):
+        """Delete a student; returns its rowid, or None if there is no such student."""
+        with write_transaction(self.db):
+            deleted = self.db.execute(
+                "DELETE FROM students WHERE StudentID=? RETURNING rowid", (student_id,)).fetchone()
+        if deleted is None:
+            return None
+        self._publish('students', events.DELETE, deleted[0])
+        return deleted[0]
+
+    def validate(self, student_id, student_name):
+        """Return the validation.Issue list for a new student with this ID and name."""
+        return validation.validate_student(self.db.connection, student_id, student_name)
+
+    def similar(self, student_name, limit=validation.SIMILAR_LIMIT, exclude=None):
+        """Return ``(score, student)`` pairs for students named like ``student_name``; see ssis.validation."""
+        return validation.similar_students(self.db.connection, student_name, limit, exclude)
+
+    def rows(self, student_ids):
+        """Return ``{student_id: (rowid, *columns)}`` for those of ``student_ids`` that exist."""
+        cursor = self.db.execute(
+            f"SELECT rowid, {', '.join(self.columns)} FROM students "
+            f"WHERE StudentID IN (SELECT value FROM json_each(?))", (json.dumps(list(student_ids)),))
+        return {row[1]: row for row in cursor}
+
+    def write(self, rows, expected=None):
+        """Make each student in ``rows`` match its image, in one transaction.
+
+        ``rows`` maps StudentIDs to rows as returned by rows(), or to None to
+        delete the student. A student that no longer exists is inserted
+        again, under its old rowid if that is still free. Raises
+        sqlite3.IntegrityError, writing nothing, if a row names a course
+        that is gone. Returns the number of students written.
+
+        ``expected``, if given, maps the same StudentIDs to the rows they
+        must hold now, or None where they must not exist; rowids are not
+        compared. If any differs, EditConflict is raised and nothing is
+        written.
+        """
+        # One statement per kind of change: the full-text index pays a fixed
+        # cost per statement, which dominates when rows are written one by one.
+        deleted = [student_id for student_id, row in rows.items() if row is None]
+        images = [row for row in rows.values() if row is not None]
+        with write_transaction(self.db):
+            if expected is not None:
+                self._check(expected)
+            changes = [(events.DELETE, rowid) for rowid, in self.db.execute(
+                "DELETE FROM students WHERE StudentID IN (SELECT value FROM json_each(?)) RETURNING rowid",
+                (json.dumps(deleted),)).fetchall()]
+            updated = self.db.execute(
+                "UPDATE students SET StudentName=json_extract(image.value, '$[2]'), "
+                "Gender=json_extract(image.value, '$[3]'), Year=json_extract(image.value, '$[4]'), "
+                "CourseCode=json_extract(image.value, '$[5]') "
+                "FROM json_each(?) AS image WHERE students.StudentID = json_extract(image.value, '$[1]') "
+                "RETURNING students.rowid, students.StudentID", (json.dumps(images),)).fetchall()
+            changes.extend((events.UPDATE, rowid) for rowid, _ in updated)
+            updated_ids = {student_id for _, student_id in updated}
+            inserted = self.db.execute(
+                "INSERT INTO students (rowid, StudentID, StudentName, Gender, Year, CourseCode) "
+                "SELECT iif(EXISTS (SELECT 1 FROM students WHERE rowid = json_extract(image.value, '$[0]')), "
+                "NULL, json_extract(image.value, '$[0]')), json_extract(image.value, '$[1]'), "
+                "json_extract(image.value, '$[2]'), json_extract(image.value, '$[3]'), "
+                "json_extract(image.value, '$[4]'), json_extract(image.value, '$[5]') "
+                "FROM json_each(?) AS image ORDER BY json_extract(image.value, '$[0]') RETURNING rowid",
+                (json.dumps([row for row in images if row[1] not in updated_ids]),)).fetchall()
+            changes.extend((events.INSERT, rowid) for rowid, in inserted)
+
+        if len(changes) > PUBLISH_LIMIT:
+            updates_only = all(change == events.UPDATE for change, _ in changes)
+            self._publish('students', events.UPDATE_MANY if updates_only else events.RESET)
+        else:
+            for change, rowid in changes:
+                self._publish('students', change, rowid)
+        return len(changes)
+
+    def _check(self, expected):
+        current = {student_id: row[1:] for student_id, row in self.rows(expected).items()}
+        changed = sorted(student_id for student_id, row in expected.items()
+                         if current.get(student_id) != (None if row is None else tuple(row[1:])))
+        if changed:
+            raise EditConflict(changed)
+
+    def import_file(self, path, **options):
+        """Bulk import students; see importer.import_students."""
+        report = import_students(self.db, path, **options)
+        if report.inserted:
+            self._publish('students', events.INSERT_MANY)
+        return report
+
+    def report(self, field='CourseCode'):
+        """Return ``(value, students)`` pairs counting the students per value of ``field``."""
+        return statistics.counts(self.db.connection, field)
+
+    def total(self):
+        return statistics.total(self.db.connection)
+
+    def stale_statistics(self):
+        """Return the summary counts that disagree with the students table; see statistics.stale_counts."""
+        return statistics.stale_counts(self.db.connection)
+
+    def rebuild_statistics(self):
+        """Recompute the summary counts behind report() from scratch."""
+        return statistics.rebuild(self.db.connection)
+
+
+class CourseRepository(_Repository):
+    table = 'courses'
+    columns = COURSE_COLUMNS
+    key = 'Code'
+    default_field = 'Code'
+
+    def _filter(self, text, field):
+        return course_filter(text, field)
+
+    def search(self, text, limit=50):
+        return search_courses(self.db.connection, text, limit)
+
+    def add(self, code, name):
+        """Insert a course and return its rowid; raises sqlite3.IntegrityError if the code is taken."""
+        with write_transaction(self.db):
+            cursor = self.db.execute("INSERT INTO courses (Code, Name) VALUES (?, ?)", (code, name))
+        self._publish('courses', events.INSERT, cursor.lastrowid)
+        return cursor.lastrowid
+
+    def _enrolment(self, code):
+        # One statement, so a dry run outside a transaction still counts a consistent snapshot.
+        course = self.db.execute(
+            "SELECT rowid, (SELECT count(*) FROM students WHERE CourseCode = courses.Code) FROM courses WHERE Code=?",
+            (code,)).fetchone()
+        if course is None:
+            return CourseChange(False, None, 0)
+        return CourseChange(True, *course)
+
+    def delete(self, code, dry_run=False):
+        """Delete course ``code`` and unassign its students, in one transaction.
+
+        With ``dry_run`` nothing is written and the returned CourseChange only
+        reports what would happen; it only reads, so it takes no write lock.
+        """
+        if dry_run:
+            return self._enrolment(code)
+        with write_transaction(self.db):
+            change = self._enrolment(code)
+            if not change.found:
+                return change
+            self.db.execute("UPDATE students SET CourseCode=NULL WHERE CourseCode=?", (code,))
+            self.db.execute("DELETE FROM courses WHERE rowid=?", (change.rowid,))
+
+        self._publish('courses', events.DELETE, change.rowid)
+        if change.students:
+            self._publish('students', events.UPDATE_MANY)
+        return change
+
+    def rename(self, code, new_code, dry_run=False):
+        """Change course ``code`` to ``new_code``; students follow through ON UPDATE CASCADE.
+
+        Raises sqlite3.IntegrityError if ``new_code`` is already taken. A
+        ``dry_run`` only reads and reports what would happen, as for delete().
+        """
+        if dry_run:
+            return self._enrolment(code)
+        with write_transaction(self.db):
+            change = self._enrolment(code)
+            if not change.found or new_code == code:
+                return change
+            self.db.execute("UPDATE courses SET Code=? WHERE rowid=?", (new_code, change.rowid))
+
+        self._publish('courses', events.UPDATE, change.rowid)
+        if change.students:
+            self._publish('students', events.UPDATE_MANY)
+        return change
+
+    def import_file(self, path, **options):
+        """Bulk import courses; see importer.import_courses."""
+        report = import_courses(self.db, path, **options)
+        if report.inserted:
+            self._publish('courses', events.INSERT_MANY)
+        return report
+
+    def report(self):
+        """Return ``(code, name, students)`` for every course, in code order."""
+        return statistics.course_counts(self.db.connection)
+
+
+class ChangeLogRepository:
+    """The log of changes to students and courses; see ssis.audit."""
+
+    columns = audit.COLUMNS
+
+    def __init__(self, db):
+        self.db = db
+
+    def since(self, since=None, limit=-1, table=None, key=None):
+        return audit.changes_since(self.db.connection, since, limit, table, key)
+
+    def operations(self, since, until):
+        return audit.operations(self.db.connection, since, until)
+
+    def start(self):
+        return audit.start(self.db.connection)
+
+    def last(self):
+        return audit.last(self.db.connection)
+
+    def compact(self, before=None):
+        return audit.compact(self.db.connection, before)
+
+    def truncate(self, before):
+        return audit.truncate(self.db.connection, before)
@@ -0,0 +1,368 @@
+"""Versioned schema migrations for the unified student/course database.
+
+The schema version is kept in ``PRAGMA user_version``; MIGRATIONS[n] upgrades
+a database from version n to n + 1. All pending migrations run in a single
+transaction, so an interrupted upgrade leaves the file at its old version.
+"""
+
+import os.path
+import re
+
+from ssis.database import transaction
+
+# The columns of each table in the order the application reads and writes them.
+STUDENT_COLUMNS = ('StudentID', 'StudentName', 'Gender', 'Year', 'CourseCode')
+COURSE_COLUMNS = ('Code', 'Name')
+# How a missing value, such as the course of an unassigned student, is shown,
+# printed and written to CSV; imports read it back as missing.
+NOT_APPLICABLE = 'N/A'
+
+GENDERS = ("Male", "Female", "Other")
+YEARS = ("First", "Second", "Third", "Fourth")
+STUDENT_ID_PATTERN = re.compile(r"\d{4}-\d{4}")
+
+
+def _columns(connection, table, schema='main'):
+    return [row[1] for row in connection.execute(f"PRAGMA {schema}.table_info({table})")]
+
+
+def _migrate_v1(connection):
+    """Merge the two legacy files into one keyed, indexed and constrained schema.
+
+    Before version 1, students and courses lived in Student_Table.db and
+    Course_Table.db as plain TEXT tables without keys. Duplicate keys keep
+    their first row, the 'N/A' placeholder left by deleted courses becomes
+    NULL and course codes referenced by students but missing from the
+    catalogue are recreated so the foreign key holds.
+    """
+    had_students = bool(_columns(connection, 'students'))
+    if had_students:
+        connection.execute("ALTER TABLE students RENAME TO students_v0")
+
+    connection.execute(
+        "CREATE TABLE courses ("
+        "Code TEXT PRIMARY KEY NOT NULL, "
+        "Name TEXT NOT NULL)")
+    connection.execute(
+        "CREATE TABLE students ("
+        "StudentID TEXT PRIMARY KEY NOT NULL, "
+        "StudentName TEXT NOT NULL, "
+        "Gender TEXT, "
+        "Year TEXT, "
+        "CourseCode TEXT REFERENCES courses (Code) ON UPDATE CASCADE)")
+    connection.execute("CREATE INDEX students_course_code ON students (CourseCode)")
+    connection.execute("CREATE INDEX students_year ON students (Year)")
+    connection.execute("CREATE INDEX students_gender ON students (Gender)")
+
+    databases = [row[1] for row in connection.execute("PRAGMA database_list")]
+    if 'legacy' in databases and _columns(connection, 'courses', 'legacy'):
+        connection.execute(
+            "INSERT OR IGNORE INTO courses (Code, Name) "
+            "SELECT Code, coalesce(Name, Code) FROM legacy.courses "
+            "WHERE Code IS NOT NULL AND Code NOT IN ('', 'N/A')")
+
+    if had_students:
+        connection.execute(
+            "INSERT OR IGNORE INTO courses (Code, Name) "
+            "SELECT DISTINCT CourseCode, CourseCode FROM students_v0 "
+            "WHERE CourseCode IS NOT NULL AND CourseCode NOT IN ('', 'N/A')")
+        connection.execute(
+            "INSERT OR IGNORE INTO students (StudentID, StudentName, Gender, Year, CourseCode) "
+            "SELECT StudentID, coalesce(StudentName, ''), Gender, Year, nullif(nullif(CourseCode, ''), 'N/A') "
+            "FROM students_v0 WHERE StudentID IS NOT NULL ORDER BY rowid")
+        connection.execute("DROP TABLE students_v0")
+
+
+def _migrate_v2(connection):
+    """Add trigram full-text indexes over students and courses.
+
+    Both are external-content FTS5 tables, so only the index is stored; the
+    triggers below keep them in step with every insert, update and delete,
+    including the CourseCode updates cascaded from a course rename.
+    """
+    connection.execute(
+        "CREATE VIRTUAL TABLE students_fts USING fts5("
+        "StudentID, StudentName, CourseCode, "
+        "content='students', content_rowid='rowid', tokenize='trigram')")
+    connection.execute(
+        "CREATE TRIGGER students_fts_insert AFTER INSERT ON students BEGIN "
+        "INSERT INTO students_fts (rowid, StudentID, StudentName, CourseCode) "
+        "VALUES (new.rowid, new.StudentID, new.StudentName, new.CourseCode); "
+        "END")
+    connection.execute(
+        "CREATE TRIGGER students_fts_delete AFTER DELETE ON students BEGIN "
+        "INSERT INTO students_fts (students_fts, rowid, StudentID, StudentName, CourseCode) "
+        "VALUES ('delete', old.rowid, old.StudentID, old.StudentName, old.CourseCode); "
+        "END")
+    connection.execute(
+        "CREATE TRIGGER students_fts_update AFTER UPDATE OF StudentID, StudentName, CourseCode ON students BEGIN "
+        "INSERT INTO students_fts (students_fts, rowid, StudentID, StudentName, CourseCode) "
+        "VALUES ('delete', old.rowid, old.StudentID, old.StudentName, old.CourseCode); "
+        "INSERT INTO students_fts (rowid, StudentID, StudentName, CourseCode) "
+        "VALUES (new.rowid, new.StudentID, new.StudentName, new.CourseCode); "
+        "END")
+    connection.execute("INSERT INTO students_fts (students_fts) VALUES ('rebuild')")
+
+    connection.execute(
+        "CREATE VIRTUAL TABLE courses_fts USING fts5("
+        "Code, Name, "
+        "content='courses', content_rowid='rowid', tokenize='trigram')")
+    connection.execute(
+        "CREATE TRIGGER courses_fts_insert AFTER INSERT ON courses BEGIN "
+        "INSERT INTO courses_fts (rowid, Code, Name) VALUES (new.rowid, new.Code, new.Name); "
+        "END")
+    connection.execute(
+        "CREATE TRIGGER courses_fts_delete AFTER DELETE ON courses BEGIN "
+        "INSERT INTO courses_fts (courses_fts, rowid, Code, Name) VALUES ('delete', old.rowid, old.Code, old.Name); "
+        "END")
+    connection.execute(
+        "CREATE TRIGGER courses_fts_update AFTER UPDATE ON courses BEGIN "
+        "INSERT INTO courses_fts (courses_fts, rowid, Code, Name) VALUES ('delete', old.rowid, old.Code, old.Name); "
+        "INSERT INTO courses_fts (rowid, Code, Name) VALUES (new.rowid, new.Code, new.Name); "
+        "END")
+    connection.execute("INSERT INTO courses_fts (courses_fts) VALUES ('rebuild')")
+
+
+def _migrate_v3(connection):
+    """Index the sort orders of the grids for keyset paging.
+
+    Every index is a sort expression from ssis.sorting followed by the
+    primary key. Nullable columns sort through ifnull() and Year by its rank
+    in YEARS. The single-column indexes from version 1 stay: they give the
+    Gender and Year filters their rows in rowid order.
+    """
+    year_rank = ("CASE Year WHEN 'First' THEN 1 WHEN 'Second' THEN 2 WHEN 'Third' THEN 3 "
+                 "WHEN 'Fourth' THEN 4 ELSE 0 END")
+    connection.execute("CREATE INDEX students_name ON students (StudentName, StudentID)")
+    connection.execute("CREATE INDEX students_gender_sort ON students (ifnull(Gender, ''), StudentID)")
+    connection.execute(f"CREATE INDEX students_year_sort ON students ({year_rank}, StudentID)")
+    connection.execute("CREATE INDEX students_course_sort ON students (ifnull(CourseCode, ''), StudentID)")
+    connection.execute("CREATE INDEX courses_name ON courses (Name, Code)")
+
+
+def _migrate_v4(connection):
+    """Keep per-course, per-year and per-gender student counts in enrolment_counts.
+
+    The table holds one row per (CourseCode, Year, Gender) combination in
+    use, with NULL stored as ''. Triggers adjust it as students are added,
+    removed and edited. A course rename moves the course's rows in one
+    statement, so the student trigger skips the CourseCode updates cascaded
+    from it; those are the ones whose old code no longer exists.
+    """
+    cell = "ifnull({0}.CourseCode, ''), ifnull({0}.Year, ''), ifnull({0}.Gender, '')"
+    match = ("CourseCode = ifnull({0}.CourseCode, '') AND Year = ifnull({0}.Year, '') "
+             "AND Gender = ifnull({0}.Gender, '')")
+    increment = (f"INSERT INTO enrolment_counts (CourseCode, Year, Gender, Students) VALUES ({cell}, 1) "
+                 "ON CONFLICT DO UPDATE SET Students = Students + 1; ").format('new')
+    decrement = (f"UPDATE enrolment_counts SET Students = Students - 1 WHERE {match}; "
+                 f"DELETE FROM enrolment_counts WHERE {match} AND Students = 0; ").format('old')
+    connection.execute(
+        "CREATE TABLE enrolment_counts ("
+        "CourseCode TEXT NOT NULL, "
+        "Year TEXT NOT NULL, "
+        "Gender TEXT NOT NULL, "
+        "Students INTEGER NOT NULL, "
+        "PRIMARY KEY (CourseCode, Year, Gender)) WITHOUT ROWID")
+    connection.execute(
+        f"CREATE TRIGGER enrolment_counts_insert AFTER INSERT ON students BEGIN {increment}END")
+    connection.execute(
+        f"CREATE TRIGGER enrolment_counts_delete AFTER DELETE ON students BEGIN {decrement}END")
+    connection.execute(
+        "CREATE TRIGGER enrolment_counts_update AFTER UPDATE OF CourseCode, Year, Gender ON students "
+        "WHEN old.Year IS NOT new.Year OR old.Gender IS NOT new.Gender "
+        "OR (old.CourseCode IS NOT new.CourseCode "
+        "AND (old.CourseCode IS NULL OR EXISTS (SELECT 1 FROM courses WHERE Code = old.CourseCode))) "
+        f"BEGIN {decrement}{increment}END")
+    connection.execute(
+        "CREATE TRIGGER enrolment_counts_rename AFTER UPDATE OF Code ON courses WHEN old.Code IS NOT new.Code BEGIN "
+        "UPDATE enrolment_counts SET CourseCode = new.Code WHERE CourseCode = old.Code; "
+        "END")
+    connection.execute(
+        f"INSERT INTO enrolment_counts (CourseCode, Year, Gender, Students) "
+        f"SELECT {cell.format('students')}, count(*) FROM students GROUP BY 1, 2, 3")
+
+
+def _migrate_v5(connection):
+    """Re-index a student's text only when an update changes it.
+
+    The trigger from version 2 fired for every UPDATE naming an indexed
+    column, so rewriting whole rows, as edit batches and undo do, paid
+    for a full-text delete and insert per row even when only Year changed.
+    """
+    connection.execute("DROP TRIGGER students_fts_update")
+    connection.execute(
+        "CREATE TRIGGER students_fts_update AFTER UPDATE OF StudentID, StudentName, CourseCode ON students "
+        "WHEN old.StudentID IS NOT new.StudentID OR old.StudentName IS NOT new.StudentName "
+        "OR old.CourseCode IS NOT new.CourseCode BEGIN "
+        "INSERT INTO students_fts (students_fts, rowid, StudentID, StudentName, CourseCode) "
+        "VALUES ('delete', old.rowid, old.StudentID, old.StudentName, old.CourseCode); "
+        "INSERT INTO students_fts (rowid, StudentID, StudentName, CourseCode) "
+        "VALUES (new.rowid, new.StudentID, new.StudentName, new.CourseCode); "
+        "END")
+
+
+def _migrate_v6(connection):
+    """Keep the time each maintenance task last ran, so the application knows when one is due."""
+    connection.execute(
+        "CREATE TABLE maintenance ("
+        "Task TEXT PRIMARY KEY NOT NULL, "
+        "LastRun TEXT NOT NULL)")
+
+
+def _migrate_v7(connection):
+    """Log every change to students and courses in change_log; see ssis.audit."""
+    connection.execute(
+        "CREATE TABLE change_log ("
+        "Seq INTEGER PRIMARY KEY AUTOINCREMENT, "
+        "Changed TEXT NOT NULL DEFAULT (strftime('%Y-%m-%d %H:%M:%f', 'now')), "
+        "Actor TEXT, "
+        "TableName TEXT NOT NULL, "
+        "Operation TEXT NOT NULL, "
+        "Record INTEGER NOT NULL, "
+        "OldKey TEXT, "
+        "NewKey TEXT, "
+        "Data TEXT)")
+    connection.execute("CREATE TABLE change_log_start (Seq INTEGER NOT NULL)")
+    connection.execute("INSERT INTO change_log_start (Seq) VALUES (0)")
+    for table, columns in (('students', ('StudentID', 'StudentName', 'Gender', 'Year', 'CourseCode')),
+                           ('courses', ('Code', 'Name'))):
+        key = columns[0]
+        data = "json_object({})".format(', '.join(f"'{column}', new.{column}" for column in columns))
+        changed = ' OR '.join(f"old.{column} IS NOT new.{column}" for column in columns)
+        connection.execute(
+            f"CREATE TRIGGER {table}_change_insert AFTER INSERT ON {table} BEGIN "
+            f"INSERT INTO change_log (TableName, Operation, Record, NewKey, Data) "
+            f"VALUES ('{table}', 'INSERT', new.rowid, new.{key}, {data}); "
+            f"END")
+        connection.execute(
+            f"CREATE TRIGGER {table}_change_update AFTER UPDATE ON {table} WHEN {changed} BEGIN "
+            f"INSERT INTO change_log (TableName, Operation, Record, OldKey, NewKey, Data) "
+            f"VALUES ('{table}', 'UPDATE', new.rowid, old.{key}, new.{key}, {data}); "
+            f"END")
+        connection.execute(
+            f"CREATE TRIGGER {table}_change_delete AFTER DELETE ON {table} BEGIN "
+            f"INSERT INTO change_log (TableName, Operation, Record, OldKey) "
+            f"VALUES ('{table}', 'DELETE', old.rowid, old.{key}); "
+            f"END")
+
+
+def _migrate_v8(connection):
+    """Index students by the phonetic key of their name, for ssis.validation to find near duplicates.
+
+    The key is built here as it was when this version was made, so the
+    migration stays the same when ssis.validation's key changes; a new key
+    needs a later version that recreates students_name_key.
+    """
+    key = "lower(StudentName)"
+    for old, new in ((' ', ''), ('-', ''), ('.', ''), ('ph', 'f'), ('c', 'k'), ('q', 'k'), ('z', 's'),
+                     *((letter, '') for letter in 'aeiouyhw'), *((letter * 2, letter) for letter in 'klmnrst')):
+        key = f"replace({key}, '{old}', '{new}')"
+    connection.execute(f"CREATE INDEX students_name_key ON students ({key})")
+
+
+def _migrate_v9(connection):
+    """Fill in each change_log entry's Actor as it is written, and log a course rename before its cascade.
+
+    Version 7 left Actor to a TEMP trigger that updated every entry after it
+    was inserted, writing each one twice. The triggers now read it from
+    change_actor, which holds the actor only while one of the application's
+    own write transactions is open (see ssis.audit). The courses update
+    trigger runs BEFORE the update, so a rename is logged ahead of the
+    student updates its ON UPDATE CASCADE makes and a replay in Seq order
+    never sees a student in a course that does not exist yet.
+    """
+    connection.execute(
+        "CREATE TABLE change_actor ("
+        "Id INTEGER PRIMARY KEY CHECK (Id = 1), "
+        "Actor TEXT)")
+    actor = "(SELECT Actor FROM change_actor)"
+    for table, columns, timing in (('students', STUDENT_COLUMNS, 'AFTER'), ('courses', COURSE_COLUMNS, 'BEFORE')):
+        key = columns[0]
+        data = "json_object({})".format(', '.join(f"'{column}', new.{column}" for column in columns))
+        changed = ' OR '.join(f"old.{column} IS NOT new.{column}" for column in columns)
+        for operation in ('insert', 'update', 'delete'):
+            connection.execute(f"DROP TRIGGER {table}_change_{operation}")
+        connection.execute(
+            f"CREATE TRIGGER {table}_change_insert AFTER INSERT ON {table} BEGIN "
+            f"INSERT INTO change_log (Actor, TableName, Operation, Record, NewKey, Data) "
+            f"VALUES ({actor}, '{table}', 'INSERT', new.rowid, new.{key}, {data}); "
+            f"END")
+        connection.execute(
+            f"CREATE TRIGGER {table}_change_update {timing} UPDATE ON {table} WHEN {changed} BEGIN "
+            f"INSERT INTO change_log (Actor, TableName, Operation, Record, OldKey, NewKey, Data) "
+            f"VALUES ({actor}, '{table}', 'UPDATE', new.rowid, old.{key}, new.{key}, {data}); "
+            f"END")
+        connection.execute(
+            f"CREATE TRIGGER {table}_change_delete AFTER DELETE ON {table} BEGIN "
+            f"INSERT INTO change_log (Actor, TableName, Operation, Record, OldKey) "
+            f"VALUES ({actor}, '{table}', 'DELETE', old.rowid, old.{key}); "
+            f"END")
+
+
+def _migrate_v10(connection):
+    """Spell every Gender and Year that means one of GENDERS or YEARS as it is spelled there.
+
+    The legacy application kept whatever was typed, such as 'male' or
+    '1st', but searches and filters find Gender and Year by equality with
+    the known values and sorting ranks Year by them, so those students were
+    neither found nor ordered. The spellings are listed here as they were
+    when this version was made. Values that are none of them are kept. The
+    updates are logged like any other, for whoever follows the change log.
+    """
+    spellings = {
+        'Gender': {'Male': ('male', 'm'), 'Female': ('female', 'f'), 'Other': ('other',)},
+        'Year': {'First': ('first', '1st', '1'), 'Second': ('second', '2nd', '2'),
+                 'Third': ('third', '3rd', '3'), 'Fourth': ('fourth', '4th', '4')},
+    }
+    for field, values in spellings.items():
+        for value, spelled in values.items():
+            connection.execute(
+                f"UPDATE students SET {field} = ? "
+                f"WHERE lower(trim({field})) IN ({', '.join('?' * len(spelled))}) AND {field} IS NOT ?",
+                (value, *spelled, value))
+
+
+MIGRATIONS = [
+    _migrate_v1,
+    _migrate_v2,
+    _migrate_v3,
+    _migrate_v4,
+    _migrate_v5,
+    _migrate_v6,
+    _migrate_v7,
+    _migrate_v8,
+    _migrate_v9,
+    _migrate_v10,
+]
+
+SCHEMA_VERSION = len(MIGRATIONS)
+
+
+def migrate(connection, legacy_course_database=None):
+    """Bring the database on ``connection`` up to SCHEMA_VERSION.
+
+    ``legacy_course_database`` is the pre-version-1 Course_Table.db whose
+    courses are copied in by the first migration; it is only read.
+    """
+    version = connection.execute("PRAGMA user_version").fetchone()[0]
+    if version >= SCHEMA_VERSION:
+        return
+
+    attach = version == 0 and legacy_course_database and os.path.exists(legacy_course_database)
+    if attach:
+        connection.execute("ATTACH DATABASE ? AS legacy", (legacy_course_database,))
+    # Foreign keys cannot be toggled inside a transaction; tables are rebuilt
+    # with enforcement off and the result is checked before committing.
+    connection.execute("PRAGMA foreign_keys=OFF")
+    try:
+        with transaction(connection):
+            for migration in MIGRATIONS[version:]:
+                migration(connection)
+            violation = connection.execute("PRAGMA foreign_key_check").fetchone()
+            if violation is not None:
+                raise RuntimeError(f"Schema migration left a dangling reference in {violation[0]}")
+            connection.execute(f"PRAGMA user_version={SCHEMA_VERSION}")
+    finally:
+        connection.execute("PRAGMA foreign_keys=ON")
+        if attach:
+            connection.execute("DETACH DATABASE legacy")
@@ -0,0 +1,152 @@
+"""Substring search over students and courses backed by the trigram FTS5 indexes.
+
+The trigram tokenizer indexes every three-character sequence, so a quoted
+FTS5 phrase finds the same rows as ``LIKE '%text%'`` for texts of three or
+more characters without scanning the table. Shorter texts cannot be served by
+the index and fall back to LIKE.
+"""
+
+from contextlib import contextmanager
+
+from ssis.schema import COURSE_COLUMNS, GENDERS, STUDENT_COLUMNS, YEARS
+
+MIN_INDEXED_LENGTH = 3
+
+STUDENT_FTS_COLUMNS = ('StudentID', 'StudentName', 'CourseCode')
+STUDENT_ENUMS = {'Gender': GENDERS, 'Year': YEARS}
+FTS_COLUMNS = {'students': STUDENT_FTS_COLUMNS, 'courses': COURSE_COLUMNS}
+
+
+def fts_phrase(text, column=None):
+    """Quote ``text`` as an FTS5 phrase, optionally restricted to ``column``."""
+    phrase = '"' + text.replace('"', '""') + '"'
+    if column is not None:
+        return f"{column} : {phrase}"
+    return phrase
+
+
+def _enum_matches(field, text):
+    needle = text.casefold()
+    return [value for value in STUDENT_ENUMS[field] if needle in value.casefold()]
+
+
+def student_filter(text, field='All'):
+    """Return a ``(where, params)`` pair selecting students whose ``field`` contains ``text``.
+
+    ``field`` is one of STUDENT_COLUMNS or 'All'. Gender and Year hold a
+    handful of known values, so they are matched against those in Python and
+    queried by equality through their indexes.
+    """
+    if field != 'All' and field not in STUDENT_COLUMNS:
+        raise ValueError(f"Unknown student field: {field}")
+
+    if len(text) < MIN_INDEXED_LENGTH:
+        pattern = '%' + text + '%'
+        if field == 'All':
+            return " OR ".join(f"{column} LIKE ?" for column in STUDENT_COLUMNS), (pattern,) * len(STUDENT_COLUMNS)
+        return f"{field} LIKE ?", (pattern,)
+
+    clauses = []
+    params = []
+    if field == 'All' or field in STUDENT_FTS_COLUMNS:
+        column = None if field == 'All' else field
+        clauses.append("rowid IN (SELECT rowid FROM students_fts WHERE students_fts MATCH ?)")
+        params.append(fts_phrase(text, column))
+    for enum_field in STUDENT_ENUMS:
+        if field in ('All', enum_field):
+            values = _enum_matches(enum_field, text)
+            if values:
+                clauses.append(f"{enum_field} IN ({', '.join('?' * len(values))})")
+                params.extend(values)
+    if not clauses:
+        return "0", ()
+    return " OR ".join(clauses), tuple(params)
+
+
+def row_matcher(text, columns, field='All'):
+    """Return a predicate telling whether a row of ``columns`` values matches ``text``.
+
+    It agrees with student_filter()/course_filter(): a case-insensitive
+    substring test on ``field``, or on every column for 'All'.
+    """
+    needle = text.casefold()
+    if field == 'All':
+        positions = range(len(columns))
+    else:
+        positions = (columns.index(field),)
+
+    def matches(row):
+        return any(row[i] is not None and needle in row[i].casefold() for i in positions)
+
+    return matches
+
+
+def course_filter(text, field='Code'):
+    """Return a ``(where, params)`` pair selecting courses whose ``field`` contains ``text``."""
+    if field not in COURSE_COLUMNS:
+        raise ValueError(f"Unknown course field: {field}")
+    if len(text) < MIN_INDEXED_LENGTH:
+        return f"{field} LIKE ?", ('%' + text + '%',)
+    return "rowid IN (SELECT rowid FROM courses_fts WHERE courses_fts MATCH ?)", (fts_phrase(text, field),)
+
+
+def search_students(connection, text, limit=50):
+    """Return up to ``limit`` students matching ``text``, best match first.
+
+    Rows are ranked by bm25 over StudentID, StudentName and CourseCode; texts
+    too short for the index are returned in table order.
+    """
+    if len(text) < MIN_INDEXED_LENGTH:
+        where, params = student_filter(text)
+        return connection.execute(
+            f"SELECT {', '.join(STUDENT_COLUMNS)} FROM students WHERE {where} LIMIT ?", (*params, limit)).fetchall()
+    return connection.execute(
+        f"SELECT {', '.join('s.' + column for column in STUDENT_COLUMNS)} "
+        "FROM students_fts JOIN students AS s ON s.rowid = students_fts.rowid "
+        "WHERE students_fts MATCH ? ORDER BY students_fts.rank LIMIT ?",
+        (fts_phrase(text), limit)).fetchall()
+
+
+def search_courses(connection, text, limit=50):
+    """Return up to ``limit`` courses whose code or name contains ``text``, best match first."""
+    if len(text) < MIN_INDEXED_LENGTH:
+        pattern = '%' + text + '%'
+        return connection.execute(
+            "SELECT Code, Name FROM courses WHERE Code LIKE ? OR Name LIKE ? LIMIT ?",
+            (pattern, pattern, limit)).fetchall()
+    return connection.execute(
+        "SELECT c.Code, c.Name "
+        "FROM courses_fts JOIN courses AS c ON c.rowid = courses_fts.rowid "
+        "WHERE courses_fts MATCH ? ORDER BY courses_fts.rank LIMIT ?",
+        (fts_phrase(text), limit)).fetchall()
+
+
+@contextmanager
+def deferred_fts_insert(connection, table):
+    """Index the rows inserted into ``table`` inside the block with one statement.
+
+    Feeding the trigram index row by row from the insert trigger costs several
+    times more than a single INSERT ... SELECT, so bulk loads suspend the
+    trigger and index the new rowids at the end. Must be used inside a
+    transaction, so that nothing outside the block ever sees the table
+    without its trigger.
+    """
+    if not connection.in_transaction:
+        raise RuntimeError("deferred_fts_insert() must be used inside a transaction")
+    trigger = f"{table}_fts_insert"
+    trigger_sql = connection.execute(
+        "SELECT sql FROM sqlite_master WHERE type='trigger' AND name=?", (trigger,)).fetchone()[0]
+    last_rowid = connection.execute(f"SELECT coalesce(max(rowid), 0) FROM {table}").fetchone()[0]
+    connection.execute(f"DROP TRIGGER {trigger}")
+    try:
+        yield
+        columns = ', '.join(FTS_COLUMNS[table])
+        connection.execute(
+            f"INSERT INTO {table}_fts (rowid, {columns}) SELECT rowid, {columns} FROM {table} WHERE rowid > ?",
+            (last_rowid,))
+    finally:
+        # An error that SQLite answers with a rollback of its own has brought
+        # the trigger back already; otherwise it is restored whether or not
+        # the caller goes on to commit.
+        if connection.in_transaction:
+            connection.execute(trigger_sql)
@@ -0,0 +1,675 @@
+"""One student database shared over HTTP by several workstations.
+
+    python -m ssis serve [--host HOST] [--port PORT] [--readers N]
+
+Requests and responses are JSON. Reads run on a pool of read-only
+connections, which WAL lets proceed while a write commits. All writes go
+through a single writer connection fed by a queue: whatever queued up while
+one commit was running is written next as one transaction, each request in
+its own savepoint, so a request that fails is undone alone and a burst of
+writes costs one commit instead of one each. Nothing ever waits on a
+database lock.
+
+    GET    /students, /courses          ?filter=&field=&limit=   rows in table order
+    GET    /students/ID, /courses/CODE                           one row, or null
+    GET    /search/students, /search/courses  ?text=&limit=
+    GET    /report                      ?by=course|CourseCode|Year|Gender
+    GET    /statistics/stale
+    POST   /query                       {"sql", "params", "limit"}   read-only SQL; more rows come from
+    POST   /query/CURSOR                {"limit"}                    the cursor it answers with, until null
+    DELETE /query/CURSOR
+    POST   /students                    {"StudentID", "StudentName", "Gender", "Year", "CourseCode"}
+    PUT    /students/ID                 {"StudentName", "Gender", "Year", "CourseCode"}
+    DELETE /students/ID
+    POST   /students/write              {"rows": {StudentID: row or null}, "expected": {...}}
+    POST   /courses                     {"Code", "Name"}
+    POST   /courses/CODE/rename         {"new_code", "dry_run"}
+    DELETE /courses/CODE                ?dry_run=1
+    POST   /students/import, /courses/import  ?filename=&batch_size=  body: the .csv or .xlsx file
+    POST   /statistics/rebuild
+    GET    /changes                     ?since=                  what changed after Seq since, for sync
+    GET    /changelog                   ?since=&limit=&table=&key=   the persistent change log, see ssis.audit
+    POST   /changelog/compact           {"before"}
+    POST   /changelog/truncate          {"before"}
+    GET    /status
+
+It listens on 127.0.0.1 unless given another --host. Every request must
+carry the server's token as ``Authorization: Bearer TOKEN``; the token is
+read from the SSIS_TOKEN environment variable, or made up and printed at
+startup when that is not set, and clients read it from the same variable.
+Requests without it are answered 401.
+
+Writes are logged as made by NAME@ADDRESS: NAME comes from the
+X-SSIS-Actor header and is advisory, since any client holding the token
+can send any name, while ADDRESS is where the request came from.
+
+ssis.client talks to it, and MainWindow and the command line use that with
+--server.
+"""
+
+import asyncio
+import contextlib
+import hmac
+import itertools
+import json
+import os
+import os.path
+import re
+import secrets
+import sqlite3
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from urllib.parse import parse_qsl, unquote, urlsplit
+
+from ssis import audit
+from ssis.database import DEFAULT_DATABASE_DIR, Database, transaction
+from ssis.importer import BATCH_SIZE
+from ssis.repository import (PUBLISH_LIMIT, REPORT_FIELDS, ChangeLogRepository, CourseRepository, EditConflict,
+                             StudentRepository)
+
+DEFAULT_HOST = '127.0.0.1'
+# The environment variable holding the token the server and its clients share.
+TOKEN_VARIABLE = 'SSIS_TOKEN'
+DEFAULT_PORT = 8765
+READERS = 8
+# Most requests one group commit takes from the write queue.
+WRITE_BATCH_LIMIT = 256
+MAX_BODY_SIZE = 256 * 1024 * 1024
+# Bytes of an uploaded file read from the socket at a time.
+BODY_CHUNK_SIZE = 64 * 1024
+# Longest request or header line, and most header lines, a request may have.
+MAX_LINE_SIZE = 64 * 1024
+MAX_HEADERS = 100
+CONTENT_LENGTH = re.compile(r'[0-9]+')
+# Seconds a /query cursor may sit unread before it is closed, and most kept open at once.
+CURSOR_TIMEOUT = 120
+MAX_CURSORS = 64
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class _ReaderDatabase:
+    """What the repositories read through, over one reader connection."""
+
+    def __init__(self, connection):
+        self.connection = connection
+
+    def execute(self, sql, params=()):
+        return self.connection.execute(sql, params)
+
+
+class _Cursors:
+    """The /query statements whose rows are still being read, each on a reader connection of its own.
+
+    An unfinished statement goes on reading the snapshot it started in, so
+    a client fetching a long result batch by batch neither skips nor repeats
+    rows that are written meanwhile. A connection goes back to the pool once
+    its statement is read to the end or closed. Since an open snapshot holds
+    back WAL checkpoints, cursors left unread for CURSOR_TIMEOUT seconds, and
+    the least recently read beyond MAX_CURSORS, are closed.
+    """
+
+    def __init__(self, open_reader):
+        self._open_reader = open_reader
+        self._lock = threading.Lock()
+        # id -> (cursor, connection, the row read ahead, when last read), least recently read first.
+        self._cursors = {}
+        self._idle = []
+        self._connections = []
+        self._ids = itertools.count(1)
+
+    def start(self, sql, params, limit):
+        """Run ``sql`` and return its first ``limit`` rows and the id of the cursor the rest come from, or None."""
+        self._expire()
+        with self._lock:
+            connection = self._idle.pop() if self._idle else None
+        if connection is None:
+            connection = self._open_reader()
+            with self._lock:
+                self._connections.append(connection)
+        try:
+            cursor = connection.execute(sql, params)
+        except BaseException:
+            self._release(None, connection)
+            raise
+        return self._read(next(self._ids), cursor, connection, [], limit)
+
+    def fetch(self, cursor_id, limit):
+        """Return the next ``limit`` rows, all of the rest if it is negative, and the cursor id or None."""
+        with self._lock:
+            entry = self._cursors.pop(cursor_id, None)
+        if entry is None:
+            raise HTTPError(HTTPStatus.NOT_FOUND, f"Cursor {cursor_id} was closed or timed out; run the query again")
+        cursor, connection, ahead, _ = entry
+        return self._read(cursor_id, cursor, connection, ahead, limit)
+
+    def close(self, cursor_id):
+        with self._lock:
+            entry = self._cursors.pop(cursor_id, None)
+        if entry is not None:
+            self._release(*entry[:2])
+
+    def close_all(self):
+        with self._lock:
+            for connection in self._connections:
+                connection.close()
+            self._cursors, self._idle, self._connections = {}, [], []
+
+    def _read(self, cursor_id, cursor, connection, ahead, limit):
+        try:
+            # One row more than asked for tells whether the statement is done.
+            rows = ahead + (cursor.fetchall() if limit < 0 else cursor.fetchmany(limit + 1 - len(ahead)))
+        except BaseException:
+            self._release(cursor, connection)
+            raise
+        if limit < 0 or len(rows) <= limit:
+            self._release(cursor, connection)
+            return rows, None
+        with self._lock:
+            self._cursors[cursor_id] = (cursor, connection, rows[limit:], time.monotonic())
+        self._expire()
+        return rows[:limit], cursor_id
+
+    def _expire(self):
+        now = time.monotonic()
+        with self._lock:
+            expired = []
+            for cursor_id, (_, _, _, used) in self._cursors.items():
+                if len(self._cursors) - len(expired) <= MAX_CURSORS and now - used < CURSOR_TIMEOUT:
+                    break
+                expired.append(cursor_id)
+            expired = [self._cursors.pop(cursor_id) for cursor_id in expired]
+        for entry in expired:
+            self._release(*entry[:2])
+
+    def _release(self, cursor, connection):
+        if cursor is not None:
+            # Ends the statement, and with it the snapshot it was reading.
+            cursor.close()
+        with self._lock:
+            if connection in self._connections:
+                self._idle.append(connection)
+
+
+async def _read_line(reader, what):
+    try:
+        return await reader.readline()
+    except ValueError:
+        # StreamReader.readline() reports a line over its limit this way.
+        raise HTTPError(HTTPStatus.BAD_REQUEST, f"{what} is longer than {MAX_LINE_SIZE} bytes") from None
+
+
+async def _read_head(reader):
+    """Read one request's line and headers; returns ``(method, target, version, headers)``, or None at the end."""
+    request_line = await _read_line(reader, "Request line")
+    if not request_line.strip():
+        return None
+    parts = request_line.decode('latin-1').split()
+    if len(parts) != 3:
+        raise HTTPError(HTTPStatus.BAD_REQUEST, "Malformed request line")
+    headers = {}
+    while True:
+        line = await _read_line(reader, "Header line")
+        if not line.strip():
+            break
+        if len(headers) >= MAX_HEADERS:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, f"More than {MAX_HEADERS} headers")
+        name, colon, value = line.decode('latin-1').partition(':')
+        if not colon:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "Malformed header line")
+        headers[name.strip().lower()] = value.strip()
+    return (*parts, headers)
+
+
+@contextlib.asynccontextmanager
+async def _body(reader, method, target, length):
+    """Read a request's body: its bytes, or for an import the path of the file it is streamed into.
+
+    The file is deleted when the request has been answered.
+    """
+    url = urlsplit(target)
+    upload = UPLOAD.fullmatch(url.path) if method == 'POST' else None
+    if upload is None:
+        yield await reader.readexactly(length)
+        return
+    filename = os.path.basename(dict(parse_qsl(url.query)).get('filename', '')) or f'{upload[1]}.csv'
+    with tempfile.TemporaryDirectory(prefix='ssis-import-') as directory:
+        path = os.path.join(directory, filename)
+        with open(path, 'wb') as file:
+            while length:
+                chunk = await reader.readexactly(min(length, BODY_CHUNK_SIZE))
+                file.write(chunk)
+                length -= len(chunk)
+        yield path
+
+
+def _content_length(headers):
+    value = headers.get('content-length', '0')
+    if not CONTENT_LENGTH.fullmatch(value):
+        raise HTTPError(HTTPStatus.BAD_REQUEST, "Content-Length must be a whole number of bytes")
+    length = int(value)
+    if length > MAX_BODY_SIZE:
+        raise HTTPError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, f"Request bodies are limited to {MAX_BODY_SIZE} bytes")
+    return length
+
+
+def _error(error):
+    return json.dumps({'error': 'HTTPError', 'message': str(error)}).encode()
+
+
+def _json(body):
+    try:
+        return json.loads(body or b'{}')
+    except ValueError:
+        raise HTTPError(HTTPStatus.BAD_REQUEST, "Request body is not JSON") from None
+
+
+def _int(params, name, default):
+    try:
+        return int(params.get(name, default))
+    except ValueError:
+        raise HTTPError(HTTPStatus.BAD_REQUEST, f"{name} must be a number") from None
+
+
+def _flag(params, name):
+    return params.get(name, '') not in ('', '0', 'false')
+
+
+def _list(repositories, params, body, kind):
+    repository = repositories[kind]
+    rows = repository.filter(params.get('filter', ''), params.get('field'), _int(params, 'limit', -1)).fetchall()
+    return {'columns': repository.columns, 'rows': rows}
+
+
+def _show(repositories, params, body, kind, key):
+    return {'row': repositories[kind].get(key)}
+
+
+def _search(repositories, params, body, kind):
+    return {'rows': repositories[kind].search(params.get('text', ''), _int(params, 'limit', 50))}
+
+
+def _report(repositories, params, body):
+    by = params.get('by', 'course')
+    if by == 'course':
+        return {'columns': ('Code', 'Name', 'Students'), 'rows': repositories['courses'].report()}
+    if by not in REPORT_FIELDS:
+        raise HTTPError(HTTPStatus.BAD_REQUEST, f"Cannot count students by {by!r}")
+    return {'columns': (by, 'Students'), 'rows': repositories['students'].report(by)}
+
+
+def _stale_statistics(repositories, params, body):
+    return {'rows': repositories['students'].stale_statistics()}
+
+
+def _query(repositories, params, body):
+    request = _json(body)
+    sql, parameters = request['sql'], request.get('params', ())
+    limit = request.get('limit', -1)
+    if limit < 0:
+        return {'rows': repositories['students'].db.execute(sql, parameters).fetchall(), 'cursor': None}
+    rows, cursor = repositories['cursors'].start(sql, parameters, limit)
+    return {'rows': rows, 'cursor': cursor}
+
+
+def _query_fetch(repositories, params, body, cursor):
+    rows, cursor = repositories['cursors'].fetch(int(cursor), _json(body).get('limit', -1))
+    return {'rows': rows, 'cursor': cursor}
+
+
+def _query_close(repositories, params, body, cursor):
+    repositories['cursors'].close(int(cursor))
+    return {}
+
+
+def _student_add(repositories, params, body):
+    student = _json(body)
+    return {'rowid': repositories['students'].add(
+        student['StudentID'], student['StudentName'], student['Gender'], student['Year'], student.get('CourseCode'))}
+
+
+def _student_update(repositories, params, body, student_id):
+    student = _json(body)
+    return {'rowid': repositories['students'].update(
+        student_id, student['StudentName'], student['Gender'], student['Year'], student.get('CourseCode'))}
+
+
+def _student_delete(repositories, params, body, student_id):
+    return {'rowid': repositories['students'].delete(student_id)}
+
+
+def _images(rows):
+    return {student_id: None if row is None else tuple(row) for student_id, row in rows.items()}
+
+
+def _student_write(repositories, params, body):
+    request = _json(body)
+    expected = request.get('expected')
+    return {'written': repositories['students'].write(
+        _images(request['rows']), None if expected is None else _images(expected))}
+
+
+def _course_add(repositories, params, body):
+    course = _json(body)
+    return {'rowid': repositories['courses'].add(course['Code'], course['Name'])}
+
+
+def _course_rename(repositories, params, body, code):
+    request = _json(body)
+    return repositories['courses'].rename(code, request['new_code'], dry_run=request.get('dry_run', False))._asdict()
+
+
+def _course_delete(repositories, params, body, code):
+    return repositories['courses'].delete(code, dry_run=_flag(params, 'dry_run'))._asdict()
+
+
+def _import(repositories, params, body, kind):
+    # The body is the path _body streamed the upload into.
+    report = repositories[kind].import_file(body, batch_size=_int(params, 'batch_size', BATCH_SIZE))
+    return {'rows_read': report.rows_read, 'inserted': report.inserted,
+            'rejected_count': report.rejected_count, 'rejected': report.rejected}
+
+
+def _rebuild_statistics(repositories, params, body):
+    return {'rows': repositories['students'].rebuild_statistics()}
+
+
+def _changes(repositories, params, body):
+    """Say what changed after Seq ``since``, for a client to bring its views up to date.
+
+    Up to PUBLISH_LIMIT entries are listed as ``(table, operation, rowid)``;
+    beyond that only which operations touched each table. ``reset`` asks
+    the client to reload everything: the entries it needs were truncated,
+    or the file was restored to a copy older than what it has seen.
+    """
+    changes = repositories['changes']
+    last = changes.last()
+    state = {'last': last, 'reset': False, 'count': 0, 'bulk': {}, 'changes': []}
+    if 'since' not in params:
+        return state
+    since = _int(params, 'since', 0)
+    try:
+        rows = changes.since(since, PUBLISH_LIMIT + 1).fetchall() if since <= last else None
+    except audit.ChangesTruncated:
+        rows = None
+    if rows is None:
+        state['reset'] = True
+    elif len(rows) > PUBLISH_LIMIT:
+        for table, operation, entries in changes.operations(since, last):
+            state['bulk'].setdefault(table, []).append(operation)
+            state['count'] += entries
+    else:
+        # Read after ``last``, so they may run past it.
+        state['last'] = max(last, rows[-1][0]) if rows else last
+        state['count'] = len(rows)
+        state['changes'] = [(table, operation, record) for _, _, _, table, operation, record, *_ in rows]
+    return state
+
+
+def _change_log(repositories, params, body):
+    changes = repositories['changes']
+    since = _int(params, 'since', 0) if 'since' in params else None
+    rows = changes.since(since, _int(params, 'limit', -1),
+                         params.get('table'), params.get('key')).fetchall()
+    return {'columns': changes.columns, 'start': changes.start(), 'rows': rows}
+
+
+def _change_log_compact(repositories, params, body):
+    return {'deleted': repositories['changes'].compact(_json(body).get('before'))}
+
+
+def _change_log_truncate(repositories, params, body):
+    return {'deleted': repositories['changes'].truncate(_json(body)['before'])}
+
+
+READ, WRITE = 'read', 'write'
+KIND = '(students|courses)'
+KEY = '([^/]+)'
+UPLOAD = re.compile(f'/{KIND}/import')
+
+ROUTES = [
+    ('GET', f'/{KIND}', READ, _list),
+    ('GET', f'/search/{KIND}', READ, _search),
+    ('GET', f'/{KIND}/{KEY}', READ, _show),
+    ('GET', '/report', READ, _report),
+    ('GET', '/statistics/stale', READ, _stale_statistics),
+    ('POST', '/query', READ, _query),
+    ('POST', '/query/([0-9]+)', READ, _query_fetch),
+    ('DELETE', '/query/([0-9]+)', READ, _query_close),
+    ('POST', '/students/write', WRITE, _student_write),
+    ('POST', f'/{KIND}/import', WRITE, _import),
+    ('POST', '/students', WRITE, _student_add),
+    ('PUT', f'/students/{KEY}', WRITE, _student_update),
+    ('DELETE', f'/students/{KEY}', WRITE, _student_delete),
+    ('POST', '/courses', WRITE, _course_add),
+    ('POST', f'/courses/{KEY}/rename', WRITE, _course_rename),
+    ('DELETE', f'/courses/{KEY}', WRITE, _course_delete),
+    ('POST', '/statistics/rebuild', WRITE, _rebuild_statistics),
+    ('GET', '/changes', READ, _changes),
+    ('GET', '/changelog', READ, _change_log),
+    ('POST', '/changelog/compact', WRITE, _change_log_compact),
+    ('POST', '/changelog/truncate', WRITE, _change_log_truncate),
+]
+_ROUTES = [(method, re.compile(pattern), access, handler) for method, pattern, access, handler in ROUTES]
+
+
+def _route(method, path):
+    allowed = False
+    for route_method, pattern, access, handler in _ROUTES:
+        match = pattern.fullmatch(path)
+        if match is None:
+            continue
+        if route_method == method:
+            return access, handler, [unquote(group) for group in match.groups()]
+        allowed = True
+    if allowed:
+        raise HTTPError(HTTPStatus.METHOD_NOT_ALLOWED, f"{method} is not allowed on {path}")
+    raise HTTPError(HTTPStatus.NOT_FOUND, f"No such resource {path}")
+
+
+class Server:
+    """Serves the Student_Table.db in ``database_dir`` to HTTP clients.
+
+    The database is opened, and migrated if need be, on the writer thread
+    by start(); ``readers`` worker threads each open a read-only connection
+    on first use. Only requests carrying ``token`` are served.
+    """
+
+    def __init__(self, token, database_dir=DEFAULT_DATABASE_DIR, readers=READERS):
+        self.token = token
+        self.database_dir = database_dir
+        self.commits = 0
+        self.writes = 0
+        self.db = None
+        self._writer = ThreadPoolExecutor(1, thread_name_prefix='ssis-writer')
+        self._readers = ThreadPoolExecutor(readers, thread_name_prefix='ssis-reader', initializer=self._open_reader)
+        self._reader_connections = []
+        self._cursors = _Cursors(lambda: self.db.reader())
+        self._local = threading.local()
+        self._queue = None
+        self._write_task = None
+
+    def _open(self):
+        self.db = Database(self.database_dir)
+        self._repositories = {'students': StudentRepository(self.db), 'courses': CourseRepository(self.db),
+                              'changes': ChangeLogRepository(self.db)}
+
+    def _open_reader(self):
+        connection = self.db.reader()
+        self._reader_connections.append(connection)
+        db = _ReaderDatabase(connection)
+        self._local.repositories = {'students': StudentRepository(db), 'courses': CourseRepository(db),
+                                    'changes': ChangeLogRepository(db), 'cursors': self._cursors}
+
+    def _read(self, handler, params, body, arguments):
+        # Encoded here rather than on the event loop, which large results would hold up.
+        return json.dumps(handler(self._local.repositories, params, body, *arguments)).encode()
+
+    def _commit(self, batch):
+        """Run a batch of queued writes as one transaction; returns their outcomes.
+
+        Each outcome is ``(True, result)`` or ``(False, error)``.
+        """
+        outcomes = []
+        try:
+            with self.db.transaction():
+                for handler, params, body, arguments, actor in batch:
+                    audit.set_actor(self.db.connection, actor)
+                    try:
+                        with transaction(self.db.connection):
+                            outcomes.append((True, handler(self._repositories, params, body, *arguments)))
+                    except Exception as error:
+                        outcomes.append((False, error))
+        except Exception as error:
+            outcomes = [(False, error)] * len(batch)
+        return outcomes
+
+    async def _write_loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            while len(batch) < WRITE_BATCH_LIMIT and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            outcomes = await loop.run_in_executor(self._writer, self._commit, [request for request, _ in batch])
+            self.commits += 1
+            self.writes += len(batch)
+            for (_, future), (succeeded, outcome) in zip(batch, outcomes):
+                if future.cancelled():
+                    continue
+                if succeeded:
+                    future.set_result(outcome)
+                else:
+                    future.set_exception(outcome)
+
+    async def _dispatch(self, method, target, body, actor=None):
+        url = urlsplit(target)
+        params = dict(parse_qsl(url.query))
+        if url.path == '/status':
+            return {'commits': self.commits, 'writes': self.writes, 'database': self.db.database}
+
+        access, handler, arguments = _route(method, url.path)
+        if access == READ:
+            return await asyncio.get_running_loop().run_in_executor(
+                self._readers, self._read, handler, params, body, arguments)
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait(((handler, params, body, arguments, actor), future))
+        return await future
+
+    async def _respond(self, method, target, body, actor=None):
+        """Return the status and the encoded JSON answering one request; its writes are logged as ``actor``'s."""
+        try:
+            status, payload = HTTPStatus.OK, await self._dispatch(method, target, body, actor)
+        except HTTPError as error:
+            status, payload = error.status, _error(error)
+        except (sqlite3.IntegrityError, EditConflict) as error:
+            status, payload = HTTPStatus.CONFLICT, {'error': type(error).__name__, 'message': str(error)}
+            if isinstance(error, EditConflict):
+                payload['student_ids'] = error.student_ids
+        except (sqlite3.Error, ValueError, KeyError, TypeError, OSError) as error:
+            message = f"Missing {error}" if isinstance(error, KeyError) else str(error)
+            status, payload = HTTPStatus.BAD_REQUEST, {'error': type(error).__name__, 'message': message}
+        except Exception as error:
+            status, payload = HTTPStatus.INTERNAL_SERVER_ERROR, {'error': type(error).__name__, 'message': str(error)}
+        return status, payload if isinstance(payload, bytes) else json.dumps(payload).encode()
+
+    async def _handle(self, reader, writer):
+        peer = writer.get_extra_info('peername')
+        address = peer[0] if peer else None
+        try:
+            while True:
+                try:
+                    head = await _read_head(reader)
+                    if head is None:
+                        break
+                    method, target, version, headers = head
+                    length = _content_length(headers)
+                except HTTPError as error:
+                    # The rest of the stream cannot be trusted to start a request.
+                    await self._send(writer, error.status, _error(error), close=True)
+                    break
+                if not self._authorized(headers):
+                    # Closed without reading the body, which may be large.
+                    await self._send(writer, HTTPStatus.UNAUTHORIZED,
+                                     _error("A valid Authorization: Bearer token is required"), close=True)
+                    break
+                name = unquote(headers.get('x-ssis-actor', ''))
+                actor = f"{name}@{address}" if name else address
+                async with _body(reader, method, target, length) as body:
+                    status, data = await self._respond(method, target, body, actor)
+                close = headers.get('connection', '').lower() == 'close' or version == 'HTTP/1.0'
+                await self._send(writer, status, data, close)
+                if close:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.LimitOverrunError):
+            pass
+        except asyncio.CancelledError:
+            # Shutting down with the connection still open.
+            pass
+        finally:
+            writer.close()
+
+    def _authorized(self, headers):
+        scheme, _, token = headers.get('authorization', '').partition(' ')
+        return scheme.lower() == 'bearer' and hmac.compare_digest(token.strip().encode(), self.token.encode())
+
+    async def _send(self, writer, status, data, close):
+        writer.write(f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+                     f"Content-Type: application/json\r\n"
+                     f"Content-Length: {len(data)}\r\n"
+                     f"{'Connection: close' if close else 'Connection: keep-alive'}\r\n\r\n".encode('latin-1'))
+        writer.write(data)
+        await writer.drain()
+
+    async def start(self, host=DEFAULT_HOST, port=DEFAULT_PORT):
+        """Open the database and start listening; returns the asyncio.Server."""
+        await asyncio.get_running_loop().run_in_executor(self._writer, self._open)
+        self._queue = asyncio.Queue()
+        self._write_task = asyncio.create_task(self._write_loop())
+        return await asyncio.start_server(self._handle, host, port, backlog=1024, limit=MAX_LINE_SIZE)
+
+    async def close(self):
+        if self._write_task is not None:
+            self._write_task.cancel()
+        self._readers.shutdown()
+        for connection in self._reader_connections:
+            connection.close()
+        self._cursors.close_all()
+        if self.db is not None:
+            await asyncio.get_running_loop().run_in_executor(self._writer, self.db.close)
+        self._writer.shutdown()
+
+
+async def _serve(server, host, port, generated_token):
+    listener = await server.start(host, port)
+    host, port = listener.sockets[0].getsockname()[:2]
+    print(f"Serving {server.db.database} at http://{host}:{port}", flush=True)
+    if generated_token:
+        print(f"Clients need {TOKEN_VARIABLE}={server.token}", flush=True)
+    try:
+        await listener.serve_forever()
+    finally:
+        listener.close()
+        await server.close()
+
+
+def serve(database_dir=DEFAULT_DATABASE_DIR, host=DEFAULT_HOST, port=DEFAULT_PORT, readers=READERS):
+    """Serve until interrupted; ``port`` 0 picks a free port, which is printed.
+
+    The token is taken from TOKEN_VARIABLE, or made up and printed.
+    """
+    token = os.environ.get(TOKEN_VARIABLE)
+    generated = not token
+    if generated:
+        token = secrets.token_urlsafe(24)
+    try:
+        asyncio.run(_serve(Server(token, database_dir, readers), host, port, generated))
+    except KeyboardInterrupt:
+        pass
+    return 0
@@ -0,0 +1,120 @@
+"""Sort orders pushed down to SQLite, and the keyset conditions that page through them.
+
+A table sorted on a column is ordered by that column's sort expression with
+ties broken by the primary key, so every row has a distinct key and the
+page after a given row is found by seeking in an index instead of counting
+rows with OFFSET. Each expression here is matched by an index created in
+migration 3; SQLite only uses an expression index for the identical
+expression, so the two must be changed together.
+"""
+
+from collections import namedtuple
+
+from ssis.schema import YEARS
+
+SortKey = namedtuple('SortKey', 'expression value')
+SortKey.__doc__ = """A column's SQL sort expression and the Python function computing it from the column value."""
+
+YEAR_RANK = "CASE Year " + " ".join(f"WHEN '{year}' THEN {rank}" for rank, year in enumerate(YEARS, start=1)) + " ELSE 0 END"
+_YEAR_RANKS = {year: rank for rank, year in enumerate(YEARS, start=1)}
+
+
+def _same(value):
+    return value
+
+
+def _or_empty(value):
+    return '' if value is None else value
+
+
+def year_rank(year):
+    return _YEAR_RANKS.get(year, 0)
+
+
+STUDENT_SORT_KEYS = {
+    'StudentID': SortKey('StudentID', _same),
+    'StudentName': SortKey('StudentName', _same),
+    'Gender': SortKey("ifnull(Gender, '')", _or_empty),
+    'Year': SortKey(YEAR_RANK, year_rank),
+    'CourseCode': SortKey("ifnull(CourseCode, '')", _or_empty),
+}
+COURSE_SORT_KEYS = {
+    'Code': SortKey('Code', _same),
+    'Name': SortKey('Name', _same),
+}
+SORT_KEYS = {'students': STUDENT_SORT_KEYS, 'courses': COURSE_SORT_KEYS}
+PRIMARY_KEYS = {'students': 'StudentID', 'courses': 'Code'}
+
+
+class _Descending:
+    __slots__ = ('key',)
+
+    def __init__(self, key):
+        self.key = key
+
+    def __lt__(self, other):
+        return other.key < self.key
+
+    def __eq__(self, other):
+        return self.key == other.key
+
+
+class SortOrder:
+    """Order of a table's rows: by rowid, or by ``field``'s sort key then the primary key.
+
+    Rows are ``(rowid, *fields)`` tuples. key() gives a row's position in
+    the order as a tuple of the values the SQL expressions compute, and
+    position() turns such a key into something that compares in display
+    order, also when descending.
+    """
+
+    def __init__(self, table, fields, field=None, descending=False):
+        self.table = table
+        self.field = field
+        self.descending = descending and field is not None
+        if field is None:
+            self.expressions = ('rowid',)
+            self._getters = ((0, _same),)
+            return
+        primary_key = PRIMARY_KEYS[table]
+        sort_key = SORT_KEYS[table][field]
+        self.expressions = (sort_key.expression,)
+        self._getters = ((fields.index(field) + 1, sort_key.value),)
+        if field != primary_key:
+            self.expressions += (primary_key,)
+            self._getters += ((fields.index(primary_key) + 1, _same),)
+
+    @classmethod
+    def sortable(cls, table, field):
+        return field in SORT_KEYS.get(table, {})
+
+    def key(self, row):
+        return tuple(value(row[index]) for index, value in self._getters)
+
+    def position(self, key):
+        return _Descending(key) if self.descending else key
+
+    def order_by(self):
+        direction = " DESC" if self.descending else ""
+        return ", ".join(expression + direction for expression in self.expressions)
+
+    def _bound(self, key, strict, after):
+        """Condition for rows past ``key`` in display order (or, with ``after`` false, before it)."""
+        operator = '>' if after != self.descending else '<'
+        if len(self.expressions) == 1:
+            return f"{self.expressions[0]} {operator}{'' if strict else '='} ?", key
+        # Spelled out rather than as a row value so SQLite seeks in the
+        # expression index on the leading term.
+        first, second = self.expressions
+        return (f"{first} {operator}= ? AND ({first} {operator} ? OR {second} {operator}{'' if strict else '='} ?)",
+                (key[0], key[0], key[1]))
+
+    def after(self, key):
+        """Return ``(condition, params)`` for the rows following ``key``."""
+        return self._bound(key, True, True)
+
+    def between(self, first, last):
+        """Return ``(condition, params)`` for the rows from ``first`` to ``last`` inclusive."""
+        low, low_params = self._bound(first, False, True)
+        high, high_params = self._bound(last, False, False)
+        return f"{low} AND {high}", (*low_params, *high_params)
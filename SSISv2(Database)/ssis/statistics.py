@@ -0,0 +1,50 @@
+"""Student counts read from the enrolment_counts summary table.
+
+The table and the triggers that maintain it are created by schema migration
+4. It has a row per (CourseCode, Year, Gender) combination in use, so these
+reads cost a few rows per course however many students there are. rebuild()
+recomputes it from the students table, should it ever drift.
+"""
+
+from ssis.database import transaction
+
+FIELDS = ('CourseCode', 'Year', 'Gender')
+
+_CELLS = ("SELECT ifnull(CourseCode, '') AS CourseCode, ifnull(Year, '') AS Year, "
+          "ifnull(Gender, '') AS Gender, count(*) AS Students FROM students GROUP BY 1, 2, 3")
+
+
+def counts(connection, field):
+    """Return ``(value, students)`` pairs for every value of ``field``, in value order."""
+    if field not in FIELDS:
+        raise ValueError(f"Cannot count students by {field!r}")
+    return connection.execute(
+        f"SELECT nullif({field}, ''), sum(Students) FROM enrolment_counts GROUP BY {field} ORDER BY {field}").fetchall()
+
+
+def course_counts(connection):
+    """Return ``(code, name, students)`` for every course, in code order."""
+    return connection.execute(
+        "SELECT c.Code, c.Name, ifnull(sum(e.Students), 0) FROM courses AS c "
+        "LEFT JOIN enrolment_counts AS e ON e.CourseCode = c.Code GROUP BY c.Code ORDER BY c.Code").fetchall()
+
+
+def total(connection):
+    return connection.execute("SELECT ifnull(sum(Students), 0) FROM enrolment_counts").fetchone()[0]
+
+
+def stale_counts(connection):
+    """Return ``(course_code, year, gender, students, stored)`` for every count that is wrong."""
+    return connection.execute(
+        f"SELECT nullif(CourseCode, ''), nullif(Year, ''), nullif(Gender, ''), sum(Students), sum(Stored) FROM ("
+        f"SELECT CourseCode, Year, Gender, Students, 0 AS Stored FROM ({_CELLS}) "
+        f"UNION ALL SELECT CourseCode, Year, Gender, 0, Students FROM enrolment_counts) "
+        f"GROUP BY CourseCode, Year, Gender HAVING sum(Students) != sum(Stored)").fetchall()
+
+
+def rebuild(connection):
+    """Recompute enrolment_counts from the students table; returns its number of rows."""
+    with transaction(connection):
+        connection.execute("DELETE FROM enrolment_counts")
+        return connection.execute(
+            f"INSERT INTO enrolment_counts (CourseCode, Year, Gender, Students) {_CELLS}").rowcount
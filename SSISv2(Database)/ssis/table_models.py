@@ -0,0 +1,526 @@
+"""Qt item models that page rows out of SQLite on demand."""
+
+import bisect
+from collections import OrderedDict
+
+from PyQt6.QtCore import QAbstractTableModel, QModelIndex, Qt
+
+from ssis import events
+from ssis.instrumentation import profiler
+from ssis.schema import NOT_APPLICABLE
+from ssis.sorting import SortOrder
+
+
+class _Page:
+    __slots__ = ('first_key', 'last_key', 'count')
+
+    def __init__(self, first_key, last_key, count):
+        self.first_key = first_key
+        self.last_key = last_key
+        self.count = count
+
+
+class PagedTableModel(QAbstractTableModel):
+    """Read-only table model that loads rows from SQLite in keyset pages.
+
+    Rows are appended page by page through canFetchMore/fetchMore as the
+    view scrolls, so opening a view costs one page regardless of table size.
+    Only the boundary keys of each page are remembered; the rows themselves
+    are kept for at most ``max_cached_pages`` pages and re-read by key range
+    when an evicted page scrolls back into view.
+
+    Rows come in rowid order until sort() picks a column, after which pages
+    are read in that column's indexed order (see ssis.sorting): each page
+    seeks past the last key of the one before, so page 5,000 costs what
+    page 1 does.
+
+    apply_change() takes the notifications published on an EventBus and
+    patches the affected row in place, so edits keep the filter and scroll
+    position instead of reloading the view.
+
+    When ``sort_rows`` is set, ``sort_rows(rows, sort_order)`` is asked to
+    put the rows given to set_rows() in display order, e.g. by a roster held
+    in memory (see ssis.columnar); it returns None to leave that to the model.
+    """
+
+    def __init__(self, connection, table, fields, page_size=200, max_cached_pages=20, parent=None):
+        super().__init__(parent)
+        self.connection = connection
+        self.table = table
+        self.fields = list(fields)
+        self.page_size = page_size
+        self.max_cached_pages = max_cached_pages
+
+        self._order = SortOrder(table, self.fields)
+        self.sort_rows = None
+        self._where = ''
+        self._params = ()
+        self._clear_pages()
+
+    def _clear_pages(self):
+        self._snapshot = None
+        # In snapshot mode, the display-order position of each row, in
+        # parallel to _snapshot, and of each rowid, for bisecting to a row.
+        self._snapshot_positions = None
+        self._snapshot_position_of = None
+        self._pages = []
+        self._starts = []
+        self._cache = OrderedDict()
+        self._row_count = 0
+        self._exhausted = False
+
+    def set_filter(self, where='', params=()):
+        """Show only rows matching the SQL ``where`` clause."""
+        with profiler.operation(f'{self.table}.reset'):
+            self.beginResetModel()
+            self._where = where
+            self._params = tuple(params)
+            self._clear_pages()
+            self.endResetModel()
+
+    def set_rows(self, rows, where='', params=()):
+        """Show ``rows`` (``(rowid, *fields)`` tuples) instead of querying pages.
+
+        ``where`` and ``params`` describe the filter the rows were selected
+        by, as reported by filter_clause().
+        """
+        with profiler.operation(f'{self.table}.show_rows'):
+            self.beginResetModel()
+            self._where = where
+            self._params = tuple(params)
+            self._clear_pages()
+            self._snapshot = self._sorted(rows)
+            self._snapshot_positions = [self._row_position(row) for row in self._snapshot]
+            self._snapshot_position_of = {row[0]: position
+                                          for row, position in zip(self._snapshot, self._snapshot_positions)}
+            self._row_count = len(rows)
+            self._exhausted = True
+            self.endResetModel()
+
+    def filter_clause(self):
+        """Return the ``(where, params)`` of the rows currently shown."""
+        return self._where, self._params
+
+    def snapshot_rows(self):
+        """Return the rows passed to set_rows(), or None in paged mode."""
+        return self._snapshot
+
+    def refresh(self):
+        self.set_filter(self._where, self._params)
+
+    def sort_order(self):
+        return self._order
+
+    def sort(self, column, order=Qt.SortOrder.AscendingOrder):
+        """Order the rows by ``column``, or by rowid when ``column`` is -1."""
+        field = self.fields[column] if 0 <= column < len(self.fields) else None
+        if field is not None and not SortOrder.sortable(self.table, field):
+            return
+        with profiler.operation(f'{self.table}.sort'):
+            self._order = SortOrder(self.table, self.fields, field, order == Qt.SortOrder.DescendingOrder)
+            if self._snapshot is not None:
+                self.set_rows(self._snapshot, self._where, self._params)
+            else:
+                self.refresh()
+
+    def _row_position(self, row):
+        return self._order.position(self._order.key(row))
+
+    def _sorted(self, rows):
+        if self.sort_rows is not None:
+            ordered = self.sort_rows(rows, self._order)
+            if ordered is not None:
+                return ordered
+        return sorted(rows, key=self._row_position)
+
+    def select_sql(self, where):
+        """Return the SELECT used to read rows matching ``where``, in display order.
+
+        The statement takes the ``where`` parameters followed by a LIMIT.
+        """
+        return (f"SELECT rowid, {', '.join(self.fields)} FROM {self.table} WHERE {where} "
+                f"ORDER BY {self._order.order_by()} LIMIT ?")
+
+    def _select(self, key_condition, key_params, limit):
+        where = key_condition
+        if self._where:
+            where = f"{key_condition} AND ({self._where})"
+        rows = self.connection.execute(self.select_sql(where), (*key_params, *self._params, limit)).fetchall()
+        profiler.rows(len(rows))
+        return rows
+
+    def apply_change(self, change, rowid=None):
+        """Bring the model up to date with a change published on an EventBus."""
+        with profiler.operation(f'{self.table}.apply_change'):
+            self._apply_change(change, rowid)
+
+    def _apply_change(self, change, rowid):
+        if change in (events.INSERT, events.UPDATE, events.DELETE):
+            self._apply_row_change(change, rowid)
+        elif change == events.RESET or self._where or self._order.field is not None:
+            self.refresh()
+        else:
+            # Unfiltered rows changed in place or were appended: keep the page
+            # layout, drop the cached rows and let the view re-read what it shows.
+            self._cache.clear()
+            if change == events.INSERT_MANY and self._exhausted:
+                self._exhausted = False
+            if self._row_count:
+                self.dataChanged.emit(self.index(0, 0), self.index(self._row_count - 1, len(self.fields) - 1))
+
+    def _apply_row_change(self, change, rowid):
+        row = None
+        if change != events.DELETE:
+            rows = self._select("rowid = ?", (rowid,), 1)
+            row = rows[0] if rows else None
+
+        if self._snapshot is not None:
+            self._patch_snapshot(rowid, row)
+        elif not self._pages:
+            if self._exhausted and row is not None:
+                self.beginInsertRows(QModelIndex(), 0, 0)
+                key = self._order.key(row)
+                self._pages.append(_Page(key, key, 1))
+                self._starts.append(0)
+                self._store(0, [row])
+                self._row_count = 1
+                self.endInsertRows()
+        elif self._order.field is None:
+            self._patch_in_place(rowid, row)
+        else:
+            self._move_row(change, rowid, row)
+
+    def _patch_snapshot(self, rowid, row):
+        # Every row has a distinct position, so both the row's old offset and
+        # its new one are found by bisecting the positions.
+        rows = self._snapshot
+        positions = self._snapshot_positions
+        old = None
+        if rowid in self._snapshot_position_of:
+            old = bisect.bisect_left(positions, self._snapshot_position_of[rowid])
+        if row is not None:
+            position = self._row_position(row)
+            new = bisect.bisect_left(positions, position)
+            if old is not None and new in (old, old + 1):
+                rows[old] = row
+                positions[old] = self._snapshot_position_of[rowid] = position
+                self.dataChanged.emit(self.index(old, 0), self.index(old, len(self.fields) - 1))
+                return
+        if old is not None:
+            self.beginRemoveRows(QModelIndex(), old, old)
+            del rows[old]
+            del positions[old]
+            del self._snapshot_position_of[rowid]
+            self._row_count -= 1
+            self.endRemoveRows()
+        if row is not None:
+            new = bisect.bisect_left(positions, position)
+            self.beginInsertRows(QModelIndex(), new, new)
+            rows.insert(new, row)
+            positions.insert(new, position)
+            self._snapshot_position_of[rowid] = position
+            self._row_count += 1
+            self.endInsertRows()
+
+    def _page_index(self, key):
+        """Index of the page a row with ``key`` belongs to, or None if it lies past the loaded pages."""
+        position = self._order.position(key)
+        firsts = [self._order.position(page.first_key) for page in self._pages]
+        page_index = max(bisect.bisect_right(firsts, position) - 1, 0)
+        last_page = self._pages[-1]
+        if page_index == len(self._pages) - 1 and self._order.position(last_page.last_key) < position \
+                and not self._exhausted:
+            return None
+        return page_index
+
+    def _widen(self, page, key):
+        position = self._order.position(key)
+        if position < self._order.position(page.first_key):
+            page.first_key = key
+        if self._order.position(page.last_key) < position:
+            page.last_key = key
+
+    def _patch_in_place(self, rowid, row):
+        # In rowid order a row keeps its key, so its page is known even after eviction.
+        page_index = self._page_index((rowid,))
+        if page_index is None:
+            return
+        page = self._pages[page_index]
+        start = self._starts[page_index]
+        rows = self._cache.get(page_index)
+        fresh = None
+        if rows is None:
+            # The page was evicted, so re-read it as it is after the change.
+            first_key = min(page.first_key, (rowid,))
+            last_key = max(page.last_key, (rowid,))
+            fresh = self._select(*self._order.between(first_key, last_key), page.count + 1)
+            rows = fresh
+
+        offset = bisect.bisect_left([cached[0] for cached in rows], rowid)
+        position = start + offset
+        is_present = row is not None
+        if fresh is None:
+            was_present = offset < len(rows) and rows[offset][0] == rowid
+        else:
+            # The re-read page holds the page's rows as they are now: one
+            # more than before if the row was added to it, one fewer if it
+            # was removed, and as many if it was updated.
+            added = len(fresh) - page.count
+            if is_present:
+                was_present = added == 0
+            else:
+                was_present = added == -1
+
+        if was_present and is_present:
+            if fresh is None:
+                rows[offset] = row
+            else:
+                self._store(page_index, fresh)
+            self.dataChanged.emit(self.index(position, 0), self.index(position, len(self.fields) - 1))
+        elif was_present:
+            self.beginRemoveRows(QModelIndex(), position, position)
+            if fresh is None:
+                del rows[offset]
+            else:
+                self._store(page_index, fresh)
+            self._resize_page(page, -1)
+            self.endRemoveRows()
+        elif is_present:
+            self.beginInsertRows(QModelIndex(), position, position)
+            if fresh is None:
+                rows.insert(offset, row)
+            else:
+                self._store(page_index, fresh)
+            self._widen(page, (rowid,))
+            self._resize_page(page, 1)
+            self.endInsertRows()
+
+    def _find_cached(self, rowid):
+        for page_index, rows in self._cache.items():
+            for offset, cached in enumerate(rows):
+                if cached[0] == rowid:
+                    return page_index, offset
+        return None
+
+    def _fits(self, page_index, offset, key):
+        """Whether a row at ``offset`` of a cached page can take ``key`` without moving."""
+        rows = self._cache[page_index]
+        position = self._order.position(key)
+        if offset > 0:
+            before = self._order.position(self._order.key(rows[offset - 1]))
+        elif page_index > 0:
+            before = self._order.position(self._pages[page_index - 1].last_key)
+        else:
+            before = None
+        if offset + 1 < len(rows):
+            after = self._order.position(self._order.key(rows[offset + 1]))
+        elif page_index + 1 < len(self._pages):
+            after = self._order.position(self._pages[page_index + 1].first_key)
+        elif not self._exhausted:
+            after = self._order.position(self._pages[page_index].last_key)
+            return (before is None or before < position) and not after < position
+        else:
+            after = None
+        return (before is None or before < position) and (after is None or position < after)
+
+    def _move_row(self, change, rowid, row):
+        # A row's key can change with its values, so it may move between pages.
+        old = self._find_cached(rowid)
+        if old is None and change != events.INSERT and len(self._cache) < len(self._pages):
+            # Its old position is unknown once the page holding it was evicted.
+            self.refresh()
+            return
+
+        key = self._order.key(row) if row is not None else None
+        if old is not None:
+            page_index, offset = old
+            rows = self._cache[page_index]
+            position = self._starts[page_index] + offset
+            if row is not None and self._fits(page_index, offset, key):
+                rows[offset] = row
+                self._widen(self._pages[page_index], key)
+                self.dataChanged.emit(self.index(position, 0), self.index(position, len(self.fields) - 1))
+                return
+            self.beginRemoveRows(QModelIndex(), position, position)
+            del rows[offset]
+            self._resize_page(self._pages[page_index], -1)
+            self.endRemoveRows()
+
+        if row is None:
+            return
+        page_index = self._page_index(key)
+        if page_index is None:
+            return
+        page = self._pages[page_index]
+        rows = self._cache.get(page_index)
+        if rows is None:
+            first_key, last_key = page.first_key, page.last_key
+            if self._order.position(key) < self._order.position(first_key):
+                first_key = key
+            if self._order.position(last_key) < self._order.position(key):
+                last_key = key
+            rows = self._select(*self._order.between(first_key, last_key), page.count + 1)
+            offset = next((offset for offset, cached in enumerate(rows) if cached[0] == rowid), None)
+            if offset is None:
+                self.refresh()
+                return
+            rows.pop(offset)
+        else:
+            positions = [self._order.position(self._order.key(cached)) for cached in rows]
+            offset = bisect.bisect_left(positions, self._order.position(key))
+        position = self._starts[page_index] + offset
+        self.beginInsertRows(QModelIndex(), position, position)
+        rows.insert(offset, row)
+        self._store(page_index, rows)
+        self._widen(page, key)
+        self._resize_page(page, 1)
+        self.endInsertRows()
+
+    def _resize_page(self, page, delta):
+        self._row_count += delta
+        if page is None:
+            return
+        page.count += delta
+        for page_index in range(self._pages.index(page) + 1, len(self._pages)):
+            self._starts[page_index] += delta
+
+    def _store(self, page_index, rows):
+        self._cache[page_index] = rows
+        self._cache.move_to_end(page_index)
+        while len(self._cache) > self.max_cached_pages:
+            self._cache.popitem(last=False)
+
+    def _page_rows(self, page_index):
+        rows = self._cache.get(page_index)
+        if rows is not None:
+            self._cache.move_to_end(page_index)
+            return rows
+        page = self._pages[page_index]
+        rows = self._select(*self._order.between(page.first_key, page.last_key), page.count)
+        self._store(page_index, rows)
+        return rows
+
+    def row_data(self, row):
+        """Return the field values of ``row`` as a tuple, or None if out of range."""
+        if not 0 <= row < self._row_count:
+            return None
+        if self._snapshot is not None:
+            return self._snapshot[row][1:]
+        page_index = bisect.bisect_right(self._starts, row) - 1
+        rows = self._page_rows(page_index)
+        offset = row - self._starts[page_index]
+        if offset >= len(rows):
+            return None
+        return rows[offset][1:]
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return self._row_count
+
+    def columnCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self.fields)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid() or role != Qt.ItemDataRole.DisplayRole:
+            return None
+        row_data = self.row_data(index.row())
+        if row_data is None:
+            return None
+        value = row_data[index.column()]
+        if value is None:
+            return NOT_APPLICABLE
+        return value
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role != Qt.ItemDataRole.DisplayRole:
+            return None
+        if orientation == Qt.Orientation.Horizontal:
+            return self.fields[section]
+        return section + 1
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and not self._exhausted
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid() or self._exhausted:
+            return
+        with profiler.operation(f'{self.table}.fetch_more'):
+            self._fetch_page()
+
+    def _fetch_page(self):
+        if self._pages:
+            rows = self._select(*self._order.after(self._pages[-1].last_key), self.page_size)
+        else:
+            rows = self._select("1", (), self.page_size)
+        if len(rows) < self.page_size:
+            self._exhausted = True
+        if not rows:
+            return
+
+        self.beginInsertRows(QModelIndex(), self._row_count, self._row_count + len(rows) - 1)
+        self._pages.append(_Page(self._order.key(rows[0]), self._order.key(rows[-1]), len(rows)))
+        self._starts.append(self._row_count)
+        self._store(len(self._pages) - 1, rows)
+        self._row_count += len(rows)
+        self.endInsertRows()
+
+
+class RowsTableModel(QAbstractTableModel):
+    """Read-only table model over a short list of rows held in memory."""
+
+    def __init__(self, headers, parent=None):
+        super().__init__(parent)
+        self.headers = list(headers)
+        self._rows = []
+        self._sort_column = -1
+        self._sort_order = Qt.SortOrder.AscendingOrder
+
+    def set_rows(self, rows):
+        self.beginResetModel()
+        self._rows = list(rows)
+        self._sort_rows()
+        self.endResetModel()
+
+    def rows(self):
+        return self._rows
+
+    def _sort_rows(self):
+        if 0 <= self._sort_column < len(self.headers):
+            column = self._sort_column
+            self._rows.sort(key=lambda row: (row[column] is not None, row[column]),
+                            reverse=self._sort_order == Qt.SortOrder.DescendingOrder)
+
+    def sort(self, column, order=Qt.SortOrder.AscendingOrder):
+        self._sort_column = column
+        self._sort_order = order
+        self.layoutAboutToBeChanged.emit()
+        self._sort_rows()
+        self.layoutChanged.emit()
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self._rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self.headers)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid() or role != Qt.ItemDataRole.DisplayRole:
+            return None
+        value = self._rows[index.row()][index.column()]
+        if value is None:
+            return NOT_APPLICABLE
+        return value
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role != Qt.ItemDataRole.DisplayRole:
+            return None
+        if orientation == Qt.Orientation.Horizontal:
+            return self.headers[section]
+        return section + 1
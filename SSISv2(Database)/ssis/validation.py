@@ -0,0 +1,136 @@
+"""Checks on a student before it is added: ID format, ID collisions and near-duplicate names.
+
+Near duplicates are found in two steps. Schema version 8 indexes every
+name by a rough phonetic key: lower-cased, with spaces, dots and dashes,
+vowels and the silent letters h, w and y dropped, c and q spelled k, ph
+spelled f, z spelled s and the commonest doubled consonants single. "Jon Santos",
+"John Santos" and "Jhon Santoss" all share the key ``jnsnts``. The key
+is an indexed expression built from replace() alone, so SQLite keeps it
+up to date on every write, whoever makes it. The names under the keys of
+the typed name, and of its words in other orders, are then scored in
+Python by how alike they are to the closest of those orders, spelled with
+the key's consonants folded but their vowels kept, so "Kris J" matches
+"Chris J". Those scoring SIMILARITY or more are reported. Misspelt
+consonants other than these go unnoticed.
+"""
+
+import itertools
+import json
+from collections import namedtuple
+from difflib import SequenceMatcher
+
+from ssis.schema import NOT_APPLICABLE, STUDENT_ID_PATTERN
+
+ERROR, WARNING = 'error', 'warning'
+# Names at least this alike, from 0 to 1, are reported as possible duplicates.
+SIMILARITY = 0.8
+SIMILAR_LIMIT = 5
+# Most rows read under the keys of one name before scoring.
+CANDIDATE_LIMIT = 200
+
+Issue = namedtuple('Issue', 'field level message')
+Issue.__doc__ = """One finding about a student: ``level`` ERROR blocks adding it, WARNING does not."""
+
+# SQLite parses at most 30 nested calls, so only the commonest spellings are folded.
+_SEPARATORS = (' ', '-', '.')
+_SPELLINGS = (('ph', 'f'), ('c', 'k'), ('q', 'k'), ('z', 's'))
+_SILENT = ('a', 'e', 'i', 'o', 'u', 'y', 'h', 'w')
+_DOUBLES = tuple((letter * 2, letter) for letter in 'klmnrst')
+_SILENT_CONSONANTS = ('h', 'w')
+
+
+def name_key(expression):
+    """Return the SQL for the phonetic key of the name ``expression`` evaluates to."""
+    sql = f"lower({expression})"
+    for old in _SEPARATORS:
+        sql = f"replace({sql}, '{old}', '')"
+    for old, new in _SPELLINGS:
+        sql = f"replace({sql}, '{old}', '{new}')"
+    for old in _SILENT:
+        sql = f"replace({sql}, '{old}', '')"
+    for old, new in _DOUBLES:
+        sql = f"replace({sql}, '{old}', '{new}')"
+    return sql
+
+
+# The expression students_name_key indexes. Changing the key needs a new
+# schema migration that recreates the index, or lookups stop using it.
+NAME_KEY = name_key('StudentName')
+
+
+def _words(name):
+    return [word for word in name.casefold().replace(',', ' ').split() if word]
+
+
+def _orders(name):
+    """The name with its words in each order a clerk might type them."""
+    words = _words(name)
+    if len(words) <= 3:
+        orders = itertools.permutations(words)
+    else:
+        orders = (words[start:] + words[:start] for start in range(len(words)))
+    return list(dict.fromkeys(' '.join(order) for order in orders))
+
+
+def _spelled(name):
+    """``name`` with its consonants spelled as in its key, and its vowels and word breaks kept."""
+    spelled = ' '.join(_words(name))
+    for old, new in _SPELLINGS:
+        spelled = spelled.replace(old, new)
+    for old in _SILENT_CONSONANTS:
+        spelled = spelled.replace(old, '')
+    for old, new in _DOUBLES:
+        spelled = spelled.replace(old, new)
+    return spelled
+
+
+def _score(orders, other):
+    # The words are compared in order: sorted, "kris j" and "chris j" would line up "j" with "chris".
+    other = _spelled(other)
+    return max(SequenceMatcher(None, _spelled(order), other).ratio() for order in orders)
+
+
+def similarity(name, other):
+    """Return how alike two names are, from 0 to 1, whatever the order of their words."""
+    return _score(_orders(name), other)
+
+
+def similar_students(connection, name, limit=SIMILAR_LIMIT, exclude=None):
+    """Return up to ``limit`` ``(score, student)`` pairs for students whose name is like ``name``, most alike first.
+
+    ``student`` is ``(StudentID, StudentName, Gender, Year, CourseCode)``;
+    the student ``exclude``, if given, is left out.
+    """
+    orders = _orders(name)
+    if not orders:
+        return []
+    rows = connection.execute(
+        f"SELECT StudentID, StudentName, Gender, Year, CourseCode FROM students "
+        f"WHERE {NAME_KEY} IN (SELECT {name_key('value')} FROM json_each(?) WHERE {name_key('value')} != '') "
+        f"LIMIT ?", (json.dumps(orders), CANDIDATE_LIMIT)).fetchall()
+    scored = [(_score(orders, row[1]), row) for row in rows if row[0] != exclude]
+    scored = [(score, row) for score, row in scored if score >= SIMILARITY]
+    scored.sort(key=lambda pair: (-pair[0], pair[1][0]))
+    return scored[:limit]
+
+
+def check_student_id(connection, student_id):
+    """Return the issues with ``student_id`` as the ID of a new student."""
+    if not student_id:
+        return []
+    if not STUDENT_ID_PATTERN.fullmatch(student_id):
+        return [Issue('StudentID', ERROR, "A student ID is four digits, a dash and four digits, e.g. 2024-0001")]
+    taken = connection.execute("SELECT StudentName FROM students WHERE StudentID = ?", (student_id,)).fetchone()
+    if taken is not None:
+        return [Issue('StudentID', ERROR, f"{student_id} is already taken by {taken[0]}")]
+    return []
+
+
+def validate_student(connection, student_id, student_name, limit=SIMILAR_LIMIT):
+    """Return the issues found with a new student: errors for its ID, warnings for students with a similar name."""
+    issues = check_student_id(connection, student_id)
+    if student_name.strip():
+        for score, row in similar_students(connection, student_name.strip(), limit, exclude=student_id):
+            issues.append(Issue('StudentName', WARNING,
+                                f"Possible duplicate: {row[0]} {row[1]} ({row[4] or NOT_APPLICABLE}, {row[3]})"))
+    return issues
@@ -0,0 +1,92 @@
+"""Background jobs run on the global QThreadPool."""
+
+from PyQt6.QtCore import QObject, QRunnable, pyqtSignal
+
+from ssis.exporter import ExportCancelled, count_rows, export_query
+from ssis.instrumentation import profiler
+from ssis.maintenance import BackupCancelled
+
+
+class ExportWorkerSignals(QObject):
+    started = pyqtSignal(int)
+    progress = pyqtSignal(int)
+    finished = pyqtSignal(int)
+    cancelled = pyqtSignal()
+    failed = pyqtSignal(str)
+
+
+class ExportWorker(QRunnable):
+    """Exports one filtered table view, in the order ``order_by`` gives, on its own reader connection.
+
+    ``open_reader`` is called on the worker thread and the connection it
+    returns is closed when the export ends.
+    """
+
+    def __init__(self, open_reader, table, columns, where, params, path, order_by='rowid'):
+        super().__init__()
+        self.open_reader = open_reader
+        self.table = table
+        self.columns = columns
+        self.where = where
+        self.params = params
+        self.path = path
+        self.order_by = order_by
+        self.signals = ExportWorkerSignals()
+        self._cancelled = False
+
+    def cancel(self):
+        self._cancelled = True
+
+    def run(self):
+        try:
+            connection = self.open_reader()
+            try:
+                with profiler.operation(f'export_{self.table}'):
+                    self.signals.started.emit(count_rows(connection, self.table, self.where, self.params))
+                    written = export_query(connection, self.table, self.columns, self.where, self.params, self.path,
+                                           on_progress=self.signals.progress.emit, is_cancelled=lambda: self._cancelled,
+                                           order_by=self.order_by)
+            finally:
+                connection.close()
+        except ExportCancelled:
+            self.signals.cancelled.emit()
+        except Exception as error:
+            self.signals.failed.emit(str(error))
+        else:
+            self.signals.finished.emit(written)
+
+
+class MaintenanceWorkerSignals(QObject):
+    progress = pyqtSignal(int, int)
+    finished = pyqtSignal(object)
+    cancelled = pyqtSignal()
+    failed = pyqtSignal(str)
+
+
+class MaintenanceWorker(QRunnable):
+    """Runs one backup, snapshot or maintenance task from ssis.maintenance.
+
+    ``task(on_progress, is_cancelled)`` opens its own connections; its
+    result is emitted by ``finished``.
+    """
+
+    def __init__(self, name, task):
+        super().__init__()
+        self.name = name
+        self.task = task
+        self.signals = MaintenanceWorkerSignals()
+        self._cancelled = False
+
+    def cancel(self):
+        self._cancelled = True
+
+    def run(self):
+        try:
+            with profiler.operation(self.name):
+                result = self.task(self.signals.progress.emit, lambda: self._cancelled)
+        except BackupCancelled:
+            self.signals.cancelled.emit()
+        except Exception as error:
+            self.signals.failed.emit(str(error))
+        else:
+            self.signals.finished.emit(result)
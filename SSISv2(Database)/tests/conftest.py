@@ -0,0 +1,68 @@
+import os
+import shutil
+import signal
+import subprocess
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+from benchmarks.roster import generate  # noqa: E402
+from ssis import events  # noqa: E402
+from ssis.database import Database  # noqa: E402
+
+LEGACY_FILES = ('Student_Table.db', 'Course_Table.db')
+
+
+@pytest.fixture
+def legacy_dir(tmp_path):
+    """A copy of the two legacy database files shipped with the application."""
+    for name in LEGACY_FILES:
+        shutil.copy(os.path.join(ROOT, name), tmp_path / name)
+    return str(tmp_path)
+
+
+@pytest.fixture
+def roster_dir(tmp_path):
+    """A synthetic legacy roster of 300 students in 10 courses."""
+    generate(str(tmp_path), 300, fanout=30, unassigned=0.1, seed=7)
+    return str(tmp_path)
+
+
+@pytest.fixture
+def db(roster_dir):
+    database = Database(roster_dir, actor='tests')
+    yield database
+    database.close()
+
+
+@pytest.fixture
+def bus():
+    return events.EventBus()
+
+
+@pytest.fixture(scope='session')
+def qt_app():
+    from PyQt6.QtWidgets import QApplication
+
+    return QApplication.instance() or QApplication([])
+
+
+@pytest.fixture
+def server_url(db, roster_dir, monkeypatch):
+    """The URL of an SSIS server, run in a process of its own, serving the same files as ``db``.
+
+    The server and the clients the test makes share the token in SSIS_TOKEN.
+    """
+    monkeypatch.setenv('SSIS_TOKEN', 'test-token')
+    server = subprocess.Popen([sys.executable, '-m', 'ssis', 'serve', '--database-dir', roster_dir, '--port', '0'],
+                              cwd=ROOT, stdout=subprocess.PIPE, text=True)
+    try:
+        yield server.stdout.readline().split()[-1]
+    finally:
+        server.send_signal(signal.SIGINT)
+        server.wait()
+        server.stdout.close()
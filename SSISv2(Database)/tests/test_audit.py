@@ -0,0 +1,169 @@
+import json
+import sqlite3
+
+import pytest
+
+from ssis import audit
+from ssis.repository import ChangeLogRepository, CourseRepository, StudentRepository
+
+
+@pytest.fixture
+def students(db, bus):
+    return StudentRepository(db, bus)
+
+
+@pytest.fixture
+def courses(db, bus):
+    return CourseRepository(db, bus)
+
+
+@pytest.fixture
+def changes(db):
+    return ChangeLogRepository(db)
+
+
+def entries(changes, since=None):
+    return [dict(zip(changes.columns, row)) for row in changes.since(since)]
+
+
+def replay(connection, rows):
+    """Apply change_log rows to ``connection`` as a sync client would: in Seq order, one row at a time."""
+    for row in rows:
+        entry = dict(zip(audit.COLUMNS, row))
+        table, record = entry['TableName'], entry['Record']
+        if entry['Operation'] == 'DELETE':
+            connection.execute(f"DELETE FROM {table} WHERE rowid = ?", (record,))
+            continue
+        data = json.loads(entry['Data'])
+        assignments = ', '.join(f"{column} = ?" for column in data)
+        if not connection.execute(f"UPDATE {table} SET {assignments} WHERE rowid = ?",
+                                  (*data.values(), record)).rowcount:
+            connection.execute(f"INSERT INTO {table} (rowid, {', '.join(data)}) VALUES (?{', ?' * len(data)})",
+                               (record, *data.values()))
+
+
+def contents(connection):
+    return (connection.execute("SELECT rowid, * FROM students ORDER BY rowid").fetchall(),
+            connection.execute("SELECT rowid, * FROM courses ORDER BY rowid").fetchall())
+
+
+def busiest_course(db):
+    return db.execute("SELECT CourseCode FROM students WHERE CourseCode IS NOT NULL "
+                      "GROUP BY CourseCode ORDER BY count(*) DESC LIMIT 1").fetchone()[0]
+
+
+def test_changes_are_logged_with_their_actor(db, students, changes):
+    students.add('2099-0001', 'Ana Test', 'Female', 'First')
+    students.update('2099-0001', 'Ana Tested', 'Female', 'Second')
+    students.delete('2099-0001')
+
+    logged = entries(changes)
+    assert [(entry['Operation'], entry['OldKey'], entry['NewKey']) for entry in logged] == [
+        ('INSERT', None, '2099-0001'), ('UPDATE', '2099-0001', '2099-0001'), ('DELETE', '2099-0001', None)]
+    assert {entry['Actor'] for entry in logged} == {'tests'}
+    assert json.loads(logged[1]['Data'])['Year'] == 'Second'
+    # The actor is only set while the application's own transaction is open.
+    assert db.execute("SELECT count(*) FROM change_actor").fetchone()[0] == 0
+
+
+def test_changes_from_other_clients_have_no_actor(db, changes):
+    other = sqlite3.connect(db.database, isolation_level=None)
+    try:
+        other.execute("UPDATE students SET Year = 'Fourth' WHERE rowid = 1 AND Year IS NOT 'Fourth'")
+        other.execute("UPDATE students SET Year = 'First' WHERE rowid = 1")
+    finally:
+        other.close()
+    assert {entry['Actor'] for entry in entries(changes)} == {None}
+
+
+def test_an_update_that_changes_nothing_is_not_logged(db, students, changes):
+    student = students.get(db.execute("SELECT StudentID FROM students LIMIT 1").fetchone()[0])
+    students.update(*student)
+    assert entries(changes) == []
+
+
+def test_a_replay_in_seq_order_reproduces_a_rename(db, students, courses, changes):
+    replica = sqlite3.connect(':memory:', isolation_level=None)
+    db.connection.backup(replica)
+    replica.execute("PRAGMA foreign_keys=ON")
+    since = changes.last()
+
+    code = busiest_course(db)
+    courses.rename(code, 'RENAMED')
+    students.add('2099-0001', 'New Student', 'Male', 'First', 'RENAMED')
+    courses.delete(db.execute("SELECT Code FROM courses WHERE Code != 'RENAMED' LIMIT 1").fetchone()[0])
+
+    logged = entries(changes, since)
+    assert (logged[0]['TableName'], logged[0]['OldKey'], logged[0]['NewKey']) == ('courses', code, 'RENAMED')
+    replay(replica, changes.since(since).fetchall())
+    assert contents(replica) == contents(db.connection)
+    replica.close()
+
+
+def test_compact_keeps_the_first_and_last_entry_per_row(db, students, changes):
+    students.add('2099-0001', 'Ana', 'Female', 'First')
+    students.update('2099-0001', 'Ana B', 'Female', 'First')
+    students.update('2099-0001', 'Ana B', 'Female', 'Second')
+    students.add('2099-0002', 'Ben', 'Male', 'First')
+    students.update('2099-0001', 'Ana C', 'Female', 'Second')
+    assert changes.compact() == 2
+    assert [(entry['Operation'], entry['NewKey']) for entry in entries(changes)] == [
+        ('INSERT', '2099-0001'), ('INSERT', '2099-0002'), ('UPDATE', '2099-0001')]
+    assert json.loads(entries(changes)[-1]['Data'])['StudentName'] == 'Ana C'
+
+
+def test_a_compacted_log_replays_with_foreign_keys_enforced(db, students, courses, changes):
+    replicas = []
+
+    def copy():
+        replica = sqlite3.connect(':memory:', isolation_level=None)
+        db.connection.backup(replica)
+        replica.execute("PRAGMA foreign_keys=ON")
+        replicas.append((changes.last(), replica))
+
+    copy()
+    courses.add('BSNEW', 'New Course')
+    students.add('2099-0001', 'Ana Test', 'Female', 'First', 'BSNEW')
+    db.execute("UPDATE courses SET Name = 'Renamed Course' WHERE Code = 'BSNEW'")
+    copy()
+    courses.rename('BSNEW', 'BSNEWER')
+    students.update('2099-0001', 'Ana Tested', 'Female', 'Second', 'BSNEWER')
+    gone = busiest_course(db)
+    students.update('2099-0001', 'Ana Tested', 'Female', 'Second', gone)
+    students.update('2099-0001', 'Ana Moved', 'Female', 'Second', 'BSNEWER')
+    courses.delete(gone)
+    db.execute("UPDATE courses SET Name = 'Renamed Again' WHERE Code = 'BSNEWER'")
+    # A student added and deleted gives up its rowid, which the next one added takes.
+    students.add('2099-0002', 'Ben Test', 'Male', 'First')
+    students.delete('2099-0002')
+    students.add('2099-0003', 'Cy Test', 'Male', 'First')
+    students.update('2099-0003', 'Cy Tested', 'Male', 'First')
+
+    assert changes.compact() > 0
+    for since, replica in replicas:
+        replay(replica, changes.since(since).fetchall())
+        assert contents(replica) == contents(db.connection)
+        replica.close()
+    # Its delete is not merged into the entries of the row that took its rowid.
+    assert [row[4] for row in changes.since(key='2099-0002')] == ['INSERT', 'DELETE']
+
+
+def test_truncated_changes_are_refused(db, students, changes):
+    students.add('2099-0001', 'Ana', 'Female', 'First')
+    students.add('2099-0002', 'Ben', 'Male', 'First')
+    last = changes.last()
+    assert changes.truncate(last) == 1
+    assert changes.start() == last - 1
+    with pytest.raises(audit.ChangesTruncated):
+        changes.since(0)
+    assert [entry['NewKey'] for entry in entries(changes, last - 1)] == ['2099-0002']
+    assert [entry['NewKey'] for entry in entries(changes)] == ['2099-0002']
+
+
+def test_changes_can_be_narrowed_to_a_table_and_key(db, students, courses, changes):
+    students.add('2099-0001', 'Ana', 'Female', 'First')
+    courses.add('NEW1', 'New Course')
+    assert [row[7] for row in changes.since(table='courses')] == ['NEW1']
+    assert [row[7] for row in changes.since(key='2099-0001')] == ['2099-0001']
+    with pytest.raises(ValueError):
+        changes.since(table='grades')
@@ -0,0 +1,91 @@
+import csv
+import io
+
+import pytest
+
+from ssis.cli import main
+from ssis.schema import STUDENT_COLUMNS
+
+
+@pytest.fixture
+def run(roster_dir, capsys):
+    """Run the command line on the roster; returns its exit status, stdout and stderr."""
+    def run_(*argv, server=None):
+        where = ['--server', server] if server else ['--database-dir', roster_dir]
+        status = main([*argv, *where])
+        out, err = capsys.readouterr()
+        return status, out, err
+    return run_
+
+
+def rows(out):
+    return list(csv.reader(io.StringIO(out)))
+
+
+def test_a_student_is_added_shown_and_deleted(db, run):
+    assert run('students', 'add', '2099-0001', 'Ana Test', 'Female', 'First')[0] == 0
+    status, out, _ = run('students', 'show', '2099-0001')
+    assert status == 0
+    assert rows(out) == [list(STUDENT_COLUMNS), ['2099-0001', 'Ana Test', 'Female', 'First', 'N/A']]
+    assert run('students', 'delete', '2099-0001')[0] == 0
+    status, _, err = run('students', 'show', '2099-0001')
+    assert (status, err) == (1, "No student 2099-0001\n")
+
+
+def test_a_rejected_write_exits_with_1(db, run):
+    student_id = db.execute("SELECT StudentID FROM students LIMIT 1").fetchone()[0]
+    status, _, err = run('students', 'add', student_id, 'Ana Test', 'Female', 'First')
+    assert status == 1
+    assert err.startswith("Rejected:")
+
+
+def test_list_prints_the_filtered_students(db, run):
+    status, out, _ = run('students', 'list', '--field', 'Year', '--filter', 'Second')
+    expected = db.execute("SELECT StudentID FROM students WHERE Year = 'Second'").fetchall()
+    assert status == 0
+    header, *listed = rows(out)
+    assert header == list(STUDENT_COLUMNS)
+    assert sorted(row[0] for row in listed) == sorted(student_id for student_id, in expected)
+    assert {row[3] for row in listed} == {'Second'}
+
+
+def test_a_bad_filter_exits_with_2(run):
+    status, _, err = run('students', 'list', '--field', 'Age', '--filter', '3')
+    assert status == 2
+    assert "Unknown student field: Age" in err
+
+
+def test_list_takes_a_compound_filter(db, run):
+    status, out, _ = run('students', 'list', '--field', 'Query', '--filter', 'Year = Second AND Gender = Female')
+    expected = db.execute("SELECT StudentID FROM students WHERE Year = 'Second' AND Gender = 'Female'").fetchall()
+    assert status == 0
+    header, *listed = rows(out)
+    assert header == list(STUDENT_COLUMNS)
+    assert sorted(row[0] for row in listed) == sorted(student_id for student_id, in expected)
+    assert {(row[3], row[2]) for row in listed} == {('Second', 'Female')}
+    status, _, err = run('students', 'list', '--field', 'Query', '--filter', 'Age = 3')
+    assert status == 2
+    assert "Unknown student field: Age" in err
+
+
+def test_a_dry_run_rename_writes_nothing(db, run):
+    code, students = db.execute("SELECT CourseCode, count(*) FROM students WHERE CourseCode IS NOT NULL "
+                                "GROUP BY 1 ORDER BY 2 DESC LIMIT 1").fetchone()
+    status, out, _ = run('courses', 'rename', code, 'RENAMED', '--dry-run')
+    assert (status, out) == (0, f"Would move {students} student(s) from {code} to RENAMED\n")
+    assert db.execute("SELECT count(*) FROM students WHERE CourseCode = ?", (code,)).fetchone() == (students,)
+
+
+def test_statistics_and_changes(db, run):
+    assert run('statistics', 'check') == (0, "0 stale count(s)\n", '')
+    run('courses', 'add', 'NEW1', 'New Course')
+    status, out, _ = run('changes', 'list', '--table', 'courses')
+    assert status == 0
+    assert [row[7] for row in rows(out)[1:]] == ['NEW1']
+
+
+def test_commands_work_through_a_server(db, run, server_url):
+    assert run('students', 'add', '2099-0001', 'Ana Test', 'Female', 'First', server=server_url)[0] == 0
+    assert db.execute("SELECT StudentName FROM students WHERE StudentID = '2099-0001'").fetchone() == ('Ana Test',)
+    status, out, _ = run('students', 'show', '2099-0001', server=server_url)
+    assert rows(out)[1][:2] == ['2099-0001', 'Ana Test']
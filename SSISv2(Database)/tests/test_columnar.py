@@ -0,0 +1,106 @@
+import pytest
+
+from ssis import columnar
+from ssis.columnar import ColumnarRoster, select_conditions
+from ssis.filters import parse_filter
+from ssis.repository import CourseRepository, StudentRepository
+from ssis.schema import STUDENT_COLUMNS
+from ssis.search import row_matcher
+from ssis.sorting import STUDENT_SORT_KEYS, SortOrder
+
+SELECT = f"SELECT rowid, {', '.join(STUDENT_COLUMNS)} FROM students"
+
+
+@pytest.fixture
+def roster(db, bus):
+    db.execute("UPDATE students SET Year = NULL WHERE rowid % 11 = 0")
+    held = ColumnarRoster(db, bus)
+    yield held
+    held.close()
+
+
+def busiest_course(db):
+    return db.execute("SELECT CourseCode FROM students WHERE CourseCode IS NOT NULL "
+                      "GROUP BY 1 ORDER BY count(*) DESC LIMIT 1").fetchone()[0]
+
+
+def everyone(db):
+    return db.execute(f"{SELECT} ORDER BY rowid").fetchall()
+
+
+def assert_current(db, roster):
+    assert roster.rows(roster.select({})) == everyone(db)
+
+
+@pytest.mark.parametrize('dense', [False, True])
+def test_select_agrees_with_sql(db, roster, monkeypatch, dense):
+    monkeypatch.setattr(columnar, 'DENSE_FRACTION', 0 if dense else 2)
+    code = busiest_course(db)
+    for conditions, where, params in [
+        ({'Year': 'Second'}, "Year = ?", ('Second',)),
+        ({'Year': 'Second', 'CourseCode': code}, "Year = ? AND CourseCode = ?", ('Second', code)),
+        ({'Year': ('First', None), 'Gender': 'Female'}, "(Year = ? OR Year IS NULL) AND Gender = ?",
+         ('First', 'Female')),
+        ({'CourseCode': None}, "CourseCode IS NULL", ()),
+        ({'Year': 'Fifth'}, "Year = ?", ('Fifth',)),
+    ]:
+        expected = db.execute(f"{SELECT} WHERE {where} ORDER BY rowid", params).fetchall()
+        assert roster.rows(roster.select(conditions)) == expected
+        assert roster.rows(roster.select(conditions, 3)) == expected[:3]
+    with pytest.raises(ValueError):
+        roster.select({'StudentName': 'Ana'})
+
+
+@pytest.mark.parametrize('field', ['All', *STUDENT_COLUMNS])
+def test_contains_agrees_with_the_row_matcher(db, roster, field):
+    for text in ('an', 'Reyes', 'sec', '2024-', 'zzz'):
+        matches = row_matcher(text, STUDENT_COLUMNS, field)
+        assert roster.rows(roster.contains(field, text)) == [row for row in everyone(db) if matches(row[1:])]
+
+
+@pytest.mark.parametrize('descending', [False, True])
+@pytest.mark.parametrize('field', [None, *STUDENT_SORT_KEYS])
+def test_order_agrees_with_sql(db, roster, monkeypatch, field, descending):
+    order = SortOrder('students', STUDENT_COLUMNS, field, descending)
+    expected = db.execute(f"{SELECT} ORDER BY {order.order_by()}").fetchall()
+    for fraction in (0, 2):
+        # Through the cached full order, and by sorting the positions given.
+        monkeypatch.setattr(columnar, 'PERMUTATION_FRACTION', fraction)
+        assert roster.rows(roster.order(roster.select({}), field, descending)) == expected
+
+
+def test_the_roster_follows_published_writes(db, bus, roster):
+    students, courses = StudentRepository(db, bus), CourseRepository(db, bus)
+    roster.order(roster.select({}), 'StudentName')
+    roster.contains('StudentName', 'an')
+    students.add('2099-0001', 'Ana Test', 'Female', 'First')
+    students.update('2099-0001', 'Ana Tested', 'Male', 'Second')
+    students.delete(db.execute("SELECT StudentID FROM students LIMIT 1").fetchone()[0])
+    assert_current(db, roster)
+    courses.rename(busiest_course(db), 'RENAMED')
+    assert_current(db, roster)
+    order = SortOrder('students', STUDENT_COLUMNS, 'StudentName')
+    assert roster.rows(roster.order(roster.select({}), 'StudentName')) \
+        == db.execute(f"{SELECT} ORDER BY {order.order_by()}").fetchall()
+    assert roster.rows(roster.contains('StudentName', 'Tested')) \
+        == db.execute(f"{SELECT} WHERE StudentName = 'Ana Tested'").fetchall()
+
+
+def test_positions_are_found_by_rowid(db, roster):
+    rowids = [row[0] for row in everyone(db)][::3]
+    assert [row[0] for row in roster.rows(roster.positions(rowids))] == rowids
+    assert roster.positions([-1]) == []
+
+
+@pytest.mark.parametrize('text, conditions', [
+    ('Year = Second', {'Year': 'Second'}),
+    ('year = SECOND AND gender = male', {'Year': 'Second', 'Gender': 'Male'}),
+    ('Year = Second AND (Gender = Male AND CourseCode = N/A)', {'Year': 'Second', 'Gender': 'Male',
+                                                              'CourseCode': None}),
+    ('Year = Second AND Year = Third', {'Year': ()}),
+    ('Year = Second OR Year = Third', None),
+    ('Year ~ Sec', None),
+    ('StudentName = Ana', None),
+])
+def test_select_conditions(text, conditions):
+    assert select_conditions(parse_filter(text)) == conditions
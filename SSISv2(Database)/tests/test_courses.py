@@ -0,0 +1,56 @@
+import sqlite3
+
+import pytest
+
+from ssis.repository import CourseRepository
+
+
+@pytest.fixture
+def courses(db, bus):
+    return CourseRepository(db, bus)
+
+
+def busiest_course(db):
+    return db.execute("SELECT CourseCode, count(*) FROM students WHERE CourseCode IS NOT NULL "
+                      "GROUP BY CourseCode ORDER BY 2 DESC LIMIT 1").fetchone()
+
+
+def enrolled(db, code):
+    return db.execute("SELECT count(*) FROM students WHERE CourseCode = ?", (code,)).fetchone()[0]
+
+
+def test_delete_unassigns_the_students_of_the_course(db, courses):
+    code, students = busiest_course(db)
+    change = courses.delete(code)
+    assert change.found and change.students == students
+    assert courses.get(code) is None
+    assert enrolled(db, code) == 0
+
+
+def test_rename_moves_the_students_to_the_new_code(db, courses):
+    code, students = busiest_course(db)
+    assert courses.rename(code, 'RENAMED').students == students
+    assert enrolled(db, 'RENAMED') == students
+    taken = db.execute("SELECT Code FROM courses WHERE Code != 'RENAMED' LIMIT 1").fetchone()[0]
+    with pytest.raises(sqlite3.IntegrityError):
+        courses.rename('RENAMED', taken)
+    assert enrolled(db, 'RENAMED') == students
+
+
+def test_a_dry_run_counts_without_taking_the_write_lock(db, courses):
+    code, students = busiest_course(db)
+    rowid = db.execute("SELECT rowid FROM courses WHERE Code = ?", (code,)).fetchone()[0]
+    db.execute("PRAGMA busy_timeout=0")
+    other = sqlite3.connect(db.database, isolation_level=None)
+    try:
+        other.execute("BEGIN IMMEDIATE")
+        assert courses.delete(code, dry_run=True) == (True, rowid, students)
+        assert courses.rename(code, 'RENAMED', dry_run=True) == (True, rowid, students)
+        assert not courses.delete('NO SUCH COURSE', dry_run=True).found
+        # A real write does need the lock.
+        with pytest.raises(sqlite3.OperationalError):
+            courses.delete(code)
+        other.execute("ROLLBACK")
+    finally:
+        other.close()
+    assert courses.get(code) is not None
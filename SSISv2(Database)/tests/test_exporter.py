@@ -0,0 +1,92 @@
+import csv
+import gzip
+import os
+
+import pytest
+
+from ssis import exporter
+from ssis.database import Database
+from ssis.exporter import ExportCancelled, export_query
+from ssis.importer import import_courses, import_students
+from ssis.schema import COURSE_COLUMNS, NOT_APPLICABLE, STUDENT_COLUMNS
+from ssis.search import student_filter
+from ssis.sorting import SortOrder
+
+
+def all_rows(db, table, columns):
+    return db.execute(f"SELECT {', '.join(columns)} FROM {table} ORDER BY rowid").fetchall()
+
+
+def read_csv(path, opener=open):
+    with opener(path, 'rt', newline='', encoding='utf-8') as file:
+        return list(csv.reader(file))
+
+
+def test_csv_holds_the_filtered_rows_with_missing_values_as_not_applicable(db, tmp_path):
+    path = str(tmp_path / 'students.csv')
+    where, params = student_filter('Second', 'Year')
+    written = export_query(db.connection, 'students', STUDENT_COLUMNS, where, params, path)
+    header, *rows = read_csv(path)
+    expected = db.execute(f"SELECT {', '.join(STUDENT_COLUMNS)} FROM students WHERE {where} ORDER BY rowid",
+                          params).fetchall()
+    assert header == list(STUDENT_COLUMNS)
+    assert written == len(rows) == len(expected)
+    assert rows == [[NOT_APPLICABLE if value is None else value for value in row] for row in expected]
+
+
+@pytest.mark.parametrize('field, descending', [('StudentName', False), ('Year', True)])
+def test_rows_are_written_in_the_order_given(db, tmp_path, field, descending):
+    path = str(tmp_path / 'students.csv')
+    order_by = SortOrder('students', STUDENT_COLUMNS, field, descending).order_by()
+    where, params = student_filter('an', 'StudentName')
+    export_query(db.connection, 'students', STUDENT_COLUMNS, where, params, path, order_by=order_by)
+    expected = db.execute(f"SELECT {', '.join(STUDENT_COLUMNS)} FROM students WHERE {where} ORDER BY {order_by}",
+                          params).fetchall()
+    assert read_csv(path)[1:] == [[NOT_APPLICABLE if value is None else value for value in row] for row in expected]
+
+
+def test_gzip_csv_is_compressed(db, tmp_path):
+    path = str(tmp_path / 'students.csv.gz')
+    written = export_query(db.connection, 'students', STUDENT_COLUMNS, '', (), path)
+    assert len(read_csv(path, gzip.open)) == written + 1
+
+
+def test_parquet_keeps_nulls(db, tmp_path):
+    parquet = pytest.importorskip('pyarrow.parquet')
+    path = str(tmp_path / 'students.parquet')
+    export_query(db.connection, 'students', STUDENT_COLUMNS, '', (), path)
+    table = parquet.read_table(path)
+    assert [tuple(row.values()) for row in table.to_pylist()] == all_rows(db, 'students', STUDENT_COLUMNS)
+
+
+def test_a_cancelled_export_removes_the_file(db, tmp_path, monkeypatch):
+    monkeypatch.setattr(exporter, 'FETCH_SIZE', 10)
+    path = str(tmp_path / 'students.csv')
+    progress = []
+    with pytest.raises(ExportCancelled):
+        export_query(db.connection, 'students', STUDENT_COLUMNS, '', (), path,
+                     on_progress=progress.append, is_cancelled=lambda: len(progress) == 3)
+    assert progress == [10, 20, 30]
+    assert not os.path.exists(path)
+
+
+def test_an_export_imports_back_unchanged(db, tmp_path):
+    # Rows from before the unified schema may lack a Gender or Year.
+    db.execute("UPDATE students SET Gender = NULL WHERE rowid % 7 = 0")
+    db.execute("UPDATE students SET Year = NULL WHERE rowid % 5 = 0")
+    courses_path = str(tmp_path / 'courses.csv')
+    students_path = str(tmp_path / 'students.csv')
+    export_query(db.connection, 'courses', COURSE_COLUMNS, '', (), courses_path)
+    export_query(db.connection, 'students', STUDENT_COLUMNS, '', (), students_path)
+
+    copy_dir = tmp_path / 'copy'
+    copy_dir.mkdir()
+    copy = Database(str(copy_dir))
+    try:
+        assert import_courses(copy, courses_path).rejected_count == 0
+        report = import_students(copy, students_path)
+        assert report.rejected == []
+        assert all_rows(copy, 'courses', COURSE_COLUMNS) == all_rows(db, 'courses', COURSE_COLUMNS)
+        assert all_rows(copy, 'students', STUDENT_COLUMNS) == all_rows(db, 'students', STUDENT_COLUMNS)
+    finally:
+        copy.close()
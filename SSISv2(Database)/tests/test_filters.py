@@ -0,0 +1,106 @@
+import re
+
+import pytest
+
+from ssis.filters import Group, Term, compile_filter, parse_filter, query_plan
+from ssis.schema import STUDENT_COLUMNS
+from ssis.search import STUDENT_ENUMS
+
+FILTERS = [
+    'Year = Second',
+    'Year = Second AND Gender = Female',
+    'CourseCode = N/A',
+    'StudentID ^= 2024- OR StudentID ^= 2030-',
+    'StudentName ~ "de la" OR StudentName ~ Reyes',
+    'StudentName ~ an AND Year ~ ir',
+    'Gender ~ male AND (Year = First OR Year = Fourth) AND StudentName ~ ana',
+    '(StudentName ~ ana OR StudentID ~ 20) AND CourseCode ^= BS',
+    'Year = Fifth',
+    'Year ~ zzz OR Gender = Male',
+    'gender = FEMALE AND Year ^= th',
+    'StudentName ^= A OR StudentName ^= a',
+]
+
+
+def scan(row, node):
+    """Whether a row of STUDENT_COLUMNS values matches ``node``, tested directly in Python."""
+    if isinstance(node, Group):
+        tests = (scan(row, child) for child in node.terms)
+        return all(tests) if node.operator == 'AND' else any(tests)
+    value = row[STUDENT_COLUMNS.index(node.field)]
+    if node.operator == '=':
+        return value == node.value
+    if value is None:
+        return False
+    if node.operator == '^=' and node.field in STUDENT_ENUMS:
+        return value.casefold().startswith(node.value.casefold())
+    if node.operator == '^=':
+        return value.startswith(node.value)
+    return node.value.casefold() in value.casefold()
+
+
+@pytest.mark.parametrize('text', FILTERS)
+def test_compiled_filters_agree_with_a_scan(db, text):
+    node = parse_filter(text)
+    where, params = compile_filter(node)
+    columns = ', '.join(STUDENT_COLUMNS)
+    matched = db.execute(f"SELECT {columns} FROM students WHERE {where} ORDER BY rowid", params).fetchall()
+    everyone = db.execute(f"SELECT {columns} FROM students ORDER BY rowid").fetchall()
+    assert matched == [row for row in everyone if scan(row, node)]
+
+
+def test_and_binds_tighter_than_or():
+    assert parse_filter('Year = First OR Year = Second AND Gender = Male') == Group('OR', (
+        Term('Year', '=', 'First'),
+        Group('AND', (Term('Year', '=', 'Second'), Term('Gender', '=', 'Male')))))
+
+
+def test_quoted_values_and_field_names_in_any_case():
+    assert parse_filter('studentname ~ "say ""hi"""') == Term('StudentName', '~', 'say "hi"')
+    # Only an unquoted N/A stands for no course.
+    assert parse_filter('CourseCode = "N/A"') == Term('CourseCode', '=', 'N/A')
+    assert parse_filter('CourseCode = n/a') == Term('CourseCode', '=', None)
+
+
+def test_gender_and_year_are_compared_in_any_case():
+    assert parse_filter('year = SECOND') == Term('Year', '=', 'Second')
+    # A value that is not one of theirs is kept as written, and matches nobody.
+    assert parse_filter('Gender = unknown') == Term('Gender', '=', 'unknown')
+    assert compile_filter(parse_filter('Year ^= f'))[1] == ('First', 'Fourth')
+
+
+def test_other_prefixes_are_case_sensitive(db):
+    name = db.execute("SELECT StudentName FROM students LIMIT 1").fetchone()[0]
+
+    def names(prefix):
+        where, params = compile_filter(parse_filter(f'StudentName ^= "{prefix}"'))
+        return [row[0] for row in db.execute(f"SELECT StudentName FROM students WHERE {where}", params)]
+
+    assert name in names(name[:3])
+    assert name not in names(name[:3].swapcase())
+
+
+@pytest.mark.parametrize('text, message', [
+    ('', 'empty'),
+    ('Age = 3', 'Unknown student field'),
+    ('Year Second', 'Expected =, ^= or ~'),
+    ('Year =', 'Expected a value'),
+    ('(Year = First', "Missing ')'"),
+    ('Year = First Gender = Male', 'Unexpected'),
+])
+def test_malformed_filters_are_refused(text, message):
+    with pytest.raises(ValueError, match=re.escape(message)):
+        parse_filter(text)
+
+
+def test_the_clause_depends_on_the_shape_only():
+    first, _ = compile_filter(parse_filter('Year = First AND CourseCode = BSCS'))
+    second, _ = compile_filter(parse_filter('Year = Third AND CourseCode = BSIT'))
+    assert first == second
+
+
+def test_selective_terms_lead_the_plan(db):
+    where, params = compile_filter(parse_filter('Year = Second AND CourseCode = X AND Gender = Female'))
+    plan = ' '.join(query_plan(db, f"SELECT * FROM students WHERE {where}", params))
+    assert 'students_course_code' in plan
+    assert 'students_year' not in plan and 'students_gender' not in plan
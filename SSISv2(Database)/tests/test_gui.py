@@ -0,0 +1,135 @@
+import csv
+import sqlite3
+
+import pytest
+
+pytest.importorskip('PyQt6')
+
+from PyQt6.QtCore import Qt, QThreadPool  # noqa: E402
+from PyQt6.QtWidgets import QDialog, QFileDialog, QInputDialog, QLineEdit, QMessageBox  # noqa: E402
+
+from ssis.filters import QUERY_FIELD, compile_filter, parse_filter  # noqa: E402
+from ssis.gui import MainWindow  # noqa: E402
+from ssis.schema import NOT_APPLICABLE, STUDENT_COLUMNS  # noqa: E402
+
+pytestmark = pytest.mark.usefixtures('qt_app')
+
+
+@pytest.fixture
+def window(db, roster_dir):
+    main_window = MainWindow(roster_dir)
+    yield main_window
+    main_window.close()
+
+
+@pytest.fixture
+def messages(monkeypatch):
+    """The warnings and notices the window shows, collected instead of shown."""
+    shown = []
+    monkeypatch.setattr(QMessageBox, 'warning', lambda parent, title, text: shown.append(text))
+    monkeypatch.setattr(QMessageBox, 'information', lambda parent, title, text: shown.append(text))
+    return shown
+
+
+def spy(monkeypatch, target, name, calls):
+    """Record the arguments of each call to ``target.name`` in ``calls`` and let it run."""
+    method = getattr(target, name)
+    monkeypatch.setattr(target, name, lambda *args: calls.append(args) or method(*args))
+
+
+def shown_for(db, model, text):
+    """The rows ``model`` would read from the database for the Query filter ``text``, in its order."""
+    where, params = compile_filter(parse_filter(text))
+    return db.execute(model.select_sql(where), (*params, 10000)).fetchall()
+
+
+def accept_with(monkeypatch, *texts):
+    """Answer the next dialogs by typing ``texts`` into their line edits, in order, and pressing OK."""
+    def exec_(dialog):
+        for line_edit, text in zip(dialog.findChildren(QLineEdit), texts):
+            line_edit.setText(text)
+        return QDialog.DialogCode.Accepted
+    monkeypatch.setattr(QDialog, 'exec', exec_)
+
+
+def test_a_student_id_is_checked_before_it_is_looked_up(window, messages, monkeypatch):
+    looked_up = []
+    monkeypatch.setattr(window.students, 'exists', looked_up.append)
+    accept_with(monkeypatch, '', 'Ana Test')
+    window.add_student()
+    accept_with(monkeypatch, '99-1', 'Ana Test')
+    window.add_student()
+    assert messages == ["Both student ID and name are required!",
+                        "A student ID is four digits, a dash and four digits, e.g. 2024-0001."]
+    assert looked_up == []
+
+
+def test_a_locked_database_is_reported_in_a_dialog(db, window, messages, monkeypatch):
+    code = db.execute("SELECT Code FROM courses LIMIT 1").fetchone()[0]
+    monkeypatch.setattr(QInputDialog, 'getText', lambda *args: (code, True))
+    monkeypatch.setattr(QMessageBox, 'question', lambda *args: QMessageBox.StandardButton.Yes)
+    window.db.execute("PRAGMA busy_timeout=0")
+    other = sqlite3.connect(db.database, isolation_level=None)
+    try:
+        other.execute("BEGIN IMMEDIATE")
+        window.delete_course()
+        accept_with(monkeypatch, '2099-0001', 'Ana Test')
+        window.add_student()
+    finally:
+        other.close()
+    assert messages == ["The course was not deleted: database is locked",
+                        "The student was not added: database is locked"]
+    assert window.courses.get(code) is not None
+
+
+def test_equality_queries_are_filtered_and_sorted_in_memory(db, window, monkeypatch):
+    code = db.execute("SELECT CourseCode FROM students WHERE Year = 'Second' AND CourseCode IS NOT NULL "
+                      "GROUP BY 1 ORDER BY count(*) DESC LIMIT 1").fetchone()[0]
+    text = f"Year = Second AND CourseCode = {code}"
+    window.memory_roster_action.setChecked(True)
+    selected, ordered = [], []
+    spy(monkeypatch, window.roster, 'select', selected)
+    spy(monkeypatch, window.roster, 'order', ordered)
+    window.filter_input.setCurrentText(QUERY_FIELD)
+    window.filter_text.setText(text)
+    window.filter_students()
+
+    model = window.student_model
+    assert selected == [({'CourseCode': code, 'Year': 'Second'}, 5001)]
+    assert model.snapshot_rows() == shown_for(db, model, text)
+
+    model.sort(STUDENT_COLUMNS.index('StudentName'), Qt.SortOrder.DescendingOrder)
+    assert [(field, descending) for _, field, descending in ordered][-1] == ('StudentName', True)
+    assert model.snapshot_rows() == shown_for(db, model, text)
+    assert len(model.snapshot_rows()) > 1
+
+
+def test_other_queries_are_left_to_the_database(window):
+    window.memory_roster_action.setChecked(True)
+    window.filter_input.setCurrentText(QUERY_FIELD)
+    assert window.search_roster("Year = Second OR Year = Third", 10) is None
+    assert window.search_roster("StudentName ~ ana AND Year = Second", 10) is None
+    assert window.search_roster("Year = Second AND Year = Third", 10) == []
+
+
+def test_an_export_is_written_in_the_order_the_grid_shows(db, window, messages, monkeypatch, qt_app, tmp_path):
+    path = str(tmp_path / 'students.csv')
+    monkeypatch.setattr(QFileDialog, 'getSaveFileName', lambda *args: (path, ''))
+    window.build_tab(window.student_tab)
+    window.filter_text.setText('an')
+    window.filter_students()
+    window.student_live_filter._pool.waitForDone()
+    qt_app.processEvents()
+    model = window.student_model
+    model.sort(STUDENT_COLUMNS.index('Year'), Qt.SortOrder.DescendingOrder)
+    window.export_students()
+    QThreadPool.globalInstance().waitForDone()
+    qt_app.processEvents()
+
+    where, params = model.filter_clause()
+    expected = db.execute(f"SELECT {', '.join(STUDENT_COLUMNS)} FROM students WHERE {where} "
+                          f"ORDER BY {model.sort_order().order_by()}", params).fetchall()
+    with open(path, newline='', encoding='utf-8') as file:
+        assert list(csv.reader(file))[1:] == [[NOT_APPLICABLE if value is None else value for value in row]
+                                              for row in expected]
+    assert messages == [f"{len(expected)} rows exported to students.csv."]
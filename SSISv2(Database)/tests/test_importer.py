@@ -0,0 +1,119 @@
+import csv
+import sqlite3
+
+import pytest
+
+from ssis.database import transaction
+from ssis.importer import import_courses, import_students
+from ssis.schema import COURSE_COLUMNS, STUDENT_COLUMNS
+from ssis.search import deferred_fts_insert, student_filter
+
+
+def write_csv(path, columns, rows):
+    with open(path, 'w', newline='', encoding='utf-8') as file:
+        writer = csv.writer(file)
+        writer.writerow(columns)
+        writer.writerows(rows)
+    return str(path)
+
+
+def course_codes(db, count):
+    return [row[0] for row in db.execute("SELECT Code FROM courses ORDER BY Code LIMIT ?", (count,))]
+
+
+def trigger_exists(db):
+    return db.execute("SELECT 1 FROM sqlite_master WHERE name = 'students_fts_insert'").fetchone() is not None
+
+
+def test_valid_rows_are_imported_and_searchable(db, tmp_path):
+    code, = course_codes(db, 1)
+    path = write_csv(tmp_path / 'students.csv', STUDENT_COLUMNS, [
+        ('2099-0001', 'Zorba Quill', 'Male', 'First', code),
+        ('2099-0002', 'Zorba Quintero', 'Female', 'Second', ''),
+        ('2099-0003', 'Zorba Quist', 'Other', 'Third', 'N/A'),
+    ])
+    report = import_students(db, path, batch_size=2)
+    assert (report.rows_read, report.inserted, report.rejected_count) == (3, 3, 0)
+    assert db.execute("SELECT CourseCode FROM students WHERE StudentID = '2099-0003'").fetchone() == (None,)
+    where, params = student_filter('Zorba Qu')
+    assert db.execute(f"SELECT count(*) FROM students WHERE {where}", params).fetchone() == (3,)
+    assert trigger_exists(db)
+
+
+def test_invalid_rows_are_rejected_with_a_reason(db, tmp_path):
+    existing = db.execute("SELECT StudentID FROM students LIMIT 1").fetchone()[0]
+    rows = [
+        ('99-1', 'Bad Id', 'Male', 'First', ''),
+        ('2099-0001', '', 'Male', 'First', ''),
+        ('2099-0002', 'Bad Gender', 'Robot', 'First', ''),
+        ('2099-0003', 'Bad Year', 'Male', 'Fifth', ''),
+        ('2099-0004', 'Bad Course', 'Male', 'First', 'NO SUCH COURSE'),
+        (existing, 'Taken', 'Male', 'First', ''),
+        ('2099-0005', 'Once', 'Male', 'First', ''),
+        ('2099-0005', 'Twice', 'Male', 'First', ''),
+    ]
+    rejects = tmp_path / 'rejects.csv'
+    report = import_students(db, write_csv(tmp_path / 'students.csv', STUDENT_COLUMNS, rows),
+                             rejects_path=str(rejects))
+    assert report.inserted == 1
+    reasons = [reason for _, _, reason in report.rejected]
+    assert len(reasons) == 7
+    assert "Unknown CourseCode 'NO SUCH COURSE'" in reasons
+    assert f"StudentID {existing} already exists" in reasons
+    assert "Duplicate StudentID 2099-0005 in file" in reasons
+    with open(rejects, newline='', encoding='utf-8') as file:
+        assert len(list(csv.reader(file))) == 8
+
+
+def test_a_course_deleted_between_batches_rejects_its_rows(db, tmp_path):
+    kept, deleted = course_codes(db, 2)
+    path = write_csv(tmp_path / 'students.csv', STUDENT_COLUMNS, [
+        ('2099-0001', 'First Batch', 'Male', 'First', deleted),
+        ('2099-0002', 'Second Batch', 'Male', 'First', deleted),
+        ('2099-0003', 'Second Batch', 'Male', 'First', kept),
+    ])
+    other = sqlite3.connect(db.database, isolation_level=None)
+    other.execute("PRAGMA foreign_keys=ON")
+
+    def delete_course(report):
+        if report.rows_read == 1:
+            other.execute("UPDATE students SET CourseCode = NULL WHERE CourseCode = ?", (deleted,))
+            other.execute("DELETE FROM courses WHERE Code = ?", (deleted,))
+
+    try:
+        report = import_students(db, path, batch_size=1, on_progress=delete_course)
+    finally:
+        other.close()
+    assert report.inserted == 2
+    assert report.rejected == [(3, ('2099-0002', 'Second Batch', 'Male', 'First', deleted),
+                                f"Unknown CourseCode {deleted!r}")]
+
+
+def test_courses_are_imported(db, tmp_path):
+    taken, = course_codes(db, 1)
+    path = write_csv(tmp_path / 'courses.csv', COURSE_COLUMNS, [('NEW1', 'New One'), ('N/A', 'Bad'), (taken, 'Dup')])
+    report = import_courses(db, path)
+    assert report.inserted == 1
+    assert db.execute("SELECT Name FROM courses WHERE Code = 'NEW1'").fetchone() == ('New One',)
+
+
+def test_a_missing_column_is_reported(db, tmp_path):
+    path = write_csv(tmp_path / 'students.csv', STUDENT_COLUMNS[:-1], [('2099-0001', 'A', 'Male', 'First')])
+    with pytest.raises(ValueError, match='CourseCode'):
+        import_students(db, path)
+
+
+def test_deferred_indexing_needs_a_transaction(db):
+    with pytest.raises(RuntimeError):
+        with deferred_fts_insert(db.connection, 'students'):
+            pass
+    assert trigger_exists(db)
+
+
+def test_deferred_indexing_restores_the_trigger_after_an_error(db):
+    with transaction(db.connection):
+        with pytest.raises(sqlite3.IntegrityError):
+            with deferred_fts_insert(db.connection, 'students'):
+                db.execute("INSERT INTO students (StudentID, StudentName) VALUES (NULL, 'x')")
+        assert trigger_exists(db)
+    assert trigger_exists(db)
@@ -0,0 +1,102 @@
+import pytest
+
+from ssis.client import RemoteDatabase, RemoteStudentRepository
+from ssis.journal import EditJournal
+from ssis.repository import EditConflict, StudentRepository
+
+
+@pytest.fixture
+def students(db, bus):
+    return StudentRepository(db, bus)
+
+
+def first_ids(db, count):
+    return [row[0] for row in db.execute("SELECT StudentID FROM students ORDER BY rowid LIMIT ?", (count,))]
+
+
+def snapshot(db):
+    return db.execute("SELECT rowid, * FROM students ORDER BY rowid").fetchall()
+
+
+def test_undo_and_redo_restore_the_rows(db, students):
+    journal = EditJournal(students)
+    before = snapshot(db)
+    updated, deleted = first_ids(db, 2)
+    journal.stage_update([updated], Year='Fourth')
+    journal.stage_delete([deleted])
+    journal.commit('edit')
+    after = snapshot(db)
+
+    journal.undo()
+    assert snapshot(db) == before
+    journal.redo()
+    assert snapshot(db) == after
+
+
+def test_undo_refuses_to_overwrite_someone_elses_update(db, students):
+    journal = EditJournal(students)
+    student_id, other = first_ids(db, 2)
+    journal.stage_update([student_id, other], Year='Fourth')
+    journal.commit('Set year')
+    students.update(student_id, 'Changed Elsewhere', *students.get(student_id)[2:])
+    changed = snapshot(db)
+
+    with pytest.raises(EditConflict) as raised:
+        journal.undo()
+
+    assert raised.value.student_ids == [student_id]
+    assert snapshot(db) == changed
+    assert journal.undo_description() == 'Set year'
+    assert journal.redo_description() is None
+
+
+def test_undo_refuses_to_bring_back_a_student_someone_added_again(db, students):
+    journal = EditJournal(students)
+    student_id, = first_ids(db, 1)
+    journal.stage_delete([student_id])
+    journal.commit('Delete')
+    students.add(student_id, 'Someone New', 'Female', 'First')
+
+    with pytest.raises(EditConflict):
+        journal.undo()
+    assert students.get(student_id)[1] == 'Someone New'
+    assert journal.undo_description() == 'Delete'
+
+
+def test_redo_refuses_to_overwrite_someone_elses_update(db, students):
+    journal = EditJournal(students)
+    student_id, = first_ids(db, 1)
+    gender = 'Other' if students.get(student_id)[2] != 'Other' else 'Female'
+    journal.stage_update([student_id], Gender=gender)
+    journal.commit('Set gender')
+    undone = journal.undo()
+    students.delete(student_id)
+
+    with pytest.raises(EditConflict):
+        journal.redo()
+    assert students.get(student_id) is None
+    assert journal.redo_description() == 'Set gender'
+
+    # Once the student is back as the undo left it, the redo goes through.
+    students.write({student_id: undone.before[student_id]})
+    journal.redo()
+    assert students.get(student_id)[2] == gender
+
+
+def test_conflicts_are_reported_through_the_server(db, students, server_url):
+    remote = RemoteDatabase(server_url)
+    try:
+        journal = EditJournal(RemoteStudentRepository(remote))
+        student_id, = first_ids(db, 1)
+        journal.stage_update([student_id], Year='Fourth')
+        journal.commit('Set year')
+        students.update(student_id, 'Changed Elsewhere', *students.get(student_id)[2:])
+
+        with pytest.raises(EditConflict) as raised:
+            journal.undo()
+        assert raised.value.student_ids == [student_id]
+        assert students.get(student_id)[1] == 'Changed Elsewhere'
+        assert students.get(student_id)[3] == 'Fourth'
+        assert journal.undo_description() == 'Set year'
+    finally:
+        remote.close()
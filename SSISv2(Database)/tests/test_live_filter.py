@@ -0,0 +1,95 @@
+import threading
+
+import pytest
+
+pytest.importorskip('PyQt6')
+
+from PyQt6.QtCore import QObject, QRunnable, pyqtSignal  # noqa: E402
+
+from ssis.live_filter import LiveFilter, QueryWorker  # noqa: E402
+from ssis.schema import STUDENT_COLUMNS  # noqa: E402
+from ssis.search import row_matcher, student_filter  # noqa: E402
+from ssis.table_models import PagedTableModel  # noqa: E402
+
+pytestmark = pytest.mark.usefixtures('qt_app')
+
+
+class LineEdit(QObject):
+    """The part of a QLineEdit that LiveFilter uses, without needing widgets."""
+
+    textChanged = pyqtSignal(str)
+
+    def __init__(self):
+        super().__init__()
+        self._text = ''
+
+    def setText(self, text):
+        self._text = text
+        self.textChanged.emit(text)
+
+    def text(self):
+        return self._text
+
+
+class CountingReader:
+    def __init__(self, connection):
+        self.connection = connection
+        self.queries = []
+
+    def execute(self, sql, params=()):
+        self.queries.append(params)
+        return self.connection.execute(sql, params)
+
+    def interrupt(self):
+        self.connection.interrupt()
+
+    def close(self):
+        self.connection.close()
+
+
+class Blocker(QRunnable):
+    def __init__(self):
+        super().__init__()
+        self.release = threading.Event()
+
+    def run(self):
+        self.release.wait(10)
+
+
+def make_filter(text):
+    where, params = student_filter(text)
+    return where, params, row_matcher(text, STUDENT_COLUMNS)
+
+
+def test_a_worker_for_an_older_filter_does_not_query(db):
+    reader = CountingReader(db.reader())
+    worker = QueryWorker(1, lambda: 2, reader, "SELECT 1", (), 1)
+    interrupted = []
+    worker.signals.interrupted.connect(interrupted.append)
+    worker.run()
+    assert interrupted == [1]
+    assert reader.queries == []
+    reader.close()
+
+
+def test_only_the_latest_of_queued_filters_runs(db, qt_app):
+    model = PagedTableModel(db.connection, 'students', STUDENT_COLUMNS)
+    line_edit = LineEdit()
+    reader = CountingReader(db.reader())
+    live = LiveFilter(model, line_edit, lambda: reader, make_filter)
+    blocker = Blocker()
+    live._pool.start(blocker)
+    try:
+        for text in ('an', 'ana', 'anat', 'ana'):
+            line_edit.setText(text)
+            live.apply()
+    finally:
+        blocker.release.set()
+    live._pool.waitForDone()
+    qt_app.processEvents()
+
+    assert reader.queries == [(*student_filter('ana')[1], 5001)]
+    where, params = student_filter('ana')
+    expected = db.execute(f"SELECT count(*) FROM students WHERE {where}", params).fetchone()[0]
+    assert model.rowCount() == expected
+    live.shutdown()
@@ -0,0 +1,67 @@
+import threading
+
+import pytest
+
+pytest.importorskip('PyQt6')
+
+from PyQt6.QtCore import QRunnable  # noqa: E402
+from PyQt6.QtWidgets import QLineEdit  # noqa: E402
+
+from ssis.live_validation import LiveValidator  # noqa: E402
+from ssis.validation import ERROR  # noqa: E402
+
+pytestmark = pytest.mark.usefixtures('qt_app')
+
+
+class Blocker(QRunnable):
+    def __init__(self):
+        super().__init__()
+        self.release = threading.Event()
+
+    def run(self):
+        self.release.wait(10)
+
+
+@pytest.fixture
+def validator(db):
+    live = LiveValidator(QLineEdit(), QLineEdit(), db.reader)
+    yield live
+    live.shutdown()
+
+
+def results(validator, qt_app):
+    validator._pool.waitForDone()
+    qt_app.processEvents()
+
+
+def test_only_the_latest_text_is_reported(db, validator, qt_app):
+    taken = db.execute("SELECT StudentID FROM students LIMIT 1").fetchone()[0]
+    reported = []
+    validator.validated.connect(reported.append)
+    blocker = Blocker()
+    validator._pool.start(blocker)
+    try:
+        for student_id in ('99', taken, '2099-0001'):
+            validator.id_edit.setText(student_id)
+            validator.apply()
+    finally:
+        blocker.release.set()
+    results(validator, qt_app)
+    assert reported == [[]]
+
+    validator.id_edit.setText(taken)
+    validator.apply()
+    results(validator, qt_app)
+    assert [(issue.field, issue.level) for issue in reported[-1]] == [('StudentID', ERROR)]
+
+
+def test_typing_is_checked_after_a_pause(validator, qt_app):
+    reported = []
+    validator.validated.connect(reported.append)
+    validator.id_edit.setText('99-1')
+    validator.name_edit.setText('Zorba Quill')
+    assert validator._timer.isActive() and reported == []
+    validator._timer.timeout.emit()
+    assert not validator._timer.isActive()
+    results(validator, qt_app)
+    assert [issue.field for issue in reported[0]] == ['StudentID']
@@ -0,0 +1,85 @@
+import os
+import sqlite3
+
+import pytest
+
+from ssis import maintenance
+from ssis.repository import StudentRepository
+
+
+def contents(connection):
+    return connection.execute("SELECT rowid, * FROM students ORDER BY rowid").fetchall()
+
+
+def test_a_backup_is_a_checked_copy_of_the_database(db, tmp_path):
+    path = str(tmp_path / 'backup.db')
+    progress = []
+    pages = maintenance.backup(db.database, path, pages=4, on_progress=lambda copied, total: progress.append(copied))
+    assert pages == progress[-1] and len(progress) > 1
+    assert not os.path.exists(path + '.partial')
+    copy = sqlite3.connect(path)
+    try:
+        assert contents(copy) == contents(db)
+        assert copy.execute("PRAGMA journal_mode").fetchone() == ('delete',)
+    finally:
+        copy.close()
+
+
+def test_a_backup_copies_the_database_as_it_was_when_it_began(db, tmp_path):
+    path = str(tmp_path / 'backup.db')
+    before = contents(db)
+    students = StudentRepository(db)
+
+    def write(copied, total):
+        if copied < total:
+            students.add(f"2099-{copied:04d}", 'Written Meanwhile', 'Male', 'First')
+
+    maintenance.backup(db.database, path, pages=1, on_progress=write)
+    copy = sqlite3.connect(path)
+    try:
+        assert contents(copy) == before
+    finally:
+        copy.close()
+    assert len(contents(db)) > len(before)
+
+
+def test_a_cancelled_backup_leaves_no_file(db, tmp_path):
+    directory = tmp_path / 'backups'
+    directory.mkdir()
+    with pytest.raises(maintenance.BackupCancelled):
+        maintenance.backup(db.database, str(directory / 'backup.db'), pages=1, is_cancelled=lambda: True)
+    assert os.listdir(directory) == []
+
+
+def test_a_snapshot_is_restored_and_old_ones_pruned(db):
+    before = contents(db)
+    full = maintenance.snapshot(db.database, keep=None)
+    db.execute("DELETE FROM students WHERE rowid % 2 = 0")
+    halved = maintenance.snapshot(db.database, keep=None)
+    assert maintenance.snapshots(db.database) == [full, halved]
+
+    maintenance.restore(db.connection, full)
+    assert contents(db) == before
+    latest = maintenance.snapshot(db.database, keep=1)
+    assert maintenance.snapshots(db.database) == [latest]
+
+
+def test_a_damaged_file_is_not_restored(db, tmp_path):
+    path = tmp_path / 'damaged.db'
+    path.write_bytes(b'not a database' * 100)
+    before = contents(db)
+    with pytest.raises(sqlite3.DatabaseError):
+        maintenance.restore(db.connection, str(path))
+    assert contents(db) == before
+
+
+def test_maintain_releases_free_pages_and_records_the_run(db):
+    assert maintenance.is_due(db.connection)
+    report = maintenance.maintain(db.database, full=True)
+    assert report.vacuumed and report.incremental
+    db.execute("UPDATE students SET StudentName = StudentName || printf('%.2000c', 'x')")
+    db.execute("UPDATE students SET StudentName = substr(StudentName, 1, 20)")
+    report = maintenance.maintain(db.database)
+    assert report.pages_after < report.pages_before and report.freed_bytes > 0
+    assert maintenance.last_run(db.connection) is not None
+    assert not maintenance.is_due(db.connection)
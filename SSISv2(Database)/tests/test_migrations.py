@@ -0,0 +1,192 @@
+import os
+import shutil
+import sqlite3
+
+import pytest
+
+from ssis import schema, statistics
+from ssis.database import Database, connect, transaction
+from ssis.schema import MIGRATIONS, SCHEMA_VERSION
+from ssis.search import student_filter
+
+
+def _legacy_rows(directory, table):
+    database = 'Student_Table.db' if table == 'students' else 'Course_Table.db'
+    connection = sqlite3.connect(os.path.join(directory, database))
+    try:
+        return connection.execute(f"SELECT * FROM {table} ORDER BY rowid").fetchall()
+    finally:
+        connection.close()
+
+
+def _write_legacy(directory, students, courses):
+    for database, table, columns, rows in (
+            ('Student_Table.db', 'students', 'StudentID TEXT, StudentName TEXT, Gender TEXT, Year TEXT, CourseCode TEXT',
+             students),
+            ('Course_Table.db', 'courses', 'Code TEXT, Name TEXT', courses)):
+        connection = sqlite3.connect(os.path.join(directory, database))
+        connection.execute(f"CREATE TABLE {table} ({columns})")
+        connection.executemany(f"INSERT INTO {table} VALUES ({', '.join('?' * len(rows[0]))})", rows)
+        connection.commit()
+        connection.close()
+
+
+def _migrate_to(directory, version):
+    """Run the first ``version`` migrations only, as an older release of the application did."""
+    connection = connect(os.path.join(directory, 'Student_Table.db'))
+    connection.execute("ATTACH DATABASE ? AS legacy", (os.path.join(directory, 'Course_Table.db'),))
+    connection.execute("PRAGMA foreign_keys=OFF")
+    with transaction(connection):
+        for migration in MIGRATIONS[:version]:
+            migration(connection)
+        connection.execute(f"PRAGMA user_version={version}")
+    connection.execute("PRAGMA foreign_keys=ON")
+    connection.execute("DETACH DATABASE legacy")
+    connection.close()
+
+
+def _contents(db):
+    return {
+        'schema': db.execute("SELECT type, name, tbl_name, sql FROM sqlite_master ORDER BY type, name").fetchall(),
+        'students': db.execute("SELECT rowid, * FROM students ORDER BY rowid").fetchall(),
+        'courses': db.execute("SELECT rowid, * FROM courses ORDER BY rowid").fetchall(),
+        'counts': db.execute("SELECT * FROM enrolment_counts ORDER BY 1, 2, 3").fetchall(),
+        'change_log': db.execute("SELECT count(*) FROM change_log").fetchone()[0],
+    }
+
+
+def test_shipped_legacy_files_migrate_to_the_current_schema(legacy_dir):
+    legacy_students = _legacy_rows(legacy_dir, 'students')
+    legacy_courses = _legacy_rows(legacy_dir, 'courses')
+
+    db = Database(legacy_dir)
+    try:
+        assert db.execute("PRAGMA user_version").fetchone()[0] == SCHEMA_VERSION
+        assert db.execute("SELECT * FROM students ORDER BY rowid").fetchall() == legacy_students
+        assert db.execute("SELECT * FROM courses ORDER BY rowid").fetchall() == legacy_courses
+        assert db.execute("PRAGMA foreign_key_check").fetchall() == []
+        assert db.execute("PRAGMA integrity_check").fetchone()[0] == 'ok'
+        db.execute("INSERT INTO students_fts (students_fts) VALUES ('integrity-check')")
+        db.execute("INSERT INTO courses_fts (courses_fts) VALUES ('integrity-check')")
+        assert statistics.stale_counts(db.connection) == []
+        assert statistics.total(db.connection) == len(legacy_students)
+        # The data copied in by the migration is the starting point, not a change.
+        assert db.execute("SELECT count(*) FROM change_log").fetchone()[0] == 0
+    finally:
+        db.close()
+
+
+def test_legacy_quirks_are_cleaned_up(tmp_path):
+    _write_legacy(tmp_path, [
+        ('2020-0001', 'Ana Reyes', 'Female', 'First', 'BSCS'),
+        ('2020-0001', 'Duplicate', 'Male', 'Second', 'BSCS'),
+        ('2020-0002', None, 'Male', 'Third', 'N/A'),
+        ('2020-0003', 'Ben Cruz', 'Male', 'Fourth', ''),
+        ('2020-0004', 'Carla Lim', 'Other', 'First', 'ZZZ'),
+        (None, 'No ID', 'Female', 'First', 'BSCS'),
+    ], [
+        ('BSCS', 'BS COMPUTER SCIENCE'),
+        ('BSCS', 'Duplicate'),
+        ('N/A', 'Placeholder'),
+        ('', 'Empty'),
+        ('BSIT', None),
+    ])
+
+    db = Database(str(tmp_path))
+    try:
+        assert db.execute("SELECT * FROM students ORDER BY rowid").fetchall() == [
+            ('2020-0001', 'Ana Reyes', 'Female', 'First', 'BSCS'),
+            ('2020-0002', '', 'Male', 'Third', None),
+            ('2020-0003', 'Ben Cruz', 'Male', 'Fourth', None),
+            ('2020-0004', 'Carla Lim', 'Other', 'First', 'ZZZ'),
+        ]
+        assert db.execute("SELECT * FROM courses ORDER BY Code").fetchall() == [
+            ('BSCS', 'BS COMPUTER SCIENCE'),
+            ('BSIT', 'BSIT'),
+            ('ZZZ', 'ZZZ'),
+        ]
+        assert db.execute("PRAGMA foreign_key_check").fetchall() == []
+        with pytest.raises(sqlite3.IntegrityError):
+            db.execute("INSERT INTO students (StudentID, StudentName) VALUES ('2020-0001', 'Again')")
+    finally:
+        db.close()
+
+
+def test_legacy_spellings_of_gender_and_year_are_normalised(tmp_path):
+    _write_legacy(tmp_path, [
+        ('2020-0001', 'Ana Reyes', 'female', '1st', 'BSCS'),
+        ('2020-0002', 'Ben Cruz', ' MALE ', '2', 'BSCS'),
+        ('2020-0003', 'Carla Lim', 'F', 'third', 'BSCS'),
+        ('2020-0004', 'Dan Uy', 'Male', 'Senior', None),
+        ('2020-0005', 'Eva Sy', None, 'Fourth', None),
+    ], [('BSCS', 'BS COMPUTER SCIENCE')])
+
+    db = Database(str(tmp_path))
+    try:
+        assert db.execute("SELECT StudentID, Gender, Year FROM students ORDER BY rowid").fetchall() == [
+            ('2020-0001', 'Female', 'First'),
+            ('2020-0002', 'Male', 'Second'),
+            ('2020-0003', 'Female', 'Third'),
+            ('2020-0004', 'Male', 'Senior'),
+            ('2020-0005', None, 'Fourth'),
+        ]
+        where, params = student_filter('male', 'Gender')
+        assert db.execute(f"SELECT count(*) FROM students WHERE {where}", params).fetchone() == (4,)
+        assert statistics.stale_counts(db.connection) == []
+    finally:
+        db.close()
+
+
+@pytest.mark.parametrize('version', range(1, SCHEMA_VERSION))
+def test_upgrading_from_any_version_matches_a_fresh_migration(tmp_path, roster_dir, version):
+    older = tmp_path / 'older'
+    older.mkdir()
+    for name in ('Student_Table.db', 'Course_Table.db'):
+        shutil.copy(os.path.join(roster_dir, name), older / name)
+    _migrate_to(str(older), version)
+
+    fresh = Database(roster_dir)
+    try:
+        expected = _contents(fresh)
+    finally:
+        fresh.close()
+
+    upgraded = Database(str(older))
+    try:
+        assert upgraded.execute("PRAGMA user_version").fetchone()[0] == SCHEMA_VERSION
+        assert _contents(upgraded) == expected
+    finally:
+        upgraded.close()
+
+
+def test_reopening_a_current_database_changes_nothing(legacy_dir):
+    first = Database(legacy_dir)
+    try:
+        before = _contents(first)
+    finally:
+        first.close()
+    again = Database(legacy_dir)
+    try:
+        assert _contents(again) == before
+    finally:
+        again.close()
+
+
+def test_a_failed_migration_leaves_the_legacy_files_as_they_were(legacy_dir, monkeypatch):
+    legacy_students = _legacy_rows(legacy_dir, 'students')
+
+    def fail(connection):
+        raise RuntimeError("interrupted")
+
+    monkeypatch.setattr(schema, 'MIGRATIONS', [*MIGRATIONS[:-1], fail])
+    with pytest.raises(RuntimeError):
+        Database(legacy_dir)
+
+    connection = sqlite3.connect(os.path.join(legacy_dir, 'Student_Table.db'))
+    try:
+        assert connection.execute("PRAGMA user_version").fetchone()[0] == 0
+        assert [row[0] for row in connection.execute("SELECT name FROM sqlite_master WHERE type = 'table'")] \
+            == ['students']
+    finally:
+        connection.close()
+    assert _legacy_rows(legacy_dir, 'students') == legacy_students
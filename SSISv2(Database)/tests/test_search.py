@@ -0,0 +1,74 @@
+import pytest
+
+from ssis.schema import COURSE_COLUMNS, STUDENT_COLUMNS
+from ssis.search import course_filter, search_courses, search_students, student_filter
+
+TEXTS = ['a', 'an', 'ana', 'Reyes', 'ale', 'male', 'Sec', '2024-', 'nothing at all', 'O"Neil', "d'Arc"]
+
+
+def contains(text, columns, field):
+    """Whether a row of ``columns`` values has ``text`` in ``field``, or in any column for 'All'."""
+    needle = text.casefold()
+    positions = range(len(columns)) if field == 'All' else (columns.index(field),)
+    return lambda row: any(row[i] is not None and needle in row[i].casefold() for i in positions)
+
+
+def matching(db, table, columns, where, params):
+    return db.execute(f"SELECT {', '.join(columns)} FROM {table} WHERE {where} ORDER BY rowid", params).fetchall()
+
+
+def scanned(db, table, columns, matches):
+    rows = db.execute(f"SELECT {', '.join(columns)} FROM {table} ORDER BY rowid").fetchall()
+    return [row for row in rows if matches(row)]
+
+
+@pytest.mark.parametrize('field', ['All', *STUDENT_COLUMNS])
+@pytest.mark.parametrize('text', TEXTS)
+def test_student_filter_agrees_with_a_substring_scan(db, field, text):
+    where, params = student_filter(text, field)
+    assert matching(db, 'students', STUDENT_COLUMNS, where, params) \
+        == scanned(db, 'students', STUDENT_COLUMNS, contains(text, STUDENT_COLUMNS, field))
+
+
+@pytest.mark.parametrize('field', COURSE_COLUMNS)
+@pytest.mark.parametrize('text', TEXTS)
+def test_course_filter_agrees_with_a_substring_scan(db, field, text):
+    where, params = course_filter(text, field)
+    assert matching(db, 'courses', COURSE_COLUMNS, where, params) \
+        == scanned(db, 'courses', COURSE_COLUMNS, contains(text, COURSE_COLUMNS, field))
+
+
+def test_the_index_follows_writes(db):
+    db.execute("INSERT INTO students VALUES ('2099-0001', 'Zorba Quill', 'Male', 'First', NULL)")
+    where, params = student_filter('Zorba')
+    assert len(matching(db, 'students', STUDENT_COLUMNS, where, params)) == 1
+    db.execute("UPDATE students SET StudentName = 'Yuri Quill' WHERE StudentID = '2099-0001'")
+    assert matching(db, 'students', STUDENT_COLUMNS, where, params) == []
+    db.execute("DELETE FROM students WHERE StudentID = '2099-0001'")
+    where, params = student_filter('Yuri Quill')
+    assert matching(db, 'students', STUDENT_COLUMNS, where, params) == []
+
+
+def test_a_course_rename_reaches_the_student_index(db):
+    code = db.execute("SELECT CourseCode FROM students WHERE CourseCode IS NOT NULL LIMIT 1").fetchone()[0]
+    enrolled = db.execute("SELECT count(*) FROM students WHERE CourseCode = ?", (code,)).fetchone()[0]
+    db.execute("UPDATE courses SET Code = 'RENAMED' WHERE Code = ?", (code,))
+    where, params = student_filter('RENAMED', 'CourseCode')
+    assert len(matching(db, 'students', STUDENT_COLUMNS, where, params)) == enrolled
+    where, params = course_filter('RENAMED')
+    assert len(matching(db, 'courses', COURSE_COLUMNS, where, params)) == 1
+
+
+def test_an_unknown_field_is_refused():
+    with pytest.raises(ValueError):
+        student_filter('ana', 'Age')
+    with pytest.raises(ValueError):
+        course_filter('ana', 'Dean')
+
+
+def test_search_finds_the_closest_match_first(db):
+    db.execute("INSERT INTO students VALUES ('2099-0001', 'Zorba Quill', 'Male', 'First', NULL)")
+    assert search_students(db.connection, 'Zorba Quill')[0][0] == '2099-0001'
+    assert len(search_students(db.connection, 'a', limit=7)) == 7
+    code, name = db.execute("SELECT Code, Name FROM courses LIMIT 1").fetchone()
+    assert (code, name) in search_courses(db.connection, name)
@@ -0,0 +1,256 @@
+import socket
+import sqlite3
+from urllib.parse import urlsplit
+
+import pytest
+
+from ssis import client, events
+from ssis.client import RemoteDatabase, RemoteStudentRepository
+from ssis.importer import import_students
+from ssis.repository import ChangeLogRepository, CourseRepository, StudentRepository
+from ssis.search import student_filter
+
+REFUSED = [
+    "PRAGMA query_only=OFF",
+    "PRAGMA writable_schema=ON",
+    "DELETE FROM students",
+    "UPDATE students SET StudentName = 'x'",
+    "INSERT INTO courses VALUES ('X', 'X')",
+    "ATTACH DATABASE ':memory:' AS other",
+    "CREATE TEMP TABLE scratch (x)",
+    "INSERT INTO students_fts (students_fts) VALUES ('optimize')",
+    "SELECT * FROM pragma_table_info('students')",
+]
+
+
+@pytest.fixture
+def remote(server_url):
+    database = RemoteDatabase(server_url)
+    yield database
+    database.close()
+
+
+def listen(bus, table):
+    published = []
+    bus.subscribe(table, lambda change, rowid: published.append((change, rowid)))
+    return published
+
+
+def count(connection):
+    return connection.execute("SELECT count(*) FROM students").fetchone()[0]
+
+
+@pytest.mark.parametrize('sql', REFUSED)
+def test_a_reader_refuses_anything_but_a_query(db, sql):
+    reader = db.reader()
+    try:
+        with pytest.raises(sqlite3.DatabaseError):
+            reader.execute(sql).fetchall()
+    finally:
+        reader.close()
+
+
+def test_a_reader_runs_the_queries_the_application_sends(db):
+    where, params = student_filter('ana')
+    reader = db.reader()
+    try:
+        assert reader.execute(f"SELECT StudentID FROM students WHERE {where} ORDER BY rowid", params).fetchall() \
+            == db.execute(f"SELECT StudentID FROM students WHERE {where} ORDER BY rowid", params).fetchall()
+        assert reader.execute("SELECT count(*) FROM json_each(?)", ('[1, 2]',)).fetchone() == (2,)
+        assert reader.execute("EXPLAIN QUERY PLAN SELECT * FROM students WHERE Year = 'First'").fetchall()
+        assert reader.execute("SELECT * FROM enrolment_counts").fetchall() \
+            == db.execute("SELECT * FROM enrolment_counts").fetchall()
+    finally:
+        reader.close()
+
+
+@pytest.mark.parametrize('sql', REFUSED)
+def test_query_cannot_change_the_database(db, remote, sql):
+    before = count(db)
+    with pytest.raises(sqlite3.DatabaseError):
+        remote.execute(sql).fetchall()
+    # The same reader, asked again, still refuses to write.
+    with pytest.raises(sqlite3.DatabaseError):
+        remote.execute("DELETE FROM students").fetchall()
+    assert count(db) == before
+    assert count(remote) == before
+
+
+@pytest.mark.parametrize('sql', [
+    "SELECT StudentID, StudentName FROM students ORDER BY StudentName, StudentID",
+    "WITH named AS (SELECT StudentID, StudentName FROM students WHERE StudentName LIKE ?) "
+    "SELECT * FROM named ORDER BY StudentID DESC;",
+    "EXPLAIN QUERY PLAN SELECT * FROM students WHERE Year = 'First'",
+])
+def test_fetchmany_reads_a_bounded_batch_at_a_time(db, remote, monkeypatch, sql):
+    monkeypatch.setattr(client, 'FETCH_ROWS', 40)
+    params = ('%a%',) if '?' in sql else ()
+    expected = db.execute(sql, params).fetchall()
+    limits = []
+    request = remote.connection.request
+    monkeypatch.setattr(remote.connection, 'request',
+                        lambda method, path, body=None, *args: limits.append(body['limit']) or request(
+                            method, path, body, *args))
+    cursor = remote.execute(sql, params)
+    rows = cursor.fetchmany(3)
+    while True:
+        batch = cursor.fetchmany(25)
+        if not batch:
+            break
+        rows.extend(batch)
+    assert rows == expected
+    # The first batch asks for the rows wanted, the others for FETCH_ROWS, never for everything.
+    assert limits[0] == 3 and set(limits[1:]) <= {40}
+
+
+def test_a_cursor_reads_one_snapshot_while_others_write(db, remote, monkeypatch):
+    monkeypatch.setattr(client, 'FETCH_ROWS', 40)
+    sql = "SELECT rowid, StudentID FROM students ORDER BY rowid"
+    expected = db.execute(sql).fetchall()
+    cursor = remote.execute(sql)
+    rows = cursor.fetchmany(50)
+    students = StudentRepository(db)
+    for _, student_id in rows[:10]:
+        students.delete(student_id)
+    students.add('2099-0001', 'Ana Test', 'Female', 'First')
+    while True:
+        batch = cursor.fetchmany(25)
+        if not batch:
+            break
+        rows.extend(batch)
+    assert rows == expected
+    assert remote.execute(sql).fetchall() == db.execute(sql).fetchall()
+
+
+def test_a_query_cursor_is_kept_until_read_or_closed(remote):
+    assert remote.connection.request('POST', '/query', {'sql': "SELECT 1", 'limit': 1}) == {
+        'rows': [[1]], 'cursor': None}
+    answer = remote.connection.request('POST', '/query', {'sql': "SELECT StudentID FROM students", 'limit': 5})
+    assert len(answer['rows']) == 5 and answer['cursor'] is not None
+    path = f"/query/{answer['cursor']}"
+    assert len(remote.connection.request('POST', path, {'limit': 5})['rows']) == 5
+    remote.connection.request('DELETE', path)
+    with pytest.raises(client.RemoteError, match='closed or timed out'):
+        remote.connection.request('POST', path, {'limit': 5})
+
+
+def send_raw(server_url, data):
+    """Send ``data`` to the server as it is and return the status line of its answer."""
+    parts = urlsplit(server_url)
+    with socket.create_connection((parts.hostname, parts.port), timeout=10) as connection:
+        connection.sendall(data)
+        with connection.makefile('rb') as answer:
+            return answer.readline().decode('latin-1').strip()
+
+
+@pytest.mark.parametrize('request_bytes, status', [
+    (b"GET /" + b"x" * 70000 + b" HTTP/1.1\r\n\r\n", '400'),
+    (b"GET /status HTTP/1.1\r\nX-Long: " + b"x" * 70000 + b"\r\n\r\n", '400'),
+    (b"POST /query HTTP/1.1\r\nContent-Length: -1\r\n\r\n", '400'),
+    (b"POST /query HTTP/1.1\r\nContent-Length: ten\r\n\r\n", '400'),
+    (b"POST /query HTTP/1.1\r\nContent-Length: 99999999999\r\n\r\n", '413'),
+    (b"GET /status HTTP/1.1\r\nno colon here\r\n\r\n", '400'),
+    (b"GET\r\n\r\n", '400'),
+])
+def test_malformed_requests_are_answered_with_an_error(remote, server_url, request_bytes, status):
+    assert send_raw(server_url, request_bytes).split()[1] == status
+    # The server goes on serving.
+    assert remote.connection.request('GET', '/status')['writes'] == 0
+
+
+@pytest.mark.parametrize('token', ['', 'wrong-token'])
+def test_requests_without_the_token_are_refused(db, server_url, token):
+    before = count(db)
+    student_id = db.execute("SELECT StudentID FROM students").fetchone()[0]
+    stranger = client.RemoteConnection(server_url, token=token)
+    try:
+        for method, path, body in (('GET', '/status', None), ('POST', '/query', {'sql': "SELECT 1"}),
+                                   ('DELETE', f'/students/{student_id}', None)):
+            with pytest.raises(client.RemoteError, match='Authorization'):
+                stranger.request(method, path, body)
+    finally:
+        stranger.close()
+    assert count(db) == before
+
+
+def test_writes_are_logged_with_the_address_they_came_from(db, remote):
+    student_id = db.execute("SELECT StudentID FROM students").fetchone()[0]
+    remote.connection.actor = 'ana'
+    RemoteStudentRepository(remote).delete(student_id)
+    assert db.execute("SELECT Actor FROM change_log WHERE OldKey = ?", (student_id,)).fetchone() == ('ana@127.0.0.1',)
+
+
+def test_a_file_is_streamed_to_the_server_to_import(db, remote, monkeypatch, tmp_path):
+    path = tmp_path / 'students.csv'
+    # Several BODY_CHUNK_SIZE pieces, with one row refused.
+    rows = [f"1999-{number:04d},Streamed Student {number},Female,First,\n" for number in range(3000)]
+    path.write_text("StudentID,StudentName,Gender,Year,CourseCode\n" + ''.join(rows) + "99-1,Bad Id,Male,First,\n")
+    sent = []
+    request = remote.connection.request
+    monkeypatch.setattr(remote.connection, 'request',
+                        lambda method, path, body=None, *args, **kwargs: sent.append(body) or request(
+                            method, path, body, *args, **kwargs))
+    report = RemoteStudentRepository(remote).import_file(str(path))
+    # Sent from the open file, not read into memory first.
+    assert not isinstance(sent[0], bytes)
+    assert (report.rows_read, report.inserted, report.rejected_count) == (3001, 3000, 1)
+    assert db.execute("SELECT count(*) FROM students WHERE StudentName LIKE 'Streamed Student %'").fetchone() == (3000,)
+
+
+def test_sync_publishes_what_any_writer_committed(db, server_url, bus):
+    remote = RemoteDatabase(server_url, bus)
+    published = listen(bus, 'students')
+    try:
+        students = StudentRepository(db)
+        students.add('2099-0001', 'Ana Test', 'Female', 'First')
+        rowid = db.execute("SELECT rowid FROM students WHERE StudentID = '2099-0001'").fetchone()[0]
+        RemoteStudentRepository(remote).delete('2099-0001')
+        assert published == [(events.INSERT, rowid), (events.DELETE, rowid)]
+        assert remote.sync() == 0
+    finally:
+        remote.close()
+
+
+def test_sync_publishes_many_changes_as_one(db, server_url, bus):
+    remote = RemoteDatabase(server_url, bus)
+    published = listen(bus, 'students')
+    try:
+        db.execute("UPDATE students SET StudentName = StudentName || ' A'")
+        db.execute("UPDATE students SET StudentName = StudentName || ' B'")
+        assert remote.sync() == 2 * count(db)
+        assert published == [(events.UPDATE_MANY, None)]
+    finally:
+        remote.close()
+
+
+def test_sync_after_the_log_was_truncated_resets(db, server_url, bus):
+    remote = RemoteDatabase(server_url, bus)
+    published = listen(bus, 'students')
+    try:
+        students = StudentRepository(db)
+        students.add('2099-0001', 'Ana Test', 'Female', 'First')
+        students.add('2099-0002', 'Ben Test', 'Male', 'First')
+        changes = ChangeLogRepository(db)
+        changes.truncate(changes.last())
+        remote.sync()
+        assert published == [(events.RESET, None)]
+        # From there it goes on as before.
+        rowid = db.execute("SELECT rowid FROM students WHERE StudentID = '2099-0002'").fetchone()[0]
+        students.delete('2099-0002')
+        assert remote.sync() == 1
+        assert published[1:] == [(events.DELETE, rowid)]
+    finally:
+        remote.close()
+
+
+def test_writing_to_a_remote_database_directly_is_refused(db, remote, tmp_path):
+    before = count(db)
+    path = tmp_path / 'students.csv'
+    path.write_text("StudentID,StudentName,Gender,Year,CourseCode\n2099-0001,Ana Test,Female,First,\n")
+    with pytest.raises(client.RemoteError, match='through the server'):
+        StudentRepository(remote).add('2099-0001', 'Ana Test', 'Female', 'First')
+    with pytest.raises(client.RemoteError, match='through the server'):
+        CourseRepository(remote).delete(db.execute("SELECT Code FROM courses").fetchone()[0])
+    with pytest.raises(client.RemoteError, match='through the server'):
+        import_students(remote, str(path))
+    assert count(db) == before
@@ -0,0 +1,46 @@
+import pytest
+
+from ssis.schema import COURSE_COLUMNS, STUDENT_COLUMNS
+from ssis.sorting import COURSE_SORT_KEYS, STUDENT_SORT_KEYS, SortOrder
+
+ORDERS = [('students', STUDENT_COLUMNS, field) for field in (None, *STUDENT_SORT_KEYS)] + \
+         [('courses', COURSE_COLUMNS, field) for field in COURSE_SORT_KEYS]
+
+
+@pytest.fixture
+def table_rows(db):
+    # Rows from before the unified schema may lack a Gender or Year.
+    db.execute("UPDATE students SET Gender = NULL WHERE rowid % 7 = 0")
+    db.execute("UPDATE students SET Year = NULL WHERE rowid % 5 = 0")
+
+    def read(columns, order, condition='1', params=()):
+        return db.execute(f"SELECT rowid, {', '.join(columns)} FROM {order.table} WHERE {condition} "
+                          f"ORDER BY {order.order_by()}", params).fetchall()
+    return read
+
+
+@pytest.mark.parametrize('descending', [False, True])
+@pytest.mark.parametrize('table, columns, field', ORDERS)
+def test_python_keys_agree_with_the_sql_order(table_rows, table, columns, field, descending):
+    order = SortOrder(table, list(columns), field, descending)
+    rows = table_rows(columns, order)
+    assert sorted(rows, key=lambda row: order.position(order.key(row))) == rows
+    # Every row has a key of its own, so a page can seek past the last one shown.
+    assert len({order.key(row) for row in rows}) == len(rows)
+
+
+@pytest.mark.parametrize('descending', [False, True])
+@pytest.mark.parametrize('table, columns, field', ORDERS)
+def test_keyset_conditions_select_the_rows_past_and_between_keys(table_rows, table, columns, field, descending):
+    order = SortOrder(table, list(columns), field, descending)
+    rows = table_rows(columns, order)
+    start, end = len(rows) // 3, 2 * len(rows) // 3
+    assert table_rows(columns, order, *order.after(order.key(rows[start]))) == rows[start + 1:]
+    assert table_rows(columns, order, *order.between(order.key(rows[start]), order.key(rows[end]))) \
+        == rows[start:end + 1]
+
+
+def test_only_columns_with_a_sort_index_are_sortable():
+    assert SortOrder.sortable('students', 'StudentName')
+    assert not SortOrder.sortable('students', 'rowid')
+    assert not SortOrder.sortable('grades', 'StudentID')
@@ -0,0 +1,54 @@
+import pytest
+
+from ssis import statistics
+from ssis.repository import CourseRepository, StudentRepository
+
+
+@pytest.fixture
+def students(db):
+    return StudentRepository(db)
+
+
+def counted(db, field):
+    return db.execute(f"SELECT {field}, count(*) FROM students GROUP BY 1 ORDER BY ifnull({field}, '')").fetchall()
+
+
+def assert_current(db):
+    assert statistics.stale_counts(db.connection) == []
+    for field in statistics.FIELDS:
+        assert statistics.counts(db.connection, field) == counted(db, field)
+    assert statistics.total(db.connection) == db.execute("SELECT count(*) FROM students").fetchone()[0]
+
+
+def test_counts_follow_every_kind_of_write(db, students):
+    courses = CourseRepository(db)
+    code, other = (row[0] for row in db.execute("SELECT Code FROM courses LIMIT 2"))
+    students.add('2099-0001', 'Ana Test', 'Female', 'First', code)
+    students.update('2099-0001', 'Ana Test', 'Male', 'Fourth', other)
+    db.execute("UPDATE students SET Year = NULL WHERE rowid % 5 = 0")
+    courses.rename(code, 'RENAMED')
+    courses.delete(other)
+    students.delete(db.execute("SELECT StudentID FROM students LIMIT 1").fetchone()[0])
+    assert_current(db)
+
+
+def test_course_counts_list_courses_without_students(db):
+    CourseRepository(db).add('EMPTY', 'No Students Yet')
+    counts = {code: students for code, _, students in statistics.course_counts(db.connection)}
+    assert counts['EMPTY'] == 0
+    assert sum(counts.values()) == db.execute("SELECT count(CourseCode) FROM students").fetchone()[0]
+
+
+def test_rebuild_repairs_drifted_counts(db, students):
+    first, second = db.execute("SELECT CourseCode, Year, Gender FROM enrolment_counts LIMIT 2").fetchall()
+    cell = "CourseCode = ? AND Year = ? AND Gender = ?"
+    db.execute(f"UPDATE enrolment_counts SET Students = Students + 1 WHERE {cell}", first)
+    db.execute(f"DELETE FROM enrolment_counts WHERE {cell}", second)
+    assert len(students.stale_statistics()) == 2
+    assert students.rebuild_statistics() == db.execute("SELECT count(*) FROM enrolment_counts").fetchone()[0]
+    assert_current(db)
+
+
+def test_only_summarized_fields_are_counted(db):
+    with pytest.raises(ValueError):
+        statistics.counts(db.connection, 'StudentName')
@@ -0,0 +1,282 @@
+import random
+
+import pytest
+
+pytest.importorskip('PyQt6')
+
+from PyQt6.QtCore import Qt  # noqa: E402
+
+from ssis.repository import StudentRepository  # noqa: E402
+from ssis.schema import GENDERS, STUDENT_COLUMNS, YEARS  # noqa: E402
+from ssis.search import student_filter  # noqa: E402
+from ssis.table_models import PagedTableModel  # noqa: E402
+
+pytestmark = pytest.mark.usefixtures('qt_app')
+
+FIELDS = list(STUDENT_COLUMNS)
+FILTERS = {
+    'none': ('', ()),
+    'year': ("Year = ?", ('Second',)),
+    'name': student_filter('ana', 'StudentName'),
+}
+
+
+@pytest.fixture
+def students(db, bus):
+    return StudentRepository(db, bus)
+
+
+def make_model(db, bus, where='', params=(), pages=3, page_size=7, max_cached_pages=2):
+    """A model with ``pages`` pages loaded, of which only the last ``max_cached_pages`` keep their rows."""
+    model = PagedTableModel(db.connection, 'students', FIELDS, page_size=page_size,
+                            max_cached_pages=max_cached_pages)
+    model.set_filter(where, params)
+    bus.subscribe('students', model.apply_change)
+    for _ in range(pages):
+        if model.canFetchMore():
+            model.fetchMore()
+    return model
+
+
+def shown(model):
+    return [model.row_data(row) for row in range(model.rowCount())]
+
+
+def fresh(db, model):
+    """The rows a new query for the model's filter and order returns."""
+    where, params = model.filter_clause()
+    return [row[1:] for row in db.execute(model.select_sql(where or '1'), (*params, -1))]
+
+
+def assert_current(db, model):
+    """The rows loaded so far are the first rows of a fresh query, and the rest follow when fetched."""
+    expected = fresh(db, model)
+    assert shown(model) == expected[:model.rowCount()]
+    while model.canFetchMore():
+        model.fetchMore()
+    assert shown(model) == expected
+
+
+def resets(model):
+    count = []
+    model.modelReset.connect(lambda: count.append(1))
+    return count
+
+
+def student_ids(db, where='1', params=()):
+    return [row[0] for row in db.execute(f"SELECT StudentID FROM students WHERE {where} ORDER BY rowid", params)]
+
+
+def course_codes(db):
+    return [row[0] for row in db.execute("SELECT Code FROM courses ORDER BY Code")]
+
+
+def random_change(db, students, rng, number):
+    """Make one random write through the repository, as the window would."""
+    ids = student_ids(db)
+    kind = rng.choice(('add', 'update', 'update', 'rename', 'delete', 'write'))
+    if kind == 'add':
+        students.add(f"2199-{number:04d}", rng.choice(('Ana Perez', 'Zed Ramos', 'Bianca Lim')),
+                     rng.choice(GENDERS), rng.choice(YEARS), rng.choice((*course_codes(db), None)))
+    elif kind == 'delete':
+        students.delete(rng.choice(ids))
+    elif kind in ('update', 'rename'):
+        student_id, name, gender, year, course_code = students.get(rng.choice(ids))
+        if kind == 'rename':
+            name = rng.choice(('Aaron Ana', 'Zoe Zamora', 'Mia Santos', name + ' Jr'))
+        else:
+            gender, year = rng.choice(GENDERS), rng.choice(YEARS)
+            course_code = rng.choice((*course_codes(db), None))
+        students.update(student_id, name, gender, year, course_code)
+    else:
+        rows = students.rows(rng.sample(ids, 3))
+        images = {student_id: (*row[:3], rng.choice(GENDERS), rng.choice(YEARS), row[5])
+                  for student_id, row in rows.items()}
+        images[rng.choice(list(images))] = None
+        students.write(images)
+
+
+def test_update_in_a_cached_page_is_patched_in_place(db, bus, students):
+    model = make_model(db, bus)
+    reset = resets(model)
+    student_id, name, gender, year, course_code = model.row_data(model.rowCount() - 2)
+    changed = []
+    model.dataChanged.connect(lambda top, bottom: changed.append((top.row(), bottom.row())))
+
+    students.update(student_id, 'Renamed', gender, year, course_code)
+
+    assert model.row_data(model.rowCount() - 2)[1] == 'Renamed'
+    assert changed == [(model.rowCount() - 2, model.rowCount() - 2)]
+    assert not reset
+    assert_current(db, model)
+
+
+def test_update_in_an_evicted_page_is_read_back(db, bus, students):
+    model = make_model(db, bus, pages=4)
+    reset = resets(model)
+    assert 0 not in model._cache
+    student_id, name, gender, year, course_code = db.execute(
+        "SELECT StudentID, StudentName, Gender, Year, CourseCode FROM students ORDER BY rowid LIMIT 1 OFFSET 2"
+    ).fetchone()
+
+    students.update(student_id, 'Renamed', gender, year, course_code)
+
+    assert model.row_data(2)[1] == 'Renamed'
+    assert not reset
+    assert_current(db, model)
+
+
+@pytest.mark.parametrize('row', [1, 10, 20])
+def test_delete_removes_the_row(db, bus, students, row):
+    model = make_model(db, bus)
+    reset = resets(model)
+    count = model.rowCount()
+    student_id = model.row_data(row)[0]
+
+    students.delete(student_id)
+
+    assert model.rowCount() == count - 1
+    assert student_id not in [data[0] for data in shown(model)]
+    assert not reset
+    assert_current(db, model)
+
+
+def test_insert_appends_once_every_row_is_loaded(db, bus, students):
+    model = make_model(db, bus, pages=100)
+    assert not model.canFetchMore()
+    count = model.rowCount()
+
+    students.add('2199-0001', 'New Student', 'Female', 'First')
+
+    assert model.rowCount() == count + 1
+    assert model.row_data(count)[0] == '2199-0001'
+    assert_current(db, model)
+
+
+def test_insert_past_the_loaded_pages_waits_to_be_fetched(db, bus, students):
+    model = make_model(db, bus)
+    count = model.rowCount()
+
+    students.add('2199-0001', 'New Student', 'Female', 'First')
+
+    assert model.rowCount() == count
+    assert_current(db, model)
+
+
+def test_update_moves_a_row_out_of_and_back_into_a_filter(db, bus, students):
+    model = make_model(db, bus, *FILTERS['year'])
+    student_id, name, gender, year, course_code = students.get(model.row_data(3)[0])
+
+    students.update(student_id, name, gender, 'Third', course_code)
+    assert student_id not in [data[0] for data in shown(model)]
+    assert_current(db, model)
+
+    students.update(student_id, name, gender, 'Second', course_code)
+    assert student_id in [data[0] for data in shown(model)]
+    assert_current(db, model)
+
+
+@pytest.mark.parametrize('name', FILTERS)
+@pytest.mark.parametrize('pages', [1, 3, 100])
+def test_random_changes_keep_the_rowid_order_model_current(db, bus, students, name, pages):
+    rng = random.Random(f"{name}-{pages}")
+    where, params = FILTERS[name]
+    model = make_model(db, bus, where, params, pages=pages)
+    for number in range(60):
+        random_change(db, students, rng, number)
+        expected = fresh(db, model)
+        assert shown(model) == expected[:model.rowCount()], f"after change {number}"
+    assert_current(db, model)
+
+
+@pytest.mark.parametrize('name', FILTERS)
+def test_random_changes_keep_a_snapshot_current(db, bus, students, name):
+    rng = random.Random(name)
+    where, params = FILTERS[name]
+    model = make_model(db, bus, pages=0)
+    model.set_rows(db.execute(model.select_sql(where or '1'), (*params, -1)).fetchall(), where, params)
+    for number in range(60):
+        random_change(db, students, rng, number)
+        assert shown(model) == fresh(db, model), f"after change {number}"
+
+
+def sorted_model(db, bus, field, descending, where='', params=(), pages=3):
+    model = make_model(db, bus, where, params, pages=0)
+    model.sort(FIELDS.index(field), Qt.SortOrder.DescendingOrder if descending else Qt.SortOrder.AscendingOrder)
+    for _ in range(pages):
+        if model.canFetchMore():
+            model.fetchMore()
+    return model
+
+
+@pytest.mark.parametrize('descending', [False, True])
+@pytest.mark.parametrize('field', FIELDS)
+def test_keyset_pages_follow_the_sort_order(db, bus, field, descending):
+    model = sorted_model(db, bus, field, descending, pages=0)
+    assert_current(db, model)
+    assert model.rowCount() == db.execute("SELECT count(*) FROM students").fetchone()[0]
+    assert len(model._pages) > 1
+
+
+def test_sorting_pages_by_the_sort_index(db, bus):
+    model = sorted_model(db, bus, 'Year', False)
+    last_key = model._pages[-1].last_key
+    condition, params = model.sort_order().after(last_key)
+    plan = ' '.join(row[3] for row in db.execute(
+        f"EXPLAIN QUERY PLAN {model.select_sql(condition)}", (*params, 7)))
+    assert 'students_year_sort' in plan
+    assert 'TEMP B-TREE' not in plan
+
+
+@pytest.mark.parametrize('descending', [False, True])
+@pytest.mark.parametrize('field', ['StudentName', 'Year', 'CourseCode'])
+def test_an_edit_moves_its_row_to_its_new_place(db, bus, students, field, descending):
+    model = sorted_model(db, bus, field, descending, pages=100)
+    reset = resets(model)
+    student_id, name, gender, year, course_code = students.get(model.row_data(5)[0])
+    values = {'StudentName': 'Zzz Last', 'Year': 'Fourth' if year != 'Fourth' else 'First',
+              'CourseCode': None if course_code else course_codes(db)[-1]}
+    name = values['StudentName'] if field == 'StudentName' else name
+    year = values['Year'] if field == 'Year' else year
+    course_code = values['CourseCode'] if field == 'CourseCode' else course_code
+
+    students.update(student_id, name, gender, year, course_code)
+
+    assert not reset
+    assert_current(db, model)
+
+
+@pytest.mark.parametrize('descending', [False, True])
+@pytest.mark.parametrize('field', ['StudentID', 'StudentName', 'Gender', 'Year', 'CourseCode'])
+@pytest.mark.parametrize('pages', [1, 3, 100])
+def test_random_changes_keep_a_sorted_model_current(db, bus, students, field, descending, pages):
+    rng = random.Random(f"{field}-{descending}-{pages}")
+    model = sorted_model(db, bus, field, descending, pages=pages)
+    for number in range(40):
+        random_change(db, students, rng, number)
+        expected = fresh(db, model)
+        assert shown(model) == expected[:model.rowCount()], f"after change {number}"
+    assert_current(db, model)
+
+
+@pytest.mark.parametrize('name', ['year', 'name'])
+@pytest.mark.parametrize('field', ['StudentName', 'CourseCode'])
+def test_random_changes_keep_a_sorted_filtered_model_current(db, bus, students, name, field):
+    rng = random.Random(f"{name}-{field}")
+    model = sorted_model(db, bus, field, False, *FILTERS[name], pages=2)
+    for number in range(40):
+        random_change(db, students, rng, number)
+        expected = fresh(db, model)
+        assert shown(model) == expected[:model.rowCount()], f"after change {number}"
+    assert_current(db, model)
+
+
+@pytest.mark.parametrize('field', ['StudentName', 'Year'])
+def test_random_changes_keep_a_sorted_snapshot_current(db, bus, students, field):
+    rng = random.Random(field)
+    model = sorted_model(db, bus, field, True, pages=0)
+    where, params = FILTERS['year']
+    model.set_rows(db.execute(model.select_sql(where), (*params, -1)).fetchall(), where, params)
+    for number in range(40):
+        random_change(db, students, rng, number)
+        assert shown(model) == fresh(db, model), f"after change {number}"
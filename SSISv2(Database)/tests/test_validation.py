@@ -0,0 +1,54 @@
+import pytest
+
+from ssis.filters import query_plan
+from ssis.repository import StudentRepository
+from ssis.validation import (ERROR, NAME_KEY, SIMILARITY, WARNING, check_student_id, similar_students, similarity,
+                             validate_student)
+
+
+def test_a_consonant_spelled_differently_is_similar():
+    assert similarity('Kris J', 'Chris J') >= SIMILARITY
+
+
+def test_a_name_spelled_differently_is_found(db):
+    StudentRepository(db).add('2099-0001', 'Chris J', 'Male', 'First')
+    assert [row[0] for _, row in similar_students(db.connection, 'Kris J')] == ['2099-0001']
+
+
+@pytest.mark.parametrize('name', ['Jon Santos', 'John Santos', 'Jhon Santoss', 'Santos, Jon', 'SANTOS JON'])
+def test_spellings_and_orders_of_a_name_are_found(db, name):
+    StudentRepository(db).add('2099-0001', 'Jon Santos', 'Male', 'First')
+    assert '2099-0001' in [row[0] for _, row in similar_students(db.connection, name)]
+
+
+def test_the_name_key_is_the_one_the_schema_indexes(db):
+    # A failure here means the key changed without a migration recreating students_name_key.
+    [sql] = db.execute("SELECT sql FROM sqlite_master WHERE name = 'students_name_key'").fetchone()
+    assert sql == f"CREATE INDEX students_name_key ON students ({NAME_KEY})"
+    plan = ' '.join(query_plan(db, f"SELECT * FROM students WHERE {NAME_KEY} = ?", ('jnsnts',)))
+    assert 'students_name_key' in plan
+
+
+def test_unlike_names_are_not_reported(db):
+    StudentRepository(db).add('2099-0001', 'Jon Santos', 'Male', 'First')
+    assert similarity('Jon Santos', 'Jane Smith') < SIMILARITY
+    assert similar_students(db.connection, 'Zorba Quill') == []
+
+
+def test_the_id_is_checked_for_format_and_collisions(db):
+    student_id, name = db.execute("SELECT StudentID, StudentName FROM students LIMIT 1").fetchone()
+    assert check_student_id(db.connection, '') == []
+    assert check_student_id(db.connection, '2099-0001') == []
+    [bad] = check_student_id(db.connection, '99-1')
+    assert (bad.field, bad.level) == ('StudentID', ERROR)
+    [taken] = check_student_id(db.connection, student_id)
+    assert taken.level == ERROR and name in taken.message
+
+
+def test_a_similar_name_is_only_a_warning(db):
+    StudentRepository(db).add('2099-0001', 'Zorba Quill', 'Male', 'First')
+    issues = validate_student(db.connection, '2099-0002', 'Zorbah Quil')
+    assert [(issue.field, issue.level) for issue in issues] == [('StudentName', WARNING)]
+    assert '2099-0001 Zorba Quill (N/A, First)' in issues[0].message
+    # A student is not a duplicate of itself, only its ID is taken.
+    assert [issue.field for issue in validate_student(db.connection, '2099-0001', 'Zorba Quill')] == ['StudentID']